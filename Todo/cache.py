@@ -0,0 +1,64 @@
+"""
+Per-user caching of todo responses.
+
+Every user has a version number in the cache which the write paths bump.
+Cached responses and ETags are derived from the version, so a write
+invalidates all of the user's cached responses at once, and a conditional
+GET can be answered with a 304 without querying the todo table.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+def get_cache():
+    return caches[settings.TODO_CACHE_ALIAS]
+
+
+def _version_key(owner_id):
+    return 'todos:version:%s' % owner_id
+
+
+def get_version(owner_id):
+    cache = get_cache()
+    version = cache.get(_version_key(owner_id))
+    if version is None:
+        # never cached or evicted: start from the clock, which is ahead of any
+        # version handed out before, so stale ETags can't match again
+        version = time.time_ns()
+        if not cache.add(_version_key(owner_id), version, timeout=None):
+            version = cache.get(_version_key(owner_id), version)
+    return version
+
+
+def bump_version(owner_id):
+    """
+    Invalidates every cached todo response of the user.
+    """
+    cache = get_cache()
+    try:
+        cache.incr(_version_key(owner_id))
+    except ValueError:
+        cache.set(_version_key(owner_id), time.time_ns(), timeout=None)
+
+
+def get_etag(request):
+    """
+    Returns a strong ETag for the response to `request` made by its user at
+    the user's current version.
+    """
+    owner_id = request.user.id
+    key = '%s:%s:%s:%s' % (owner_id, get_version(owner_id), request.get_full_path(),
+                           getattr(request, 'accepted_media_type', ''))
+    return '"%s"' % hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+def get_response_data(etag):
+    return get_cache().get('todos:response:%s' % etag)
+
+
+def set_response_data(etag, data):
+    get_cache().set('todos:response:%s' % etag, data, settings.TODO_CACHE_TIMEOUT)
+
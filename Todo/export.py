@@ -0,0 +1,49 @@
+"""
+Generators for streaming a user's todos without holding them in memory.
+"""
+import zlib
+
+from .renderers import dumps
+
+
+def iter_json_array(items):
+    yield b'['
+    first = True
+    for item in items:
+        if first:
+            first = False
+            yield dumps(item)
+        else:
+            yield b',' + dumps(item)
+    yield b']'
+
+
+def iter_ndjson(items):
+    for item in items:
+        yield dumps(item) + b'\n'
+
+
+def buffered(chunks, size=64 * 1024):
+    """
+    Joins small chunks into pieces of roughly `size` bytes so the server
+    isn't asked to write one tiny chunk per todo.
+    """
+    buffer, buffered_size = [], 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        buffered_size += len(chunk)
+        if buffered_size >= size:
+            yield b''.join(buffer)
+            buffer, buffered_size = [], 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def gzipped(chunks, level=6):
+    # wbits=31 makes zlib write a gzip header and trailer
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
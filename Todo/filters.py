@@ -0,0 +1,114 @@
+import datetime
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+from .pagination import is_integer
+from .search import search_todos
+
+
+class TodoFilterBackend(BaseFilterBackend):
+    """
+    Narrows a todo queryset with query parameters:
+
+    - `completed=true|false` for completed or open todos
+    - `list=<id>` for the todos of one list, or `list=none` for those in none
+    - `created_after`, `created_before`, `completed_after`, `completed_before`
+      take an ISO 8601 date or datetime; `after` is inclusive, `before` is not
+    - `search` for todos whose title or memo contains every given word
+    - `ordering` is one of `ordering_fields`, optionally prefixed with `-`.
+      Ordering by `date_completed` leaves out open todos.
+      `position` is the user's manual order, see positions.py.
+
+    Every combination is served by one of the Todo indexes, except that
+    the todos of one list are only indexed in created and manual order.
+    """
+
+    ordering_param = 'ordering'
+    ordering_fields = ('created', 'date_completed', 'position')
+    default_ordering = '-created'
+    search_param = 'search'
+
+    # query parameter -> lookup
+    range_params = {
+        'created_after': 'created__gte',
+        'created_before': 'created__lt',
+        'completed_after': 'date_completed__gte',
+        'completed_before': 'date_completed__lt',
+    }
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+        filters, errors = {}, {}
+
+        completed = params.get('completed')
+        if completed:
+            if completed.lower() in ('true', '1'):
+                filters['date_completed__isnull'] = False
+            elif completed.lower() in ('false', '0'):
+                filters['date_completed__isnull'] = True
+            else:
+                errors['completed'] = 'Expected true or false.'
+
+        for param, lookup in self.range_params.items():
+            if params.get(param):
+                value = parse_timestamp(params[param])
+                if value is None:
+                    errors[param] = 'Expected an ISO 8601 date or datetime.'
+                else:
+                    filters[lookup] = value
+
+        todo_list = params.get('list')
+        if todo_list:
+            if todo_list.lower() == 'none':
+                filters['list__isnull'] = True
+            elif todo_list.isascii() and todo_list.isdigit() and is_integer(int(todo_list)):
+                filters['list_id'] = int(todo_list)
+            else:
+                errors['list'] = 'Expected a list id or none.'
+
+        if errors:
+            raise ValidationError(errors)
+
+        ordering = self.get_ordering(request)
+        if ordering[0].lstrip('-') == 'date_completed':
+            filters.setdefault('date_completed__isnull', False)
+        queryset = queryset.filter(**filters).order_by(*ordering)
+
+        if params.get(self.search_param):
+            queryset = search_todos(queryset, request.user.id, params[self.search_param])
+        return queryset
+
+    def get_ordering(self, request):
+        """
+        Returns the requested (field, id) ordering pair, as expected by
+        KeysetPagination.
+        """
+        ordering = request.query_params.get(self.ordering_param) or self.default_ordering
+        if ordering.lstrip('-') not in self.ordering_fields:
+            choices = [prefix + field for field in self.ordering_fields for prefix in ('', '-')]
+            raise ValidationError({self.ordering_param: 'Expected one of: %s.' % ', '.join(choices)})
+        return ordering, '-id' if ordering.startswith('-') else 'id'
+
+
+def parse_timestamp(value):
+    """
+    Parses an ISO 8601 datetime, or a date meaning its midnight, in the
+    current time zone unless an offset is given. Returns None if `value` is
+    neither.
+    """
+    try:
+        parsed = parse_datetime(value)
+        if parsed is None:
+            date = parse_date(value)
+            if date is None:
+                return None
+            parsed = datetime.datetime.combine(date, datetime.time.min)
+    except ValueError:
+        return None
+    if settings.USE_TZ and timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
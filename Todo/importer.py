@@ -0,0 +1,308 @@
+"""
+Bulk import of todos from NDJSON or CSV.
+
+Rows are read as a stream, validated a batch at a time against
+TodoSerializer's fields and inserted in bulk, with their tags, each batch
+in its own transaction. After every batch `position` is the number of input rows
+dealt with so far, so an import that fails part way through can be resumed
+by passing that position back as `start`.
+"""
+import csv
+import itertools
+import json
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.validators import MaxLengthValidator, ProhibitNullCharactersValidator
+from django.db import connections, models, router, transaction
+from django.utils import timezone
+from rest_framework.exceptions import ParseError, ValidationError
+from rest_framework.fields import CharField, SkipField, empty, get_error_detail
+from rest_framework.serializers import Serializer
+
+from .models import Tag, Todo
+from .positions import next_positions
+from .serializers import TodoSerializer
+from .stats import list_changes, record_changes, record_list_changes
+from .sync import next_seqs
+
+
+class InvalidRow:
+    """
+    Stands in for a row that could not be parsed, so that it is reported
+    with its row number like any other invalid row.
+    """
+
+    def __init__(self, message):
+        self.message = message
+
+
+def iter_ndjson_rows(lines):
+    """
+    Yields one object per non-blank line of newline-delimited JSON.
+    """
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as exc:
+            yield InvalidRow('JSON parse error - %s' % exc)
+
+
+def iter_csv_rows(lines):
+    """
+    Yields one dict per CSV record, keyed by the header row. Empty cells are
+    left out, so they count as missing rather than as empty strings, and
+    cells without a header are ignored.
+    """
+    reader = csv.reader(lines)
+    try:
+        header = next(reader, None)
+        if header is None:
+            return
+        for record in reader:
+            yield {name: value for name, value in zip(header, record) if value != ''}
+    except csv.Error as exc:
+        raise ParseError('CSV parse error - %s' % exc)
+
+
+def get_inline_max_length(field):
+    """
+    Returns the max_length of a CharField whose only validators are the
+    length and null character checks ModelSerializer gives it, or None if
+    its values have to go through run_validation().
+    """
+    if type(field) is not CharField or field.max_length is None or field.min_length is not None:
+        return None
+    if not all(type(validator) in (MaxLengthValidator, ProhibitNullCharactersValidator)
+               for validator in field.validators):
+        return None
+    return field.max_length
+
+
+class TodoImporter:
+    """
+    Imports rows of todo data for one owner.
+
+    Each row is validated with the writable fields of TodoSerializer, in
+    the same way `TodoSerializer(data=row).is_valid()` would. Doing it field
+    by field skips most of the per-row serializer overhead, and lets values
+    repeated within a batch (empty memos, shared completion dates) be
+    validated once.
+
+    Strings for plain CharFields, like titles, are rarely repeated, so they
+    are checked inline and only fall back to the field's own validation
+    when they might be invalid.
+
+    Tags are looked up by name for the whole batch with one query, and
+    added with one more insert.
+
+    Valid rows go straight to database parameters and are inserted with a
+    single executemany() per batch. That is what bulk_create() ends up
+    doing, minus building a model instance and compiling SQL for each row,
+    which is where most of its time goes with this many rows.
+    """
+
+    batch_size = 5000
+    # invalid rows are counted but only this many are kept for the report
+    max_errors = 1000
+
+    def __init__(self, owner_id, start=0, batch_size=None, progress=None):
+        self.owner_id = owner_id
+        self.position = start
+        self.imported = 0
+        self.error_count = 0
+        self.errors = []
+        if batch_size is not None:
+            self.batch_size = batch_size
+        # called with the importer after every batch
+        self.progress = progress
+
+        self.connection = connections[router.db_for_write(Todo)]
+        self.columns = [field for field in Todo._meta.concrete_fields if not field.primary_key]
+        serializer_fields = TodoSerializer(context={'owner_id': owner_id}).fields
+        # (index of the column, serializer field) for every column the client may set
+        self.fields = [
+            (index, serializer_fields[column.name]) for index, column in enumerate(self.columns)
+            if column.name in serializer_fields and not serializer_fields[column.name].read_only
+        ]
+        self.tags_field = serializer_fields['tags']
+        # max_length by column index, for the CharFields that can be checked inline
+        self.max_lengths = {index: get_inline_max_length(field) for index, field in self.fields}
+        self.date_completed_index = self.columns.index(Todo._meta.get_field('date_completed'))
+        self.list_index = self.columns.index(Todo._meta.get_field('list'))
+        # the todo's position in its owner's list, not the importer's in its input
+        self.position_index = self.columns.index(Todo._meta.get_field('position'))
+        self.seq_index = self.columns.index(Todo._meta.get_field('seq'))
+        quote_name = self.connection.ops.quote_name
+        self.sql = 'INSERT INTO %s (%s) VALUES (%s)' % (
+            quote_name(Todo._meta.db_table),
+            ', '.join(quote_name(column.column) for column in self.columns),
+            ', '.join(['%s'] * len(self.columns)),
+        )
+
+    def run(self, rows):
+        """
+        Imports `rows`, skipping the first `start` of them.
+        """
+        rows = itertools.islice(rows, self.position, None)
+        while True:
+            batch = list(itertools.islice(rows, self.batch_size))
+            if not batch:
+                break
+            self.import_batch(batch)
+            if self.progress is not None:
+                self.progress(self)
+        return self
+
+    def import_batch(self, batch):
+        defaults = self.get_defaults()
+        params = []
+        tag_lists = []
+        errors = []
+        # database values or errors by column and raw value, for this batch only
+        seen = [{} for column in self.columns]
+        tag_ids = self.get_tag_ids(batch)
+        for row_number, data in enumerate(batch, self.position + 1):
+            row, row_errors = self.validate(data, defaults, seen)
+            tags = []
+            if isinstance(data, dict):
+                valid, tags = self.validate_tags(data.get('tags', empty), tag_ids)
+                if not valid:
+                    row_errors['tags'] = tags
+            if row_errors:
+                errors.append({'row': row_number, 'errors': row_errors})
+            else:
+                params.append(row)
+                tag_lists.append(tags)
+
+        if params:
+            with transaction.atomic(using=self.connection.alias), self.connection.cursor() as cursor:
+                positions = next_positions(self.owner_id, len(params))
+                for row, position, seq in zip(params, positions, next_seqs(self.owner_id, len(params))):
+                    row[self.position_index] = position
+                    row[self.seq_index] = seq
+                cursor.executemany(self.sql, params)
+                if any(tag_lists):
+                    # new todos are the only ones in these positions
+                    ids = dict(Todo.objects.filter(owner_id=self.owner_id, position__in=positions)
+                               .values_list('position', 'id'))
+                    Todo.tags.through.objects.bulk_create([
+                        Todo.tags.through(todo_id=ids[position], tag_id=tag_id)
+                        for position, tags in zip(positions, tag_lists) for tag_id in tags
+                    ])
+                completed = sum(row[self.date_completed_index] is not None for row in params)
+                record_changes(self.owner_id, opened=len(params) - completed, completed=completed)
+                record_list_changes(list_changes((), [row[self.list_index] for row in params]))
+
+        self.position += len(batch)
+        self.imported += len(params)
+        self.error_count += len(errors)
+        self.errors.extend(errors[:self.max_errors - len(self.errors)])
+
+    def get_defaults(self):
+        """
+        Returns the database value of every column for a row that sets no
+        fields: the owner, the batch's timestamp and the model defaults.
+        """
+        now = timezone.now()
+        defaults = []
+        for column in self.columns:
+            if column.name == 'owner':
+                value = self.owner_id
+            elif getattr(column, 'auto_now', False) or getattr(column, 'auto_now_add', False):
+                value = now
+            else:
+                value = column.get_default()
+            defaults.append(column.get_db_prep_save(value, connection=self.connection))
+        return defaults
+
+    def validate(self, data, defaults, seen):
+        """
+        Returns the database parameters and the errors for one row.
+        """
+        if isinstance(data, InvalidRow):
+            return None, {'non_field_errors': [data.message]}
+        if not isinstance(data, dict):
+            message = Serializer.default_error_messages['invalid'].format(datatype=type(data).__name__)
+            return None, {'non_field_errors': [message]}
+
+        row, errors = list(defaults), {}
+        for index, field in self.fields:
+            value = data.get(field.field_name, empty)
+            max_length = self.max_lengths[index]
+            if max_length is not None and type(value) is str:
+                stripped = value.strip() if field.trim_whitespace else value
+                if stripped and len(stripped) <= max_length and '\x00' not in stripped:
+                    row[index] = stripped
+                    continue
+            cacheable = value is None or type(value) is str
+            if cacheable and value in seen[index]:
+                result = seen[index][value]
+            else:
+                result = self.validate_value(self.columns[index], field, value)
+                if cacheable:
+                    seen[index][value] = result
+            valid, value = result
+            if not valid:
+                errors[field.field_name] = value
+            elif value is not empty:
+                row[index] = value
+        return row, errors
+
+    def get_tag_ids(self, batch):
+        """
+        Returns {name: id} for the owner's tags named in the rows of `batch`.
+        """
+        names = {
+            name for data in batch if isinstance(data, dict) and isinstance(data.get('tags'), list)
+            for name in data['tags'] if type(name) is str
+        }
+        if not names:
+            return {}
+        return dict(Tag.objects.filter(owner_id=self.owner_id, name__in=names).values_list('name', 'id'))
+
+    def validate_tags(self, value, tag_ids):
+        """
+        Validates one row's tags, returning a (valid, list of distinct tag
+        ids or errors) pair. Lists of known names are looked up in `tag_ids`;
+        anything else goes through the field's own validation, for its
+        errors.
+        """
+        if value is empty:
+            return True, []
+        if isinstance(value, list) and all(type(name) is str and name in tag_ids for name in value):
+            return True, list(dict.fromkeys(tag_ids[name] for name in value))
+        valid, tags = self.validate_value(None, self.tags_field, value)
+        if not valid:
+            return False, tags
+        return True, list(dict.fromkeys(tag.pk for tag in tags))
+
+    def validate_value(self, column, field, value):
+        """
+        Runs one field's validation, returning a (valid, database value or
+        errors) pair as Serializer.to_internal_value() would interpret it.
+        """
+        try:
+            value = field.run_validation(value)
+        except ValidationError as exc:
+            return False, exc.detail
+        except DjangoValidationError as exc:
+            return False, get_error_detail(exc)
+        except SkipField:
+            return True, empty
+        if column is None:
+            # not a column, e.g. the tags
+            return True, value
+        if isinstance(value, models.Model):
+            # related fields validate to instances, but the column holds the key
+            value = value.pk
+        return True, column.get_db_prep_save(value, connection=self.connection)
+
+    def summary(self):
+        return {
+            'imported': self.imported,
+            'position': self.position,
+            'error_count': self.error_count,
+            'errors': self.errors,
+        }
@@ -0,0 +1,83 @@
+import json
+import os
+import sys
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ParseError
+
+from Todo import cache as todo_cache
+from Todo.importer import TodoImporter, iter_csv_rows, iter_ndjson_rows
+
+
+READERS = {
+    'ndjson': iter_ndjson_rows,
+    'csv': iter_csv_rows,
+}
+
+
+class Command(BaseCommand):
+    help = 'Imports todos for a user from an NDJSON or CSV file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to import, or - for standard input.')
+        parser.add_argument('--user', required=True, help='Username of the owner of the imported todos.')
+        parser.add_argument('--format', choices=sorted(READERS),
+                            help='Format of the file. Guessed from its extension by default.')
+        parser.add_argument('--start', type=int, default=0, help='Number of rows to skip.')
+        parser.add_argument('--checkpoint',
+                            help='File recording the number of rows imported so far. If it exists the '
+                                 'import resumes from it, and it is updated after every batch.')
+        parser.add_argument('--batch-size', type=int, default=TodoImporter.batch_size)
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError('User "%s" does not exist.' % options['user'])
+
+        file_format = options['format']
+        if file_format is None:
+            file_format = os.path.splitext(options['path'])[1].lstrip('.').lower()
+            if file_format not in READERS:
+                raise CommandError('Cannot tell the format of "%s", pass --format.' % options['path'])
+
+        start = options['start']
+        checkpoint = options['checkpoint']
+        if checkpoint and os.path.exists(checkpoint):
+            with open(checkpoint) as f:
+                start = int(f.read().strip() or 0)
+            self.stdout.write('Resuming from row %d' % start)
+
+        def progress(importer):
+            if checkpoint:
+                write_checkpoint(checkpoint, importer.position)
+            self.stdout.write('%d rows read, %d imported, %d invalid' % (
+                importer.position, importer.imported, importer.error_count))
+
+        importer = TodoImporter(user.id, start=start, batch_size=options['batch_size'], progress=progress)
+        if options['path'] == '-':
+            f = open(sys.stdin.fileno(), encoding='utf-8', newline='', closefd=False)
+        else:
+            f = open(options['path'], encoding='utf-8', newline='')
+        try:
+            with f:
+                importer.run(READERS[file_format](f))
+        except ParseError as exc:
+            raise CommandError('%s (resume from row %d)' % (exc.detail, importer.position))
+        finally:
+            if importer.imported:
+                todo_cache.bump_version(user.id)
+
+        for error in importer.errors:
+            self.stderr.write('Row %d: %s' % (error['row'], json.dumps(error['errors'])))
+        if importer.error_count > len(importer.errors):
+            self.stderr.write('... and %d more invalid rows' % (importer.error_count - len(importer.errors)))
+        self.stdout.write(self.style.SUCCESS('Imported %d todos for %s' % (importer.imported, user.username)))
+
+
+def write_checkpoint(path, position):
+    # write then rename, so a crash never leaves a half-written checkpoint
+    with open(path + '.tmp', 'w') as f:
+        f.write('%d\n' % position)
+    os.replace(path + '.tmp', path)
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from Todo.sync import prune_tombstones
+
+
+class Command(BaseCommand):
+    help = ('Deletes the tombstones of todos deleted more than TODO_SYNC["TOMBSTONE_MAX_AGE"] seconds ago. '
+            'Run it daily.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-age', type=int, help='Seconds to keep tombstones for, instead of the setting.')
+
+    def handle(self, *args, **options):
+        count = prune_tombstones(options['max_age'])
+        self.stdout.write(self.style.SUCCESS('Deleted %d tombstones' % count))
@@ -0,0 +1,40 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from Todo.stats import find_inconsistencies, find_list_inconsistencies, rebuild_stats
+
+
+class Command(BaseCommand):
+    help = "Recounts users' todo stats and list counts from their todos, or with --check only reports the wrong ones."
+
+    def add_arguments(self, parser):
+        parser.add_argument('usernames', nargs='*', help='Users to rebuild. All of them by default.')
+        parser.add_argument('--check', action='store_true',
+                            help='Compare the stats with a fresh count without changing them, and fail '
+                                 'if any are wrong.')
+
+    def handle(self, *args, **options):
+        owner_ids = None
+        if options['usernames']:
+            users = dict(User.objects.filter(username__in=options['usernames']).values_list('username', 'id'))
+            missing = set(options['usernames']) - set(users)
+            if missing:
+                raise CommandError('Unknown users: %s' % ', '.join(sorted(missing)))
+            owner_ids = list(users.values())
+
+        if options['check']:
+            mismatches = find_inconsistencies(owner_ids)
+            for owner_id, stored, counted in mismatches:
+                self.stderr.write('User #%d: stored %d open, %d completed; counted %d open, %d completed' % (
+                    (owner_id,) + stored + counted))
+            list_mismatches = find_list_inconsistencies(owner_ids)
+            for list_id, stored, counted in list_mismatches:
+                self.stderr.write('List #%d: stored %d todos; counted %d' % (list_id, stored, counted))
+            if mismatches:
+                raise CommandError('%d users have wrong todo stats' % len(mismatches))
+            if list_mismatches:
+                raise CommandError('%d lists have wrong todo counts' % len(list_mismatches))
+            self.stdout.write(self.style.SUCCESS('Todo stats are consistent'))
+        else:
+            count = rebuild_stats(owner_ids)
+            self.stdout.write(self.style.SUCCESS('Rebuilt todo stats for %d users' % count))
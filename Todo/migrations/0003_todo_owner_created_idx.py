@@ -0,0 +1,17 @@
+# Generated by Django 3.2.25 on 2026-10-17 16:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Todo', '0002_todo_owner'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='todo',
+            index=models.Index(fields=['owner', '-created', '-id'], name='todo_owner_created_idx'),
+        ),
+    ]
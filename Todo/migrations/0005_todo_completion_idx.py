@@ -0,0 +1,21 @@
+# Generated by Django 3.2.25 on 2026-10-17 17:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Todo', '0004_todo_sync'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='todo',
+            index=models.Index(condition=models.Q(date_completed__isnull=True), fields=['owner', '-created', '-id'], name='todo_owner_open_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='todo',
+            index=models.Index(condition=models.Q(date_completed__isnull=False), fields=['owner', '-created', '-id'], name='todo_owner_completed_idx'),
+        ),
+    ]
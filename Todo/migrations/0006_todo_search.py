@@ -0,0 +1,20 @@
+# Generated by Django 3.2.25 on 2026-10-17 17:35
+
+from django.db import migrations, models
+
+from Todo.search import create_search_index, drop_search_index
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Todo', '0005_todo_completion_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='todo',
+            index=models.Index(condition=models.Q(('date_completed__isnull', False)), fields=['owner', '-date_completed', '-id'], name='todo_owner_date_completed_idx'),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
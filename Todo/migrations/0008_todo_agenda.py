@@ -0,0 +1,64 @@
+# Generated by Django 3.2.25 on 2026-10-17 18:44
+
+from django.db import migrations, models
+
+from Todo.search import create_search_index
+
+
+# Todo.positions.GAP, as of this migration
+GAP = 1 << 16
+
+
+def number_positions(apps, schema_editor):
+    """
+    Puts existing todos in their owners' manual order by creation.
+    """
+    Todo = apps.get_model('Todo', 'Todo')
+    todos = Todo.objects.using(schema_editor.connection.alias)
+    rows = list(todos.order_by('owner_id', 'created', 'id').values_list('id', 'owner_id'))
+    owner_id, position, changed = None, 0, []
+    for pk, row_owner_id in rows:
+        if row_owner_id != owner_id:
+            owner_id, position = row_owner_id, 0
+        position += GAP
+        changed.append(Todo(pk=pk, position=position))
+    todos.bulk_update(changed, ['position'], batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Todo', '0007_todostats'),
+    ]
+
+    operations = [
+        # when migrating backwards, removing the columns below rebuilds the
+        # table and drops the triggers with it; this puts them back afterwards
+        migrations.RunPython(migrations.RunPython.noop, create_search_index),
+        migrations.AddField(
+            model_name='todo',
+            name='due_date',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='todo',
+            name='position',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='todo',
+            name='priority',
+            field=models.SmallIntegerField(choices=[(0, 'None'), (1, 'Low'), (2, 'Medium'), (3, 'High')], default=0),
+        ),
+        migrations.AddIndex(
+            model_name='todo',
+            index=models.Index(fields=['owner', 'position', 'id'], name='todo_owner_position_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='todo',
+            index=models.Index(condition=models.Q(('date_completed__isnull', True), ('due_date__isnull', False)), fields=['owner', 'due_date', '-priority', 'id'], name='todo_owner_agenda_idx'),
+        ),
+        migrations.RunPython(number_positions, migrations.RunPython.noop),
+        # adding the columns rebuilt the table, and its triggers with it
+        migrations.RunPython(create_search_index, migrations.RunPython.noop),
+    ]
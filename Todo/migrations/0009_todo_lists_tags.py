@@ -0,0 +1,78 @@
+# Generated by Django 3.2.25 on 2026-10-17 18:54
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+from Todo.search import create_search_index
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('Todo', '0008_todo_agenda'),
+    ]
+
+    operations = [
+        # when migrating backwards, removing the list column below rebuilds
+        # the table and drops the triggers with it; this puts them back afterwards
+        migrations.RunPython(migrations.RunPython.noop, create_search_index),
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='TodoList',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('todo_count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='todolist',
+            name='owner',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='owner',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='todo',
+            name='list',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='todos', to='Todo.todolist'),
+        ),
+        migrations.AddField(
+            model_name='todo',
+            name='tags',
+            field=models.ManyToManyField(blank=True, related_name='todos', to='Todo.Tag'),
+        ),
+        migrations.AddIndex(
+            model_name='todo',
+            index=models.Index(fields=['owner', 'list', '-created', '-id'], name='todo_owner_list_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='todo',
+            index=models.Index(fields=['owner', 'list', 'position', 'id'], name='todo_owner_list_position_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='todolist',
+            index=models.Index(fields=['owner', 'name', 'id'], name='todolist_owner_name_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='tag',
+            constraint=models.UniqueConstraint(fields=('owner', 'name'), name='tag_owner_name_unique'),
+        ),
+        # adding the list column rebuilt the table, and its triggers with it
+        migrations.RunPython(create_search_index, migrations.RunPython.noop),
+    ]
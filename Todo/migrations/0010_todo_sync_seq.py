@@ -0,0 +1,91 @@
+# Generated by Django 3.2.25 on 2026-10-17 19:40
+
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+from Todo.search import create_search_index
+
+
+def number_changes(apps, schema_editor):
+    """
+    Numbers each owner's existing todos and tombstones in the order they
+    were last written, and starts the owner's sequence after them.
+    """
+    Todo = apps.get_model('Todo', 'Todo')
+    TodoTombstone = apps.get_model('Todo', 'TodoTombstone')
+    TodoSyncState = apps.get_model('Todo', 'TodoSyncState')
+    alias = schema_editor.connection.alias
+    changes = defaultdict(list)
+    for pk, owner_id, updated in Todo.objects.using(alias).values_list('id', 'owner_id', 'updated'):
+        changes[owner_id].append((updated, Todo, pk))
+    for pk, owner_id, deleted in TodoTombstone.objects.using(alias).values_list('id', 'owner_id', 'deleted'):
+        changes[owner_id].append((deleted, TodoTombstone, pk))
+
+    numbered = {Todo: [], TodoTombstone: []}
+    for owner_id, rows in changes.items():
+        rows.sort(key=lambda row: (row[0], row[1] is TodoTombstone, row[2]))
+        for seq, (timestamp, model, pk) in enumerate(rows, 1):
+            numbered[model].append(model(pk=pk, seq=seq))
+    for model, objs in numbered.items():
+        model.objects.using(alias).bulk_update(objs, ['seq'], batch_size=2000)
+    TodoSyncState.objects.using(alias).bulk_create([
+        TodoSyncState(owner_id=owner_id, last_seq=len(rows)) for owner_id, rows in changes.items()
+    ], batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('Todo', '0009_todo_lists_tags'),
+    ]
+
+    operations = [
+        # when migrating backwards, removing the column below rebuilds the
+        # table and drops the triggers with it; this puts them back afterwards
+        migrations.RunPython(migrations.RunPython.noop, create_search_index),
+        migrations.CreateModel(
+            name='TodoSyncState',
+            fields=[
+                ('owner', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('last_seq', models.BigIntegerField(default=0)),
+                ('pruned_seq', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RemoveIndex(
+            model_name='todo',
+            name='todo_owner_updated_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='todotombstone',
+            name='tombstone_owner_deleted_idx',
+        ),
+        migrations.AddField(
+            model_name='todo',
+            name='seq',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='todotombstone',
+            name='seq',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='todo',
+            index=models.Index(fields=['owner', 'seq'], name='todo_owner_seq_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='todotombstone',
+            index=models.Index(fields=['owner', 'seq'], name='tombstone_owner_seq_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='todotombstone',
+            index=models.Index(fields=['deleted'], name='tombstone_deleted_idx'),
+        ),
+        migrations.RunPython(number_changes, migrations.RunPython.noop),
+        # adding the column rebuilt the table, and its triggers with it
+        migrations.RunPython(create_search_index, migrations.RunPython.noop),
+    ]
@@ -1,11 +1,136 @@
 from django.db import models
 
+
+class TodoList(models.Model):
+    """
+    A list, or project, that the owner's todos can be filed in. `todo_count`
+    is kept current by every write, see Todo/stats.py.
+    """
+    name = models.CharField(max_length=200)
+    owner = models.ForeignKey('auth.User', on_delete=models.CASCADE)
+    created = models.DateTimeField(auto_now_add=True)
+    todo_count = models.IntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['owner', 'name', 'id'], name='todolist_owner_name_idx'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class Tag(models.Model):
+    name = models.CharField(max_length=50)
+    owner = models.ForeignKey('auth.User', on_delete=models.CASCADE)
+
+    class Meta:
+        ordering = ['name']
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'name'], name='tag_owner_name_unique'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
 class Todo(models.Model):
+    class Priority(models.IntegerChoices):
+        NONE = 0
+        LOW = 1
+        MEDIUM = 2
+        HIGH = 3
+
     title = models.CharField(max_length=200)
     memo = models.TextField(blank=True)
     created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
     date_completed = models.DateTimeField(null=True, blank=True)
+    due_date = models.DateField(null=True, blank=True)
+    priority = models.SmallIntegerField(choices=Priority.choices, default=Priority.NONE)
+    # the todo's place in the owner's manual order; spaced out so that a todo
+    # can be moved between two others by writing its row alone. See positions.py.
+    position = models.BigIntegerField(default=0)
+    # the number, in the owner's change sequence, of the last write to the
+    # todo. See sync.py.
+    seq = models.BigIntegerField(default=0)
     owner = models.ForeignKey('auth.User', on_delete=models.CASCADE)
+    list = models.ForeignKey(TodoList, null=True, blank=True, on_delete=models.SET_NULL, related_name='todos')
+    tags = models.ManyToManyField(Tag, blank=True, related_name='todos')
+
+    class Meta:
+        indexes = [
+            # serves the owner's todo list, newest first, with keyset paging
+            models.Index(fields=['owner', '-created', '-id'], name='todo_owner_created_idx'),
+            # serves the delta sync feed
+            models.Index(fields=['owner', 'seq'], name='todo_owner_seq_idx'),
+            # serve the list narrowed to open or to completed todos; partial
+            # where the database supports it, skipped elsewhere
+            models.Index(fields=['owner', '-created', '-id'], name='todo_owner_open_idx',
+                         condition=models.Q(date_completed__isnull=True)),
+            models.Index(fields=['owner', '-created', '-id'], name='todo_owner_completed_idx',
+                         condition=models.Q(date_completed__isnull=False)),
+            # serves completed todos ordered or filtered by completion date
+            models.Index(fields=['owner', '-date_completed', '-id'], name='todo_owner_date_completed_idx',
+                         condition=models.Q(date_completed__isnull=False)),
+            # serves the list in the owner's manual order
+            models.Index(fields=['owner', 'position', 'id'], name='todo_owner_position_idx'),
+            # serves the agenda: open todos with a due date, soonest and most
+            # important first
+            models.Index(fields=['owner', 'due_date', '-priority', 'id'], name='todo_owner_agenda_idx',
+                         condition=models.Q(date_completed__isnull=True, due_date__isnull=False)),
+            # serve the todos of one list, newest first or in manual order
+            models.Index(fields=['owner', 'list', '-created', '-id'], name='todo_owner_list_created_idx'),
+            models.Index(fields=['owner', 'list', 'position', 'id'], name='todo_owner_list_position_idx'),
+        ]
 
     def __str__(self):
         return self.title
+
+
+class TodoTombstone(models.Model):
+    """
+    Left behind when a todo is deleted so that clients syncing incrementally
+    find out about the deletion.
+    """
+    todo_id = models.IntegerField()
+    owner = models.ForeignKey('auth.User', on_delete=models.CASCADE)
+    deleted = models.DateTimeField(auto_now_add=True)
+    seq = models.BigIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            # serves the delta sync feed
+            models.Index(fields=['owner', 'seq'], name='tombstone_owner_seq_idx'),
+            # serves pruning, see sync.prune_tombstones()
+            models.Index(fields=['deleted'], name='tombstone_deleted_idx'),
+        ]
+
+    def __str__(self):
+        return 'Todo #%d (deleted)' % self.todo_id
+
+
+class TodoSyncState(models.Model):
+    """
+    A user's change sequence: the last number handed out, and the highest
+    number of the tombstones pruned so far. See Todo/sync.py.
+    """
+    owner = models.OneToOneField('auth.User', on_delete=models.CASCADE, primary_key=True)
+    last_seq = models.BigIntegerField(default=0)
+    pruned_seq = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return 'Sync state of user #%d' % self.owner_id
+
+
+class TodoStats(models.Model):
+    """
+    Running counts of a user's todos, kept current by every write so that
+    the stats endpoint never has to count them. See Todo/stats.py.
+    """
+    owner = models.OneToOneField('auth.User', on_delete=models.CASCADE, primary_key=True)
+    open_count = models.IntegerField(default=0)
+    completed_count = models.IntegerField(default=0)
+
+    def __str__(self):
+        return 'Todo stats of user #%d' % self.owner_id
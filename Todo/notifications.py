@@ -0,0 +1,148 @@
+"""
+Change notifications for the push endpoints, '/api/todos/events/' (server-
+sent events) and '/api/todos/changes/' (long polling).
+
+A change is announced as the user's todo cache version (see cache.py), which
+every write bumps. The endpoints compare it with the version the client last
+saw, and wait on a subscription for the next write otherwise. Writes call
+publish() once the version is bumped.
+
+The backend is set by settings.TODO_NOTIFICATIONS['BACKEND']:
+
+    LocalBackend    wakes subscribers in the same process as the write; the
+                    default, for a single process.
+    CacheBackend    polls the version in the cache every OPTIONS['INTERVAL']
+                    seconds; for several processes or nodes sharing a cache.
+
+Any class with the same publish() and subscribe() methods can be used, e.g.
+one built on Redis pub/sub.
+"""
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from . import cache as todo_cache
+
+
+class LocalBackend:
+    """
+    In-process publish/subscribe: a write wakes the subscriptions of its
+    user in this process only.
+    """
+
+    def __init__(self):
+        self._subscriptions = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def publish(self, owner_id):
+        with self._lock:
+            events = list(self._subscriptions.get(owner_id, ()))
+        for event in events:
+            event.set()
+
+    @contextmanager
+    def subscribe(self, owner_id):
+        """
+        Subscribes to the user's changes for the duration of the block,
+        yielding a subscription whose wait(timeout) returns True when the
+        user's todos changed since the previous wait() (or the subscription),
+        or False once `timeout` seconds pass without a change.
+        """
+        event = threading.Event()
+        with self._lock:
+            self._subscriptions[owner_id].add(event)
+        try:
+            yield LocalSubscription(event)
+        finally:
+            with self._lock:
+                self._subscriptions[owner_id].discard(event)
+                if not self._subscriptions[owner_id]:
+                    del self._subscriptions[owner_id]
+
+
+class LocalSubscription:
+    def __init__(self, event):
+        self.event = event
+
+    def wait(self, timeout):
+        notified = self.event.wait(timeout)
+        self.event.clear()
+        return notified
+
+
+class CacheBackend:
+    """
+    Notices changes by polling the user's version in the todo cache, so
+    writes made by any process sharing the cache are seen, a little late.
+    """
+
+    def __init__(self, INTERVAL=1):
+        self.interval = INTERVAL
+
+    def publish(self, owner_id):
+        # the write bumped the version in the cache already
+        pass
+
+    @contextmanager
+    def subscribe(self, owner_id):
+        yield CacheSubscription(owner_id, self.interval)
+
+
+class CacheSubscription:
+    def __init__(self, owner_id, interval):
+        self.owner_id = owner_id
+        self.interval = interval
+        self.version = todo_cache.get_version(owner_id)
+
+    def wait(self, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            version = todo_cache.get_version(self.owner_id)
+            if version != self.version:
+                self.version = version
+                return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            time.sleep(min(self.interval, remaining))
+
+
+@lru_cache(maxsize=None)
+def get_backend():
+    options = settings.TODO_NOTIFICATIONS
+    return import_string(options['BACKEND'])(**options.get('OPTIONS', {}))
+
+
+def publish(owner_id):
+    get_backend().publish(owner_id)
+
+
+def subscribe(owner_id):
+    return get_backend().subscribe(owner_id)
+
+
+def iter_events(owner_id, last_version, subscription):
+    """
+    Yields a server-sent event with the user's version whenever it differs
+    from the last one sent, starting from `last_version`, and a comment to
+    keep the connection open after HEARTBEAT seconds without one. Ends after
+    MAX_DURATION seconds, when the client reconnects with the last id.
+    """
+    options = settings.TODO_NOTIFICATIONS
+    deadline = time.monotonic() + options['MAX_DURATION']
+    yield 'retry: %d\n\n' % options['RETRY_MS']
+    while True:
+        version = todo_cache.get_version(owner_id)
+        if str(version) != last_version:
+            last_version = str(version)
+            yield 'id: %s\nevent: todos\ndata: {"version": %s}\n\n' % (version, version)
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        if not subscription.wait(min(options['HEARTBEAT'], remaining)):
+            yield ': keep-alive\n\n'
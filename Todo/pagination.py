@@ -0,0 +1,148 @@
+import base64
+import binascii
+import datetime
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+# the range of a BigIntegerField, the widest integer column; the database
+# driver raises OverflowError for a number outside of it
+MIN_INTEGER, MAX_INTEGER = -2 ** 63, 2 ** 63 - 1
+
+
+def is_integer(value):
+    """
+    Returns whether `value` is an int, and not a bool, that fits in an
+    integer column.
+    """
+    return isinstance(value, int) and not isinstance(value, bool) and MIN_INTEGER <= value <= MAX_INTEGER
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination keyed on an (ordering field, id) pair.
+
+    Instead of an OFFSET, every page after the first is fetched with a WHERE
+    clause on the last row of the previous page, so with a matching index
+    page N costs the same as page 1. The id is used as a tie-breaker so rows
+    sharing the same ordering value are never skipped or repeated.
+    """
+
+    cursor_query_param = 'cursor'
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    ordering = ('-created', '-id')
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(view)
+
+        queryset = queryset.order_by(*self.ordering)
+        cursor = self.decode_cursor(request, queryset.model)
+        if cursor is not None:
+            queryset = queryset.filter(self.get_position_filter(cursor))
+
+        # fetch one extra row to find out whether there is a next page
+        results = list(queryset[:self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        return self.page
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {
+                    'type': 'string',
+                    'nullable': True,
+                },
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_ordering(self, view):
+        """
+        Views may override the default ordering with a `get_ordering()`
+        method returning a (field, id) pair such as ('-created', '-id').
+        """
+        if view is not None and hasattr(view, 'get_ordering'):
+            return tuple(view.get_ordering())
+        return self.ordering
+
+    def get_position_filter(self, cursor):
+        value, pk = cursor
+        field, id_field = self.ordering
+        field_lookup = 'lt' if field.startswith('-') else 'gt'
+        id_lookup = 'lt' if id_field.startswith('-') else 'gt'
+        field_name = field.lstrip('-')
+        # (field < value) OR (field = value AND id < pk), written with a
+        # leading range condition so the database can seek into the index
+        return Q(**{'%s__%se' % (field_name, field_lookup): value}) & (
+            Q(**{'%s__%s' % (field_name, field_lookup): value}) |
+            Q(**{'id__%s' % id_lookup: pk})
+        )
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        last = self.page[-1]
+        field_name = self.ordering[0].lstrip('-')
+        url = self.request.build_absolute_uri()
+        cursor = self.encode_cursor(getattr(last, field_name), last.id)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def encode_cursor(self, value, pk):
+        if isinstance(value, (datetime.datetime, datetime.date)):
+            value = value.isoformat()
+        payload = json.dumps([self.ordering[0], value, pk], separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            payload = base64.urlsafe_b64decode(encoded.encode('ascii'))
+            ordering, value, pk = json.loads(payload.decode('utf-8'))
+        except (TypeError, ValueError, UnicodeError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+
+        # a cursor is only meaningful for the ordering it was produced with
+        if ordering != self.ordering[0] or not is_integer(pk):
+            raise NotFound(self.invalid_cursor_message)
+
+        field = model._meta.get_field(ordering.lstrip('-'))
+        try:
+            value = field.to_python(value)
+        except (DjangoValidationError, TypeError, ValueError):
+            # e.g. a number or a list where a date is expected
+            raise NotFound(self.invalid_cursor_message)
+        if value is None or (isinstance(value, int) and not is_integer(value)):
+            raise NotFound(self.invalid_cursor_message)
+        return value, pk
@@ -0,0 +1,45 @@
+import codecs
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+from .importer import iter_csv_rows, iter_ndjson_rows
+
+
+def iter_decoded(stream, encoding):
+    """
+    Decodes the chunks of `stream` as they are read, raising ParseError
+    rather than UnicodeDecodeError on bytes that are not valid `encoding`.
+    """
+    try:
+        yield from codecs.iterdecode(stream, encoding)
+    except UnicodeDecodeError as exc:
+        raise ParseError('The body is not valid %s - %s' % (encoding, exc.reason))
+    except LookupError:
+        raise ParseError('Unknown charset %s.' % encoding)
+
+
+class NDJSONParser(BaseParser):
+    """
+    Parses newline-delimited JSON lazily, into an iterator of rows that
+    reads the request body as it goes.
+    """
+
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', settings.DEFAULT_CHARSET)
+        return iter_ndjson_rows(iter_decoded(stream, encoding))
+
+
+class CSVParser(BaseParser):
+    """
+    Parses CSV with a header row lazily, into an iterator of dicts.
+    """
+
+    media_type = 'text/csv'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', settings.DEFAULT_CHARSET)
+        return iter_csv_rows(iter_decoded(stream, encoding))
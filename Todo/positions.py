@@ -0,0 +1,85 @@
+"""
+Manual ordering of todos.
+
+Each todo has an integer `position`, unique in practice within its owner's
+list, and new todos go to the end of the list, GAP past the last one. The
+gaps leave room to move a todo between two others by giving it the
+midpoint of their positions, which writes that todo's row alone. Only once
+two neighbours are adjacent integers is the owner's list renumbered, GAP
+apart again; halving a gap of 2 ** 16 takes 16 moves into the same spot
+before that happens.
+
+Positions are integers rather than fractions so that they stay exact and
+the API's JSON stays free of floats.
+"""
+from django.db import transaction
+from django.db.models import Max, Q
+from django.utils import timezone
+
+from .models import Todo
+from .sync import next_seqs
+
+
+GAP = 1 << 16
+
+
+def next_positions(owner_id, count=1):
+    """
+    Returns the positions for `count` todos added to the end of the user's
+    list. Call it in the transaction that creates them.
+    """
+    last = Todo.objects.filter(owner_id=owner_id).aggregate(last=Max('position'))['last'] or 0
+    return [last + GAP * i for i in range(1, count + 1)]
+
+
+def move(todo, before=None, after=None):
+    """
+    Moves `todo` to just before the todo `before` or just after the todo
+    `after`, both of the same owner, saving its new position. Returns the
+    number of rows written: 1, unless the list had to be renumbered.
+    """
+    if (before is None) == (after is None):
+        raise ValueError('Expected one of before or after.')
+    anchor = before if before is not None else after
+    with transaction.atomic():
+        others = Todo.objects.filter(owner_id=todo.owner_id).exclude(pk=todo.pk)
+        # the range on position lets the index seek straight to the anchor
+        if after is not None:
+            neighbour = (others.filter(Q(position__gt=anchor.position) | Q(id__gt=anchor.id),
+                                       position__gte=anchor.position)
+                         .order_by('position', 'id').values_list('position', flat=True).first())
+            low, high = anchor.position, neighbour if neighbour is not None else anchor.position + 2 * GAP
+        else:
+            neighbour = (others.filter(Q(position__lt=anchor.position) | Q(id__lt=anchor.id),
+                                       position__lte=anchor.position)
+                         .order_by('-position', '-id').values_list('position', flat=True).first())
+            low, high = neighbour if neighbour is not None else anchor.position - 2 * GAP, anchor.position
+        if high - low >= 2:
+            todo.position = (low + high) // 2
+            todo.updated = timezone.now()
+            todo.seq, = next_seqs(todo.owner_id)
+            Todo.objects.filter(pk=todo.pk).update(position=todo.position, updated=todo.updated, seq=todo.seq)
+            return 1
+        return renumber(todo, anchor, after is not None)
+
+
+def renumber(todo, anchor, after):
+    """
+    Spaces the owner's list GAP apart again, with `todo` placed next to
+    `anchor`. Only the rows whose position changes are written, each with
+    a new number so that the sync feed picks them up.
+    """
+    now = timezone.now()
+    rows = list(Todo.objects.filter(owner_id=todo.owner_id).exclude(pk=todo.pk)
+                .order_by('position', 'id').values_list('id', 'position'))
+    index = [pk for pk, position in rows].index(anchor.pk) + after
+    rows.insert(index, (todo.pk, todo.position))
+    changed = [Todo(pk=pk, position=GAP * i, updated=now)
+               for i, (pk, position) in enumerate(rows, 1) if position != GAP * i or pk == todo.pk]
+    for row, seq in zip(changed, next_seqs(todo.owner_id, len(changed))):
+        row.seq = seq
+        if row.pk == todo.pk:
+            todo.seq = seq
+    Todo.objects.bulk_update(changed, ['position', 'updated', 'seq'], batch_size=1000)
+    todo.position, todo.updated = GAP * (index + 1), now
+    return len(changed)
@@ -0,0 +1,109 @@
+"""
+Full-text search over todo titles and memos.
+
+On SQLite the text is indexed in the FTS5 table Todo_todo_fts, which
+triggers keep in step with Todo_todo on every insert, update and delete,
+bulk writes included. On PostgreSQL a GIN index on the tsvector of the
+two columns serves the same queries and is maintained by the database
+itself. Other databases fall back to a substring match.
+
+Migrations create the index with create_search_index(). On SQLite, any
+later migration that makes Django rebuild Todo_todo drops the triggers
+with the old table, so it has to run create_search_index() again.
+"""
+import re
+from functools import reduce
+from operator import and_
+
+from django.db import connections
+from django.db.models import BooleanField, Q
+from django.db.models.expressions import RawSQL
+
+# the FTS5 tokenizer splits on everything but letters and digits; matching
+# words the same way keeps FTS5 query syntax out of the user's input
+WORDS = re.compile(r'[^\W_]+')
+
+SEARCH_INDEX_SQL = {
+    'sqlite': [
+        # an external content table: the text itself stays in Todo_todo. The
+        # owner is indexed too, so that FTS5 intersects the owner's rows with
+        # the matches instead of SQLite collecting every user's matches
+        """CREATE VIRTUAL TABLE IF NOT EXISTS "Todo_todo_fts"
+            USING fts5(title, memo, owner_id, content='Todo_todo', content_rowid='id')""",
+        """CREATE TRIGGER IF NOT EXISTS "Todo_todo_fts_insert" AFTER INSERT ON "Todo_todo" BEGIN
+            INSERT INTO "Todo_todo_fts" (rowid, title, memo, owner_id)
+                VALUES (new.id, new.title, new.memo, new.owner_id);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS "Todo_todo_fts_delete" AFTER DELETE ON "Todo_todo" BEGIN
+            INSERT INTO "Todo_todo_fts" ("Todo_todo_fts", rowid, title, memo, owner_id)
+                VALUES ('delete', old.id, old.title, old.memo, old.owner_id);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS "Todo_todo_fts_update"
+                AFTER UPDATE OF title, memo, owner_id ON "Todo_todo" BEGIN
+            INSERT INTO "Todo_todo_fts" ("Todo_todo_fts", rowid, title, memo, owner_id)
+                VALUES ('delete', old.id, old.title, old.memo, old.owner_id);
+            INSERT INTO "Todo_todo_fts" (rowid, title, memo, owner_id)
+                VALUES (new.id, new.title, new.memo, new.owner_id);
+        END""",
+        # index whatever is already there, or was written while the triggers were missing
+        """INSERT INTO "Todo_todo_fts" ("Todo_todo_fts") VALUES ('rebuild')""",
+    ],
+    'postgresql': [
+        """CREATE INDEX IF NOT EXISTS "todo_search_idx" ON "Todo_todo"
+            USING gin (to_tsvector('simple', "title" || ' ' || "memo"))""",
+    ],
+}
+
+DROP_SEARCH_INDEX_SQL = {
+    'sqlite': [
+        'DROP TRIGGER IF EXISTS "Todo_todo_fts_update"',
+        'DROP TRIGGER IF EXISTS "Todo_todo_fts_delete"',
+        'DROP TRIGGER IF EXISTS "Todo_todo_fts_insert"',
+        'DROP TABLE IF EXISTS "Todo_todo_fts"',
+    ],
+    'postgresql': [
+        'DROP INDEX IF EXISTS "todo_search_idx"',
+    ],
+}
+
+SQLITE_MATCH = 'SELECT rowid FROM "Todo_todo_fts" WHERE "Todo_todo_fts" MATCH %s'
+
+# must match the expression of todo_search_idx for the index to be used
+POSTGRESQL_MATCH = (
+    "to_tsvector('simple', \"Todo_todo\".\"title\" || ' ' || \"Todo_todo\".\"memo\") "
+    "@@ plainto_tsquery('simple', %s)"
+)
+
+
+def create_search_index(apps, schema_editor):
+    """
+    Creates the full-text index for the database in use, or brings it up
+    to date if it exists. For use with migrations.RunPython.
+    """
+    for statement in SEARCH_INDEX_SQL.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    for statement in DROP_SEARCH_INDEX_SQL.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement)
+
+
+def search_todos(queryset, owner_id, text):
+    """
+    Narrows `queryset`, of todos owned by `owner_id`, to those whose title
+    or memo contains every word of `text`. Text without any words leaves the
+    queryset as it is.
+    """
+    words = WORDS.findall(text)
+    if not words:
+        return queryset
+
+    vendor = connections[queryset.db].vendor
+    if vendor == 'sqlite':
+        match = 'owner_id : "%d" AND {title memo} : (%s)' % (
+            owner_id, ' '.join('"%s"' % word for word in words))
+        return queryset.filter(id__in=RawSQL(SQLITE_MATCH, [match]))
+    if vendor == 'postgresql':
+        return queryset.filter(RawSQL(POSTGRESQL_MATCH, [' '.join(words)], output_field=BooleanField()))
+    return queryset.filter(reduce(and_, (Q(title__icontains=word) | Q(memo__icontains=word) for word in words)))
@@ -1,9 +1,266 @@
+import itertools
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import prefetch_related_objects
+from django.utils import timezone
 from rest_framework import serializers
 
-from .models import Todo
+from .models import Tag, Todo, TodoList
+
+
+# the fields exposed by the API, in output order
+TODO_FIELDS = ['id', 'title', 'memo', 'created', 'date_completed', 'due_date', 'priority', 'position', 'list', 'tags']
+# the fields listed unless others are asked for with ?fields=; memos can be
+# long and list views seldom show them
+TODO_SUMMARY_FIELDS = ['id', 'title', 'created', 'date_completed', 'due_date', 'priority', 'position', 'list', 'tags']
+TODO_DATETIME_FIELDS = {'created', 'date_completed'}
+TODO_DATE_FIELDS = {'due_date'}
+
+
+def get_columns(fields):
+    """
+    Returns the columns to read with values_list() to output `fields`: all
+    of them but the tags, which are not a column, plus the id when the tags
+    are asked for without it, since they are looked up by todo id.
+    """
+    columns = [name for name in fields if name != 'tags']
+    if 'tags' in fields and 'id' not in columns:
+        columns.append('id')
+    return columns
+
+
+def get_tag_names(todo_ids):
+    """
+    Returns {todo id: [tag name, ...]} for the todos in `todo_ids` that have
+    tags, ordered as Tag is, with a single query.
+    """
+    names = {}
+    rows = (Todo.tags.through.objects.filter(todo_id__in=todo_ids).order_by('tag__name')
+            .values_list('todo_id', 'tag__name'))
+    for todo_id, name in rows:
+        names.setdefault(todo_id, []).append(name)
+    return names
+
+
+def set_tags(todos, tag_lists, replace=True):
+    """
+    Replaces the tags of every todo whose entry in `tag_lists` is not None,
+    with one query to delete and one to insert for all of them, then reads
+    the tags of all of `todos` for their representation with one more.
+    Pass `replace=False` for new todos, which have no tags to delete.
+    """
+    changed = [(todo, {tag.pk: tag for tag in tags}) for todo, tags in zip(todos, tag_lists) if tags is not None]
+    if changed:
+        through = Todo.tags.through
+        if replace:
+            through.objects.filter(todo_id__in=[todo.pk for todo, tags in changed]).delete()
+        through.objects.bulk_create([through(todo_id=todo.pk, tag_id=tag_id) for todo, tags in changed for tag_id in tags])
+        for todo, tags in changed:
+            getattr(todo, '_prefetched_objects_cache', {}).pop('tags', None)
+    prefetch_related_objects(todos, 'tags')
+
+
+class BulkTodoListSerializer(serializers.ListSerializer):
+    """
+    Saves a list of todos with one bulk query per operation instead of one
+    query per todo.
+    """
+
+    def create(self, validated_data):
+        tag_lists = [attrs.pop('tags', None) for attrs in validated_data]
+        todos = [Todo(**attrs) for attrs in validated_data]
+        if connection.features.can_return_rows_from_bulk_insert:
+            todos = Todo.objects.bulk_create(todos)
+        else:
+            # without RETURNING support bulk_create can't hand back the new ids,
+            # which the response needs, so fall back to one INSERT per todo
+            for todo in todos:
+                todo.save()
+        set_tags(todos, tag_lists, replace=False)
+        return todos
+
+    def update(self, instances, validated_data):
+        fields = set()
+        tag_lists = [attrs.pop('tags', None) for attrs in validated_data]
+        # bulk_update() skips pre_save(), so `updated` has to be set by hand
+        now = timezone.now()
+        for instance, attrs in zip(instances, validated_data):
+            for attr, value in attrs.items():
+                setattr(instance, attr, value)
+            instance.updated = now
+            fields.update(attrs)
+        if fields or any(tags is not None for tags in tag_lists):
+            Todo.objects.bulk_update(instances, fields | {'updated'})
+        set_tags(instances, tag_lists)
+        return instances
+
+
+class OwnedRelatedFieldMixin:
+    """
+    Limits the choices of a related field to the objects of the todos'
+    owner: the request's user, or `owner_id` in the serializer context.
+    """
+
+    def get_queryset(self):
+        context = self.context
+        owner_id = context['owner_id'] if 'owner_id' in context else context['request'].user.id
+        return super().get_queryset().filter(owner_id=owner_id)
+
+
+class OwnedPrimaryKeyRelatedField(OwnedRelatedFieldMixin, serializers.PrimaryKeyRelatedField):
+    pass
+
+
+class OwnedSlugRelatedField(OwnedRelatedFieldMixin, serializers.SlugRelatedField):
+    pass
 
 
 class TodoSerializer(serializers.ModelSerializer):
+    """
+    Pass `fields` to output only some of TODO_FIELDS.
+
+    Tags are read and written by name. Prefetch them, with
+    prefetch_related('tags'), when serializing more than one todo.
+    """
+
+    list = OwnedPrimaryKeyRelatedField(queryset=TodoList.objects.all(), allow_null=True, required=False)
+    tags = OwnedSlugRelatedField(many=True, slug_field='name', queryset=Tag.objects.all(), required=False)
+
     class Meta:
         model = Todo
-        fields = ['id', 'title', 'memo', 'created', 'date_completed']
\ No newline at end of file
+        fields = TODO_FIELDS
+        # set by moving the todo, see positions.py
+        read_only_fields = ['position']
+        list_serializer_class = BulkTodoListSerializer
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class TodoListSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = TodoList
+        fields = ['id', 'name', 'created', 'todo_count']
+        read_only_fields = ['todo_count']
+
+
+class TagSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Tag
+        fields = ['id', 'name']
+
+    def validate_name(self, value):
+        tags = Tag.objects.filter(owner_id=self.context['request'].user.id, name=value)
+        if self.instance is not None:
+            tags = tags.exclude(pk=self.instance.pk)
+        if tags.exists():
+            raise serializers.ValidationError('You already have a tag with this name.')
+        return value
+
+
+def format_datetime(value, tz):
+    """
+    Formats a datetime exactly like DRF's DateTimeField with the default
+    ISO 8601 format.
+    """
+    if value is None:
+        return None
+    if tz is not None and value.tzinfo is not None and value.tzinfo is not tz:
+        value = value.astimezone(tz)
+    value = value.isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+
+def format_date(value):
+    """
+    Formats a date like DRF's DateField with the default ISO 8601 format.
+    """
+    return value.isoformat() if value is not None else None
+
+
+class TodoRowSerializer:
+    """
+    Read-only, list-only counterpart of TodoSerializer. It formats the rows
+    of a `values_list(*get_columns(fields))` queryset in a single loop
+    instead of going through a serializer field per value. The output is
+    identical to `TodoSerializer(many=True, fields=fields).data`.
+
+    `fields` defaults to TODO_FIELDS, and are in TODO_FIELDS order. Rows may
+    carry extra columns after them, e.g. the ones pagination needs, which
+    are left out. The tags are read with one query per `chunk_size` rows,
+    by default one for all of them.
+    """
+
+    def __init__(self, rows, fields=TODO_FIELDS, chunk_size=None):
+        self.rows = rows
+        self.fields = fields
+        self.chunk_size = chunk_size
+
+    @property
+    def data(self):
+        return list(self.iter_data())
+
+    def iter_data(self):
+        """
+        Yields the representation of each row in turn, for streaming.
+        """
+        tz = timezone.get_current_timezone() if settings.USE_TZ else None
+        if self.fields != TODO_FIELDS:
+            yield from self.iter_sparse_data(tz)
+            return
+        for (pk, title, memo, created, date_completed, due_date, priority, position, list_id), tags in \
+                self.iter_tagged_rows():
+            yield {
+                'id': pk,
+                'title': title,
+                'memo': memo,
+                'created': format_datetime(created, tz),
+                'date_completed': format_datetime(date_completed, tz),
+                'due_date': format_date(due_date),
+                'priority': priority,
+                'position': position,
+                'list': list_id,
+                'tags': tags,
+            }
+
+    def iter_sparse_data(self, tz):
+        formatters = dict.fromkeys(TODO_DATETIME_FIELDS, lambda value: format_datetime(value, tz))
+        formatters.update(dict.fromkeys(TODO_DATE_FIELDS, format_date))
+        columns = [(i, name, formatters.get(name)) for i, name in enumerate(get_columns(self.fields))
+                   if name in self.fields]
+        if 'tags' not in self.fields:
+            for row in self.rows:
+                yield {
+                    name: formatter(row[i]) if formatter is not None else row[i]
+                    for i, name, formatter in columns
+                }
+            return
+        for row, tags in self.iter_tagged_rows():
+            data = {
+                name: formatter(row[i]) if formatter is not None else row[i]
+                for i, name, formatter in columns
+            }
+            # last in TODO_FIELDS order
+            data['tags'] = tags
+            yield data
+
+    def iter_tagged_rows(self):
+        """
+        Yields each row with the names of its todo's tags, read a chunk of
+        rows at a time.
+        """
+        id_index = get_columns(self.fields).index('id')
+        rows = iter(self.rows)
+        while True:
+            chunk = list(itertools.islice(rows, self.chunk_size))
+            if not chunk:
+                return
+            names = get_tag_names([row[id_index] for row in chunk])
+            for row in chunk:
+                yield row, names.get(row[id_index], [])
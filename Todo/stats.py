@@ -0,0 +1,173 @@
+"""
+Per-user todo counters.
+
+Every write path reports how many todos it opened and completed, positive
+or negative, with record_changes() inside the transaction of the write, so
+a user's TodoStats row always matches their todos and reading it is a
+single primary key lookup. A missing row is built by counting the todos
+the first time it is needed.
+
+The number of todos in each TodoList is kept the same way: write paths
+report the list ids of the todos they wrote, before and after, with
+record_list_changes().
+
+rebuild_stats() recounts rows from the todo table, and
+find_inconsistencies() reports the rows that disagree with it.
+"""
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Todo, TodoList, TodoStats
+
+
+def count_todos(owner_ids=None):
+    """
+    Counts todos in the database, returning {owner id: (open, completed)}
+    for the owners in `owner_ids`, or for every owner with todos.
+    """
+    queryset = Todo.objects.all()
+    if owner_ids is not None:
+        queryset = queryset.filter(owner_id__in=owner_ids)
+    rows = queryset.order_by().values('owner_id').annotate(
+        open=Count('id', filter=Q(date_completed__isnull=True)),
+        completed=Count('id', filter=Q(date_completed__isnull=False)),
+    )
+    return {row['owner_id']: (row['open'], row['completed']) for row in rows}
+
+
+def completion_changes(before, after):
+    """
+    Returns the record_changes() arguments for todos whose date_completed
+    values went from `before` to `after`, None meaning open. `before` is
+    empty for new todos and `after` is empty for deleted ones.
+    """
+    opened = sum(date is None for date in after) - sum(date is None for date in before)
+    completed = sum(date is not None for date in after) - sum(date is not None for date in before)
+    return {'opened': opened, 'completed': completed}
+
+
+def list_changes(before, after):
+    """
+    Returns the record_list_changes() argument for todos whose list ids
+    went from `before` to `after`, None meaning no list. As with
+    completion_changes(), `before` is empty for new todos and `after` for
+    deleted ones.
+    """
+    changes = Counter(list_id for list_id in after if list_id is not None)
+    changes.subtract(list_id for list_id in before if list_id is not None)
+    return {list_id: change for list_id, change in changes.items() if change}
+
+
+def record_list_changes(changes):
+    """
+    Adds the {list id: change} counts of `changes` to the lists' todo
+    counts, with one UPDATE per list. Call it in the transaction that wrote
+    the todos.
+    """
+    # always in the same order, so concurrent writes lock rows in the same order
+    for list_id, change in sorted(changes.items()):
+        TodoList.objects.filter(pk=list_id).update(todo_count=F('todo_count') + change)
+
+
+def record_changes(owner_id, opened=0, completed=0):
+    """
+    Adds `opened` and `completed` to the user's counts. Call it in the
+    transaction that wrote the todos, after writing them.
+    """
+    if not opened and not completed:
+        return
+    with transaction.atomic():
+        updated = TodoStats.objects.filter(owner_id=owner_id).update(
+            open_count=F('open_count') + opened,
+            completed_count=F('completed_count') + completed,
+        )
+        if not updated and create_stats(owner_id) is None:
+            # created concurrently, before this write was counted
+            record_changes(owner_id, opened, completed)
+
+
+def create_stats(owner_id):
+    """
+    Creates the user's row from a count of their todos, which includes any
+    written so far in the current transaction. Returns None if the row
+    already exists.
+    """
+    open_count, completed_count = count_todos([owner_id]).get(owner_id, (0, 0))
+    try:
+        with transaction.atomic():
+            return TodoStats.objects.create(owner_id=owner_id, open_count=open_count,
+                                            completed_count=completed_count)
+    except IntegrityError:
+        return None
+
+
+def get_stats(owner_id):
+    stats = TodoStats.objects.filter(owner_id=owner_id).first()
+    if stats is None:
+        stats = create_stats(owner_id) or TodoStats.objects.get(owner_id=owner_id)
+    return stats
+
+
+def rebuild_stats(owner_ids=None):
+    """
+    Recounts the rows of the users in `owner_ids`, or of everyone, from
+    scratch. Returns the number of rows written.
+    """
+    with transaction.atomic():
+        rows = TodoStats.objects.all()
+        if owner_ids is not None:
+            rows = rows.filter(owner_id__in=owner_ids)
+        rows.delete()
+        counts = count_todos(owner_ids)
+        for owner_id in owner_ids or ():
+            counts.setdefault(owner_id, (0, 0))
+        TodoStats.objects.bulk_create([
+            TodoStats(owner_id=owner_id, open_count=open_count, completed_count=completed_count)
+            for owner_id, (open_count, completed_count) in counts.items()
+        ], batch_size=1000)
+        lists = TodoList.objects.all()
+        if owner_ids is not None:
+            lists = lists.filter(owner_id__in=owner_ids)
+        lists.update(todo_count=Coalesce(Subquery(count_list_todos()), 0))
+    return len(counts)
+
+
+def count_list_todos():
+    """
+    Returns a subquery counting the todos of the outer query's list.
+    """
+    return (Todo.objects.filter(list_id=OuterRef('pk')).order_by().values('list_id')
+            .annotate(count=Count('id')).values('count'))
+
+
+def find_inconsistencies(owner_ids=None):
+    """
+    Compares stored rows with a fresh count, returning
+    [(owner id, stored (open, completed), counted (open, completed))] for
+    every row that is wrong.
+    """
+    rows = TodoStats.objects.order_by('owner_id')
+    if owner_ids is not None:
+        rows = rows.filter(owner_id__in=owner_ids)
+    counts = count_todos(owner_ids)
+    mismatches = []
+    for owner_id, open_count, completed_count in rows.values_list('owner_id', 'open_count', 'completed_count'):
+        counted = counts.get(owner_id, (0, 0))
+        if (open_count, completed_count) != counted:
+            mismatches.append((owner_id, (open_count, completed_count), counted))
+    return mismatches
+
+
+def find_list_inconsistencies(owner_ids=None):
+    """
+    Returns [(list id, stored count, counted)] for every list whose todo
+    count is wrong.
+    """
+    lists = TodoList.objects.order_by('id')
+    if owner_ids is not None:
+        lists = lists.filter(owner_id__in=owner_ids)
+    lists = lists.annotate(counted=Coalesce(Subquery(count_list_todos()), 0))
+    return [row for row in lists.values_list('id', 'todo_count', 'counted') if row[1] != row[2]]
@@ -0,0 +1,88 @@
+"""
+The per-user change sequence behind the sync feed.
+
+Every write to a user's todos takes the next numbers of their sequence
+with next_seqs(), in the transaction of the write, and stores one on each
+todo it changes and each tombstone it leaves. Taking numbers updates the
+user's TodoSyncState row, which stays locked until the transaction ends,
+so a user's writes commit in the order of their numbers. Once a client has
+seen a number, every change numbered below it has been committed, however
+long it took: a cursor made of the last number seen never skips a change,
+unlike one made of a timestamp.
+
+Tombstones are kept for TODO_SYNC['TOMBSTONE_MAX_AGE'] seconds and then
+deleted by prune_tombstones(), which records the highest number it deleted
+as the user's `pruned_seq`. A cursor below it may have missed deletions,
+so a client holding one has to sync from scratch.
+"""
+import datetime
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Max, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import Todo, TodoSyncState, TodoTombstone
+
+
+# the largest number a BigIntegerField holds
+MAX_SEQ = 2 ** 63 - 1
+
+
+def next_seqs(owner_id, count=1):
+    """
+    Returns the next `count` numbers of the user's change sequence. Call it
+    in the transaction that writes the changes they number.
+    """
+    if not count:
+        return []
+    with transaction.atomic():
+        if TodoSyncState.objects.filter(owner_id=owner_id).update(last_seq=F('last_seq') + count):
+            last = TodoSyncState.objects.filter(owner_id=owner_id).values_list('last_seq', flat=True).get()
+        else:
+            try:
+                with transaction.atomic():
+                    last = TodoSyncState.objects.create(owner_id=owner_id, last_seq=count).last_seq
+            except IntegrityError:
+                # created concurrently
+                return next_seqs(owner_id, count)
+    return list(range(last - count + 1, last + 1))
+
+
+def mark_changed(queryset, owner_id, **values):
+    """
+    Sets `values` on the user's todos in `queryset` and gives each of them
+    a new number, so that the sync feed returns them again. For writes that
+    change todos through another model, like renaming a tag. Call it in the
+    transaction of the write.
+    """
+    ids = list(queryset.values_list('id', flat=True))
+    now = timezone.now()
+    Todo.objects.bulk_update(
+        [Todo(pk=pk, seq=seq, updated=now, **values) for pk, seq in zip(ids, next_seqs(owner_id, len(ids)))],
+        ['seq', 'updated', *values], batch_size=1000)
+
+
+def get_pruned_seq(owner_id):
+    return TodoSyncState.objects.filter(owner_id=owner_id).values_list('pruned_seq', flat=True).first() or 0
+
+
+def prune_tombstones(max_age=None):
+    """
+    Deletes the tombstones older than `max_age` seconds,
+    TODO_SYNC['TOMBSTONE_MAX_AGE'] by default, one owner per transaction.
+    Returns the number deleted.
+    """
+    if max_age is None:
+        max_age = settings.TODO_SYNC['TOMBSTONE_MAX_AGE']
+    cutoff = timezone.now() - datetime.timedelta(seconds=max_age)
+    owners = (TodoTombstone.objects.filter(deleted__lt=cutoff).order_by().values('owner_id')
+              .annotate(seq=Max('seq')).values_list('owner_id', 'seq'))
+    pruned = 0
+    for owner_id, seq in owners:
+        with transaction.atomic():
+            TodoSyncState.objects.get_or_create(owner_id=owner_id, defaults={'last_seq': seq})
+            TodoSyncState.objects.filter(owner_id=owner_id).update(pruned_seq=Greatest('pruned_seq', Value(seq)))
+            pruned += TodoTombstone.objects.filter(owner_id=owner_id, seq__lte=seq).delete()[0]
+    return pruned
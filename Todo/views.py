@@ -1,11 +1,53 @@
-from rest_framework import viewsets
-from rest_framework.permissions import IsAuthenticated
+import datetime
+import re
+import sys
 
-from .models import Todo
-from .serializers import TodoSerializer
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.cache import parse_etags, patch_vary_headers
+from django.utils.dateparse import parse_date
+from rest_framework import status, viewsets
+from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.exceptions import NotFound, ParseError, ValidationError
+from rest_framework.permissions import SAFE_METHODS, IsAuthenticated
+from rest_framework.renderers import BrowsableAPIRenderer
+from rest_framework.response import Response
 
+from core import metrics, routers
+from core.authentication import QueryStringJWTAuthentication
 
-class TodoViewSet(viewsets.ModelViewSet):
+from . import cache as todo_cache
+from . import export
+from . import notifications
+from . import positions
+from . import stats
+from . import sync
+from .filters import TodoFilterBackend
+from .importer import TodoImporter
+from .models import Tag, Todo, TodoList, TodoTombstone
+from .pagination import KeysetPagination, is_integer
+from .parsers import CSVParser, NDJSONParser
+from .renderers import EventStreamRenderer, FastJSONRenderer
+from .serializers import (TODO_FIELDS, TODO_SUMMARY_FIELDS, TagSerializer, TodoListSerializer, TodoRowSerializer,
+                          TodoSerializer, get_columns)
+
+
+class PinToPrimaryMixin:
+    """
+    Keeps the user reading their own writes: after any unsafe request,
+    their reads stay on the primary for DATABASE_REPLICA_PIN_SECONDS. See
+    core/routers.py.
+    """
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if request.method not in SAFE_METHODS and request.user.is_authenticated:
+            routers.pin_to_primary(request.user.id)
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class TodoViewSet(PinToPrimaryMixin, viewsets.ModelViewSet):
     """
     This provides 'list', 'create', 'retrieve', 'update' and 'destroy actions for Todo
     """
@@ -14,10 +56,585 @@ class TodoViewSet(viewsets.ModelViewSet):
     
     queryset = Todo.objects.all()
     serializer_class = TodoSerializer
+    pagination_class = KeysetPagination
+    filter_backends = [TodoFilterBackend]
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
+    # lets FastJSONRenderer use orjson; see its docstring
+    float_free_json = True
+
+    # upper bound on the number of operations accepted by a single batch
+    batch_max_size = 1000
+    # rows fetched from the database at a time while exporting
+    export_chunk_size = 2000
+    # how far ahead the agenda may look, in days, and how many todos it returns at most
+    agenda_max_days = 366
+    agenda_max_size = 500
 
     def get_queryset(self):
         user = self.request.user
-        return Todo.objects.filter(owner=user).order_by('-created')
+        queryset = Todo.objects.filter(owner_id=user.id).order_by('-created', '-id')
+        if self.action == 'retrieve':
+            fields = self.get_output_fields()
+            queryset = queryset.only(*get_columns(fields))
+            if 'tags' in fields:
+                queryset = queryset.prefetch_related('tags')
+        elif self.action in ('update', 'partial_update', 'move'):
+            queryset = queryset.prefetch_related('tags')
+        return queryset
+
+    def get_serializer(self, *args, **kwargs):
+        if self.action == 'retrieve':
+            kwargs.setdefault('fields', self.get_output_fields())
+        return super().get_serializer(*args, **kwargs)
+
+    def get_output_fields(self):
+        """
+        Returns the fields to read and output for 'list', 'agenda' and
+        'retrieve', in TODO_FIELDS order: those named in `?fields=` or, by
+        default, all of them, less the memo for lists.
+        """
+        param = self.request.query_params.get('fields')
+        if param is None:
+            return TODO_SUMMARY_FIELDS if self.action in ('list', 'agenda') else TODO_FIELDS
+        requested = {name.strip() for name in param.split(',')} - {''}
+        if not requested or not requested <= set(TODO_FIELDS):
+            raise ValidationError({'fields': 'Expected a comma-separated list of: %s.' % ', '.join(TODO_FIELDS)})
+        return [name for name in TODO_FIELDS if name in requested]
+
+    def get_ordering(self):
+        return TodoFilterBackend().get_ordering(self.request)
+
+    def list(self, request, *args, **kwargs):
+        with routers.read_from_replica(request.user.id):
+            return self.cached_response(self.list_rows, request, *args, **kwargs)
+
+    def list_rows(self, request, *args, **kwargs):
+        """
+        Read-optimized list: fetches plain rows with values_list() and formats
+        them with TodoRowSerializer rather than the validating serializer.
+        Only the output fields are read, plus those the cursor is built from.
+        """
+        fields = self.get_output_fields()
+        ordering_field = self.get_ordering()[0].lstrip('-')
+        columns = get_columns(fields)
+        columns += [name for name in ('id', ordering_field) if name not in columns]
+        queryset = self.filter_queryset(self.get_queryset()).values_list(*columns, named=True)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            with metrics.span('serialize'):
+                data = TodoRowSerializer(page, fields).data
+            return self.get_paginated_response(data)
+        with metrics.span('serialize'):
+            return Response(TodoRowSerializer(queryset, fields).data)
+
+    def retrieve(self, request, *args, **kwargs):
+        with routers.read_from_replica(request.user.id):
+            return self.cached_response(super().retrieve, request, *args, **kwargs)
+
+    def cached_response(self, action, request, *args, **kwargs):
+        """
+        Serves a read from the per-user response cache, or with a 304 if the
+        client already has the current version, and caches the response
+        built by `action` otherwise.
+        """
+        etag = todo_cache.get_etag(request)
+        if etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+            metrics.todo_cache_requests.inc('not_modified')
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+        data = todo_cache.get_response_data(etag)
+        if data is not None:
+            metrics.todo_cache_requests.inc('hit')
+            response = Response(data)
+        else:
+            metrics.todo_cache_requests.inc('miss')
+            response = action(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            todo_cache.set_response_data(etag, response.data)
+        response['ETag'] = etag
+        return response
 
     def perform_create(self, serializer):
-        serializer.save(owner=self.request.user)
+        with transaction.atomic():
+            position, = positions.next_positions(self.request.user.id)
+            seq, = sync.next_seqs(self.request.user.id)
+            todo = serializer.save(owner_id=self.request.user.id, position=position, seq=seq)
+            stats.record_changes(self.request.user.id, **stats.completion_changes((), [todo.date_completed]))
+            stats.record_list_changes(stats.list_changes((), [todo.list_id]))
+        todos_changed(self.request.user.id)
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            locked = lock_todos([serializer.instance.pk])
+            if not locked:
+                # deleted since it was loaded
+                raise NotFound()
+            before, before_list_id = locked[serializer.instance.pk]
+            seq, = sync.next_seqs(self.request.user.id)
+            todo = serializer.save(seq=seq)
+            stats.record_changes(self.request.user.id, **stats.completion_changes([before], [todo.date_completed]))
+            stats.record_list_changes(stats.list_changes([before_list_id], [todo.list_id]))
+        todos_changed(self.request.user.id)
+
+    def perform_destroy(self, instance):
+        delete_todos(Todo.objects.filter(pk=instance.pk), self.request.user.id)
+        todos_changed(self.request.user.id)
+
+    @action(detail=False, methods=['post'])
+    def batch(self, request):
+        """
+        Apply a batch of creates, updates and deletes in one transaction:
+
+            {"create": [{...}, ...], "update": [{"id": 1, ...}, ...], "delete": [2, 3]}
+
+        Updates are partial. Either every operation is applied or, if any of
+        them is invalid, none is and the errors are returned per item.
+        """
+        if not isinstance(request.data, dict):
+            raise ValidationError({'detail': 'Expected an object with "create", "update" and "delete" lists.'})
+        creates = self._get_batch_list(request.data, 'create')
+        updates = self._get_batch_list(request.data, 'update')
+        deletes = self._get_batch_list(request.data, 'delete')
+        if len(creates) + len(updates) + len(deletes) > self.batch_max_size:
+            raise ValidationError({'detail': 'A batch may contain at most %d operations.' % self.batch_max_size})
+
+        errors = {}
+
+        create_serializer = self.get_serializer(data=creates, many=True)
+        if not create_serializer.is_valid():
+            errors['create'] = create_serializer.errors
+
+        update_ids = [item.get('id') if isinstance(item, dict) else None for item in updates]
+        owned = self.get_queryset().in_bulk([pk for pk in update_ids if is_integer(pk)])
+        id_errors = self._get_id_errors(update_ids, owned)
+        instances = [owned.get(pk) for pk in update_ids]
+        update_serializer = self.get_serializer(instances, data=updates, many=True, partial=True)
+        update_valid = update_serializer.is_valid()
+        if any(id_errors) or not update_valid:
+            field_errors = update_serializer.errors if not update_valid else [{} for _ in updates]
+            errors['update'] = [dict(field_error, **id_error) for field_error, id_error in zip(field_errors, id_errors)]
+
+        owned_ids = set(self.get_queryset().filter(id__in=[pk for pk in deletes if is_integer(pk)])
+                        .values_list('id', flat=True))
+        delete_errors = self._get_id_errors(deletes, owned_ids)
+        if any(delete_errors):
+            errors['delete'] = [error.get('id', []) for error in delete_errors]
+
+        if errors:
+            raise ValidationError(errors)
+
+        with transaction.atomic():
+            locked = lock_todos([instance.pk for instance in instances])
+            if len(locked) < len(instances):
+                raise ValidationError({'update': [{} if instance.pk in locked else {'id': ['Not found.']}
+                                                  for instance in instances]})
+            if creates:
+                for attrs, position in zip(create_serializer.validated_data,
+                                           positions.next_positions(request.user.id, len(creates))):
+                    attrs['position'] = position
+            for attrs, seq in zip(create_serializer.validated_data + update_serializer.validated_data,
+                                  sync.next_seqs(request.user.id, len(creates) + len(updates))):
+                attrs['seq'] = seq
+            before = [locked[instance.pk][0] for instance in instances]
+            before_list_ids = [locked[instance.pk][1] for instance in instances]
+            created = create_serializer.save(owner_id=request.user.id)
+            updated = update_serializer.save()
+            stats.record_changes(request.user.id, **stats.completion_changes(
+                before, [todo.date_completed for todo in created + updated]))
+            stats.record_list_changes(stats.list_changes(
+                before_list_ids, [todo.list_id for todo in created + updated]))
+            delete_todos(self.get_queryset().filter(id__in=deletes), request.user.id)
+        todos_changed(request.user.id)
+
+        return Response({
+            'created': create_serializer.data,
+            'updated': update_serializer.data,
+            'deleted': deletes,
+        }, status=status.HTTP_200_OK)
+
+    @action(detail=True, methods=['post'])
+    def move(self, request, pk=None):
+        """
+        Moves the todo to just before or just after another of the user's
+        todos in their manual order (`?ordering=position`), given as
+        `{"before": id}` or `{"after": id}`. Usually only the moved todo's
+        row is written; see positions.py.
+        """
+        todo = self.get_object()
+        keys = [key for key in ('before', 'after') if isinstance(request.data, dict) and key in request.data]
+        if len(keys) != 1:
+            raise ValidationError({'detail': 'Expected an object with either "before" or "after".'})
+        key = keys[0]
+        anchor_id = request.data[key]
+        if not is_integer(anchor_id):
+            raise ValidationError({key: ['A valid integer is required.']})
+        if anchor_id == todo.pk:
+            raise ValidationError({key: ['A todo cannot be moved next to itself.']})
+        anchor = self.get_queryset().filter(pk=anchor_id).first()
+        if anchor is None:
+            raise ValidationError({key: ['Not found.']})
+
+        positions.move(todo, **{key: anchor})
+        todos_changed(request.user.id)
+        return Response(self.get_serializer(todo).data)
+
+    @action(detail=False, methods=['get'])
+    def agenda(self, request):
+        """
+        Returns the user's open todos with a due date, split into those
+        overdue, due today and due in the next `?days=` days (7 by default),
+        each soonest and most important first. `?date=` overrides today's
+        date, for clients whose day differs from the server's, and `?fields=`
+        works as for lists.
+
+        All three come from one query on the agenda index. At most
+        `agenda_max_size` todos are returned, overdue ones first, and
+        `truncated` tells whether some were left out.
+        """
+        errors = {}
+        try:
+            days = int(request.query_params.get('days', 7))
+        except ValueError:
+            days = -1
+        if not 0 <= days <= self.agenda_max_days:
+            errors['days'] = 'Expected an integer from 0 to %d.' % self.agenda_max_days
+        today = timezone.localdate()
+        if request.query_params.get('date'):
+            try:
+                today = parse_date(request.query_params['date'])
+            except ValueError:
+                today = None
+            if today is None:
+                errors['date'] = 'Expected an ISO 8601 date.'
+        if not errors:
+            try:
+                until = today + datetime.timedelta(days=days)
+            except OverflowError:
+                errors['date'] = 'Expected a date at least %d days before the year 10000.' % days
+        if errors:
+            raise ValidationError(errors)
+
+        fields = self.get_output_fields()
+        columns = get_columns(fields)
+        columns += [name for name in ('due_date',) if name not in columns]
+        due_date_index = columns.index('due_date')
+        with routers.read_from_replica(request.user.id):
+            rows = list(
+                self.get_queryset()
+                .filter(date_completed__isnull=True, due_date__isnull=False,
+                        due_date__lte=until)
+                .order_by('due_date', '-priority', 'id')
+                .values_list(*columns)[:self.agenda_max_size + 1]
+            )
+        buckets = {'overdue': [], 'today': [], 'upcoming': []}
+        for row in rows[:self.agenda_max_size]:
+            due_date = row[due_date_index]
+            bucket = 'overdue' if due_date < today else 'today' if due_date == today else 'upcoming'
+            buckets[bucket].append(row)
+
+        data = {'date': today.isoformat()}
+        with metrics.span('serialize'):
+            for bucket, bucket_rows in buckets.items():
+                data[bucket] = TodoRowSerializer(bucket_rows, fields).data
+        data['truncated'] = len(rows) > self.agenda_max_size
+        return Response(data)
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Streams all of the user's todos as a JSON array, or as newline-delimited
+        JSON with `?type=ndjson`, gzipped if the client accepts it. Rows are
+        read from the database in chunks, so memory use stays flat however
+        many todos there are.
+        """
+        export_type = request.query_params.get('type', 'json')
+        if export_type not in EXPORT_TYPES:
+            raise ValidationError({'type': 'Expected one of: %s.' % ', '.join(sorted(EXPORT_TYPES))})
+        content_type, extension, encode = EXPORT_TYPES[export_type]
+
+        rows = self.get_queryset().values_list(*get_columns(TODO_FIELDS)).iterator(chunk_size=self.export_chunk_size)
+        chunks = export.buffered(encode(TodoRowSerializer(rows, chunk_size=self.export_chunk_size).iter_data()))
+        use_gzip = bool(ACCEPTS_GZIP.search(request.META.get('HTTP_ACCEPT_ENCODING', '')))
+        if use_gzip:
+            chunks = export.gzipped(chunks)
+
+        response = StreamingHttpResponse(chunks, content_type=content_type)
+        response['Content-Disposition'] = 'attachment; filename="todos.%s"' % extension
+        patch_vary_headers(response, ['Accept-Encoding'])
+        if use_gzip:
+            response['Content-Encoding'] = 'gzip'
+        return response
+
+    @action(detail=False, methods=['get'], renderer_classes=[FastJSONRenderer, EventStreamRenderer],
+            authentication_classes=[QueryStringJWTAuthentication])
+    def events(self, request):
+        """
+        Server-sent event stream telling the user's clients when their todos
+        change. Each `todos` event carries the user's new version as its id
+        and data, the cue to refetch (with If-None-Match, so unchanged lists
+        cost a 304); the first one is sent on connecting, unless the
+        Last-Event-ID header (or `?last_event_id=`) is already the current
+        version. The access token may be passed as `?token=`, since
+        EventSource cannot set headers.
+
+        Each open stream occupies a server thread until it ends, after
+        TODO_NOTIFICATIONS['MAX_DURATION'] seconds, or until the next
+        heartbeat once the client has disconnected.
+        """
+        last_version = request.META.get('HTTP_LAST_EVENT_ID') or request.query_params.get('last_event_id')
+        subscription = notifications.subscribe(request.user.id)
+
+        def stream():
+            with subscription as subscribed:
+                yield from notifications.iter_events(request.user.id, last_version, subscribed)
+
+        response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        # stop nginx from buffering the stream
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    @action(detail=False, methods=['get'])
+    def changes(self, request):
+        """
+        Long-poll fallback for `events`: answers as soon as the user's version
+        differs from `?since=`, or with `"changed": false` after `?timeout=`
+        seconds (at most TODO_NOTIFICATIONS['LONG_POLL_TIMEOUT'], the
+        default). Send the returned version as `since` next time.
+        """
+        max_timeout = settings.TODO_NOTIFICATIONS['LONG_POLL_TIMEOUT']
+        try:
+            timeout = min(float(request.query_params.get('timeout', max_timeout)), max_timeout)
+        except ValueError:
+            timeout = -1
+        if not timeout >= 0:
+            raise ValidationError({'timeout': 'A valid non-negative number is required.'})
+
+        since = request.query_params.get('since')
+        with notifications.subscribe(request.user.id) as subscription:
+            version = todo_cache.get_version(request.user.id)
+            if str(version) == since and subscription.wait(timeout):
+                version = todo_cache.get_version(request.user.id)
+        return Response({'version': version, 'changed': str(version) != since})
+
+    @action(detail=False, methods=['post'], url_path='import', url_name='import',
+            parser_classes=[NDJSONParser, CSVParser])
+    def import_todos(self, request):
+        """
+        Imports todos from an NDJSON (`application/x-ndjson`) or CSV
+        (`text/csv`, with a header row) request body, a batch at a time.
+
+        Invalid rows are skipped and reported by row number. The response's
+        `position` is the number of rows dealt with; if the import stops part
+        way through, send the same body again with `?start=<position>` to
+        carry on where it left off.
+        """
+        try:
+            start = int(request.query_params.get('start', 0))
+        except ValueError:
+            start = -1
+        # islice() takes no position past sys.maxsize
+        if not 0 <= start <= sys.maxsize:
+            raise ValidationError({'start': 'A valid non-negative integer is required.'})
+
+        importer = TodoImporter(request.user.id, start=start)
+        try:
+            importer.run(request.data)
+        except ParseError as exc:
+            return Response(dict(importer.summary(), detail=exc.detail), status=status.HTTP_400_BAD_REQUEST)
+        except DatabaseError:
+            return Response(dict(importer.summary(), detail='The import was interrupted, resume it from `position`.'),
+                            status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        finally:
+            if importer.imported:
+                todos_changed(request.user.id)
+        return Response(importer.summary())
+
+    def _get_batch_list(self, data, key):
+        items = data.get(key, [])
+        if not isinstance(items, list):
+            raise ValidationError({key: 'Expected a list of items.'})
+        return items
+
+    def _get_id_errors(self, ids, owned):
+        """
+        Returns one error dict per id, empty when the id refers to one of the
+        current user's todos and is not repeated in the batch.
+        """
+        errors, seen = [], set()
+        for pk in ids:
+            if not is_integer(pk):
+                errors.append({'id': ['A valid integer is required.']})
+            elif pk not in owned:
+                errors.append({'id': ['Not found.']})
+            elif pk in seen:
+                errors.append({'id': ['Duplicate id.']})
+            else:
+                errors.append({})
+            seen.add(pk)
+        return errors
+
+
+class TodoListViewSet(PinToPrimaryMixin, viewsets.ModelViewSet):
+    """
+    The current user's todo lists, by name. A list's todos are listed by
+    `/api/todos/?list=<id>`. Deleting a list keeps its todos, without a list.
+    """
+
+    permission_classes = [IsAuthenticated]
+    queryset = TodoList.objects.all()
+    serializer_class = TodoListSerializer
+
+    def get_queryset(self):
+        return TodoList.objects.filter(owner_id=self.request.user.id).order_by('name', 'id')
+
+    def perform_create(self, serializer):
+        serializer.save(owner_id=self.request.user.id)
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            # rather than SET_NULL, so the change shows up in the sync feed
+            sync.mark_changed(Todo.objects.filter(list=instance), self.request.user.id, list=None)
+            instance.delete()
+        todos_changed(self.request.user.id)
+
+
+class TagViewSet(PinToPrimaryMixin, viewsets.ModelViewSet):
+    """
+    The current user's tags, by name. Renaming or deleting a tag changes
+    the todos it is on.
+    """
+
+    permission_classes = [IsAuthenticated]
+    queryset = Tag.objects.all()
+    serializer_class = TagSerializer
+
+    def get_queryset(self):
+        return Tag.objects.filter(owner_id=self.request.user.id)
+
+    def perform_create(self, serializer):
+        serializer.save(owner_id=self.request.user.id)
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            serializer.save()
+            sync.mark_changed(Todo.objects.filter(tags=serializer.instance), self.request.user.id)
+        todos_changed(self.request.user.id)
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            sync.mark_changed(Todo.objects.filter(tags=instance), self.request.user.id)
+            instance.delete()
+        todos_changed(self.request.user.id)
+
+
+# export ?type= -> (content type, file extension, encoder)
+EXPORT_TYPES = {
+    'json': ('application/json', 'json', export.iter_json_array),
+    'ndjson': ('application/x-ndjson', 'ndjson', export.iter_ndjson),
+}
+
+ACCEPTS_GZIP = re.compile(r'\bgzip\b')
+
+
+def todos_changed(owner_id):
+    """
+    Invalidates the user's cached todo responses and notifies their clients
+    listening for changes. Call it after every write to their todos.
+    """
+    todo_cache.bump_version(owner_id)
+    notifications.publish(owner_id)
+
+
+def lock_todos(ids):
+    """
+    Locks the todos in `ids` for the rest of the transaction and returns
+    {id: (date_completed, list_id)} for those that still exist. Write paths
+    count their changes from these rather than from instances loaded before
+    the transaction, which a concurrent write may have changed since.
+    """
+    rows = Todo.objects.select_for_update().filter(id__in=ids).order_by('id')
+    return {pk: (date_completed, list_id) for pk, date_completed, list_id
+            in rows.values_list('id', 'date_completed', 'list_id')}
+
+
+def delete_todos(queryset, owner_id):
+    """
+    Deletes the todos in `queryset`, leaving a tombstone for each one so the
+    deletion shows up in the sync feed.
+    """
+    with transaction.atomic():
+        rows = list(queryset.select_for_update().order_by('id').values_list('id', 'date_completed', 'list_id'))
+        ids = [pk for pk, date_completed, list_id in rows]
+        TodoTombstone.objects.bulk_create([TodoTombstone(todo_id=pk, owner_id=owner_id, seq=seq)
+                                           for pk, seq in zip(ids, sync.next_seqs(owner_id, len(ids)))])
+        Todo.objects.filter(id__in=ids).delete()
+        stats.record_changes(owner_id, **stats.completion_changes(
+            [date_completed for pk, date_completed, list_id in rows], ()))
+        stats.record_list_changes(stats.list_changes([list_id for pk, date_completed, list_id in rows], ()))
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def sync_todos(request):
+    """
+    Returns the todos changed and the ids of the todos deleted since the
+    cursor passed as `?since=`, oldest change first, along with the cursor
+    to send next time. Without a cursor every todo is returned. A response
+    holds at most TODO_SYNC['PAGE_SIZE'] changes; while `more` is true,
+    sync again straight away with the new cursor.
+
+    A cursor from before the oldest tombstones kept is answered with a
+    410, after which the client has to sync from scratch.
+    """
+    since = request.query_params.get('since')
+    if since is not None:
+        try:
+            since = int(since)
+        except ValueError:
+            since = -1
+        if not 0 <= since <= sync.MAX_SEQ:
+            raise ValidationError({'since': 'Expected a cursor returned by a previous sync.'})
+
+    page_size = settings.TODO_SYNC['PAGE_SIZE']
+    changed = Todo.objects.filter(owner_id=request.user.id)
+    deleted = []
+    if since is not None:
+        # tombstones first: every change numbered below the last one read is
+        # committed by now, so the todos read next can't miss any
+        deleted = list(TodoTombstone.objects.filter(owner_id=request.user.id, seq__gt=since)
+                       .order_by('seq').values_list('seq', 'todo_id')[:page_size + 1])
+        # and only then the pruning, in case it deleted some in between
+        if since < sync.get_pruned_seq(request.user.id):
+            return Response({'detail': 'The cursor has expired, sync again without one.'},
+                            status=status.HTTP_410_GONE)
+        changed = changed.filter(seq__gt=since)
+    changed = list(changed.order_by('seq', 'id').prefetch_related('tags')[:page_size + 1])
+
+    changes = sorted([(todo.seq, todo) for todo in changed] + deleted, key=lambda change: change[0])
+    more = len(changes) > page_size
+    changes = changes[:page_size]
+    return Response({
+        'cursor': str(changes[-1][0] if changes else since or 0),
+        'changed': TodoSerializer([todo for seq, todo in changes if isinstance(todo, Todo)], many=True).data,
+        'deleted': [todo_id for seq, todo_id in changes if not isinstance(todo_id, Todo)],
+        'more': more,
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def todo_stats(request):
+    """
+    Returns the user's open and completed todo counts and completion rate,
+    read from their counters rather than counted.
+    """
+    counts = stats.get_stats(request.user.id)
+    total = counts.open_count + counts.completed_count
+    return Response({
+        'open': counts.open_count,
+        'completed': counts.completed_count,
+        'total': total,
+        'completion_rate': round(counts.completed_count / total, 4) if total else 0.0,
+    })
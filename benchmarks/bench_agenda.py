@@ -0,0 +1,112 @@
+"""
+Measure manual reordering and the agenda on lists of each of the --todos
+sizes.
+
+Reordering: POST /api/todos/<id>/move/ with random todos and places, with
+the rows written per move, next to the dense-position alternative of
+shifting every todo after the new place along by one, timed as the single
+UPDATE that takes.
+
+Agenda: GET /api/todos/agenda/ with due dates spread over the year around
+today and half the todos completed, with and without the agenda index.
+
+    python -m benchmarks.bench_agenda --todos 1000 100000 --moves 200
+"""
+import argparse
+import datetime
+import random
+
+from benchmarks.common import auth_headers, make_user, print_table, seed_todos, setup_django, timed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--todos', type=int, nargs='+', default=[1000, 100000])
+    parser.add_argument('--moves', type=int, default=200)
+    parser.add_argument('--requests', type=int, default=50)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.db import connection
+    from django.db.models import F
+    from django.test import Client
+    from django.urls import reverse
+    from django.utils import timezone
+
+    from Todo import positions
+    from Todo.models import Todo
+
+    client = Client()
+    rng = random.Random(0)
+    today = timezone.localdate()
+    agenda_index = next(index for index in Todo._meta.indexes if index.name == 'todo_owner_agenda_idx')
+
+    written = 0
+    move = positions.move
+
+    def counting_move(*args, **kwargs):
+        nonlocal written
+        rows = move(*args, **kwargs)
+        written += rows
+        return rows
+
+    positions.move = counting_move
+
+    move_rows, agenda_rows = [], []
+    for count in args.todos:
+        user = make_user('bench-%d' % count)
+        seed_todos(user, count)
+        headers = auth_headers(user)
+        todos = Todo.objects.filter(owner=user)
+        ids = list(todos.order_by('created', 'id').values_list('id', flat=True))
+        with connection.cursor() as cursor:
+            cursor.executemany('UPDATE "Todo_todo" SET position = %s, due_date = %s, priority = %s WHERE id = %s', [
+                (positions.GAP * i, today + datetime.timedelta(days=rng.randint(-180, 180)), rng.randint(0, 3), pk)
+                for i, pk in enumerate(ids, 1)
+            ])
+        todos.filter(id__in=ids[::2]).update(date_completed=timezone.now())
+
+        def move_todos():
+            for _ in range(args.moves):
+                pk, anchor = rng.sample(ids, 2)
+                response = client.post(reverse('todo-move', args=[pk]), {rng.choice(['before', 'after']): anchor},
+                                       content_type='application/json', **headers)
+                assert response.status_code == 200
+
+        written = 0
+        move_elapsed = timed(move_todos, repeat=3) / args.moves
+        rows_per_move = written / (args.moves * 4)
+
+        url = reverse('todo-agenda')
+
+        def agenda():
+            for _ in range(args.requests):
+                assert client.get(url, **headers).status_code == 200
+
+        data = client.get(url, **headers).json()
+        size = sum(len(data[bucket]) for bucket in ('overdue', 'today', 'upcoming'))
+        indexed = timed(agenda, repeat=3) / args.requests
+        with connection.schema_editor() as schema_editor:
+            schema_editor.remove_index(Todo, agenda_index)
+        unindexed = timed(agenda, repeat=3) / args.requests
+        with connection.schema_editor() as schema_editor:
+            schema_editor.add_index(Todo, agenda_index)
+        agenda_rows.append((count, size, '%.2f' % (indexed * 1000), '%.2f' % (unindexed * 1000)))
+
+        def shift():
+            for _ in range(args.moves):
+                todos.filter(position__gte=positions.GAP * rng.randint(1, count)).update(position=F('position') + 1)
+
+        shift_elapsed = timed(shift, repeat=1) / args.moves
+        move_rows.append((count, '%.2f' % (move_elapsed * 1000), '%.2f' % rows_per_move,
+                          '%.2f' % (shift_elapsed * 1000), count // 2))
+        todos.delete()
+
+    print_table(('todos', 'ms/move', 'rows written/move', 'ms/dense shift', 'rows shifted/move'), move_rows)
+    print()
+    print_table(('todos', 'agenda todos', 'ms indexed', 'ms unindexed'), agenda_rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+"""
+Load test comparing the WSGI and ASGI entry points under many concurrent,
+slow clients.
+
+Each server is started in turn with the same number of worker processes:
+gunicorn for todolist_api.wsgi (threaded workers by default), and uvicorn for
+todolist_api.asgi. Then --connections clients connect at once. Each one
+sends half of its request, waits --slow-ms milliseconds, sends the rest
+and reads the response. The report gives latency percentiles from
+connecting to reading the whole response.
+
+Needs gunicorn and uvicorn:
+
+    pip install gunicorn uvicorn
+    python -m benchmarks.bench_asgi --connections 1000 --workers 2
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.common import auth_headers, make_user, print_table, seed_todos, setup_django
+
+SERVERS = {
+    'wsgi': lambda args, port: [
+        sys.executable, '-m', 'gunicorn', 'todolist_api.wsgi:application', '--bind', '127.0.0.1:%d' % port,
+        '--workers', str(args.workers), '--worker-class', args.wsgi_worker_class, '--threads', str(args.threads),
+        '--backlog', '4096', '--log-level', 'warning',
+    ],
+    'asgi': lambda args, port: [
+        sys.executable, '-m', 'uvicorn', 'todolist_api.asgi:application', '--port', str(port),
+        '--workers', str(args.workers), '--backlog', '4096', '--no-access-log', '--log-level', 'warning',
+    ],
+}
+
+
+async def request(port, path, token, slow):
+    """
+    Makes one request as a slow client, returning its status code and
+    latency in seconds.
+    """
+    start = time.perf_counter()
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    head = ('GET %s HTTP/1.1\r\nHost: localhost\r\nAuthorization: %s\r\n' % (path, token)).encode('ascii')
+    writer.write(head[:len(head) // 2])
+    await writer.drain()
+    await asyncio.sleep(slow)
+    writer.write(head[len(head) // 2:] + b'Connection: close\r\n\r\n')
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    status = int(response.split(b' ', 2)[1]) if response else 0
+    return status, time.perf_counter() - start
+
+
+async def load(port, path, token, connections, slow):
+    results = await asyncio.gather(
+        *[request(port, path, token, slow) for _ in range(connections)], return_exceptions=True)
+    latencies = [result[1] for result in results if not isinstance(result, BaseException) and result[0] == 200]
+    return latencies, len(results) - len(latencies)
+
+
+async def wait_until_up(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.2)
+        else:
+            writer.close()
+            return
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--connections', type=int, default=1000)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--wsgi-worker-class', choices=['gthread', 'sync'], default='gthread')
+    parser.add_argument('--threads', type=int, default=8, help='threads per gthread worker')
+    parser.add_argument('--slow-ms', type=int, default=200)
+    parser.add_argument('--rows', type=int, default=1000, help="todos in the user's list")
+    parser.add_argument('--path', default='/api/todos/')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--servers', nargs='+', choices=sorted(SERVERS), default=['wsgi', 'asgi'])
+    args = parser.parse_args()
+
+    db_name = os.path.join(tempfile.mkdtemp(prefix='todo-bench-'), 'bench.sqlite3')
+    os.environ['TODO_BENCH_DB'] = db_name
+    os.environ['DJANGO_SETTINGS_MODULE'] = 'benchmarks.settings'
+    setup_django(db_name)
+
+    user = make_user('bench')
+    seed_todos(user, args.rows)
+    token = auth_headers(user)['HTTP_AUTHORIZATION']
+
+    rows = []
+    for name in args.servers:
+        server = subprocess.Popen(SERVERS[name](args, args.port))
+        try:
+            asyncio.run(wait_until_up(args.port))
+            # warm up every worker before measuring
+            asyncio.run(load(args.port, args.path, token, args.workers * 10, 0))
+            start = time.perf_counter()
+            latencies, errors = asyncio.run(load(args.port, args.path, token, args.connections, args.slow_ms / 1000))
+            elapsed = time.perf_counter() - start
+        finally:
+            server.terminate()
+            server.wait()
+
+        latencies.sort()
+        if not latencies:
+            rows.append((name, 0, errors) + ('-',) * 5)
+            continue
+        rows.append((name, len(latencies), errors) + tuple(
+            '%.0f' % (value * 1000) for value in (
+                statistics.median(latencies), percentile(latencies, 0.9), percentile(latencies, 0.99),
+                latencies[-1])) + ('%.0f' % (len(latencies) / elapsed),))
+
+    print('%d connections, %d workers, %d ms slow send' % (args.connections, args.workers, args.slow_ms))
+    print_table(('server', 'ok', 'errors', 'p50 (ms)', 'p90 (ms)', 'p99 (ms)', 'max (ms)', 'req/s'), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""
+Compare the todo list endpoint authenticated with simplejwt's
+JWTAuthentication, which loads auth.User on every request, against
+StatelessJWTAuthentication, which builds the user from the token claims.
+
+    python -m benchmarks.bench_auth --todos 50 --requests 500
+"""
+import argparse
+
+from benchmarks.common import auth_headers, make_user, print_table, seed_todos, setup_django, timed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--todos', type=int, default=50)
+    parser.add_argument('--requests', type=int, default=500)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import CaptureQueriesContext
+    from django.urls import reverse
+    from rest_framework_simplejwt.authentication import JWTAuthentication
+
+    from core.authentication import StatelessJWTAuthentication
+    from Todo.views import TodoViewSet
+
+    user = make_user('bench')
+    seed_todos(user, args.todos)
+    client = Client()
+    url = reverse('todo-list')
+
+    rows = []
+    for authentication_class in (JWTAuthentication, StatelessJWTAuthentication):
+        TodoViewSet.authentication_classes = [authentication_class]
+        headers = auth_headers(user)
+
+        def requests():
+            for _ in range(args.requests):
+                client.get(url, **headers)
+
+        with CaptureQueriesContext(connection) as queries:
+            client.get(url, **headers)
+        # captured queries are read lazily, so count them before the log is reset
+        query_count = len(queries)
+        elapsed = timed(requests, repeat=3)
+        rows.append((authentication_class.__name__, query_count,
+                     '%.3f' % (elapsed / args.requests * 1000), '%.0f' % (args.requests / elapsed)))
+
+    print_table(('authentication', 'queries/request', 'ms/request', 'requests/s'), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""
+Compare creating, updating and deleting todos one request per item with
+doing the same through a single POST to /api/todos/batch/.
+
+    python -m benchmarks.bench_batch --items 10 100 500
+"""
+import argparse
+
+from benchmarks.common import auth_headers, make_user, print_table, setup_django, timed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--items', type=int, nargs='+', default=[10, 100, 500])
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.test import Client
+    from django.urls import reverse
+
+    from Todo.models import Todo
+
+    user = make_user('bench')
+    client = Client()
+
+    def single(count):
+        headers = auth_headers(user)
+        ids = []
+        for i in range(count):
+            response = client.post(reverse('todo-list'), {'title': 'Todo #%d' % i},
+                                   content_type='application/json', **headers)
+            ids.append(response.json()['id'])
+        for pk in ids:
+            client.patch(reverse('todo-detail', args=(pk,)), {'memo': 'updated'},
+                         content_type='application/json', **headers)
+        for pk in ids:
+            client.delete(reverse('todo-detail', args=(pk,)), **headers)
+
+    def batch(count):
+        headers = auth_headers(user)
+        response = client.post(reverse('todo-batch'), {'create': [{'title': 'Todo #%d' % i} for i in range(count)]},
+                               content_type='application/json', **headers)
+        ids = [todo['id'] for todo in response.json()['created']]
+        client.post(reverse('todo-batch'), {'update': [{'id': pk, 'memo': 'updated'} for pk in ids]},
+                    content_type='application/json', **headers)
+        client.post(reverse('todo-batch'), {'delete': ids}, content_type='application/json', **headers)
+
+    rows = []
+    for count in args.items:
+        single_time = timed(lambda: single(count), repeat=3)
+        batch_time = timed(lambda: batch(count), repeat=3)
+        assert not Todo.objects.exists()
+        # three operations per item: create, update and delete
+        rows.append((count, '%.0f' % (3 * count / single_time), '%.0f' % (3 * count / batch_time),
+                     '%.1fx' % (single_time / batch_time)))
+
+    print_table(('items', 'per-item ops/s', 'batch ops/s', 'speedup'), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""
+Measure the size and latency of a page of GET /api/todos/ with every field,
+with the default summary (no memo) and with `?fields=id,title`, for todos
+with memos of each of the --memo-bytes sizes. The response cache is bumped
+before every request so each one reads the database.
+
+    python -m benchmarks.bench_fields --todos 2000 --page-size 500 --memo-bytes 0 200 2000
+"""
+import argparse
+
+from benchmarks.common import auth_headers, make_user, print_table, seed_todos, setup_django, timed
+
+FIELDSETS = [
+    ('full', {'fields': 'id,title,memo,created,date_completed,due_date,priority,position'}),
+    ('summary', {}),
+    ('id,title', {'fields': 'id,title'}),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--todos', type=int, default=2000)
+    parser.add_argument('--page-size', type=int, default=500)
+    parser.add_argument('--memo-bytes', type=int, nargs='+', default=[0, 200, 2000])
+    parser.add_argument('--requests', type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.test import Client
+    from django.urls import reverse
+
+    from Todo import cache as todo_cache
+    from Todo.models import Todo
+
+    client = Client()
+    url = reverse('todo-list')
+    rows = []
+    for memo_bytes in args.memo_bytes:
+        user = make_user('bench-%d' % memo_bytes)
+        seed_todos(user, args.todos, memo='m' * memo_bytes)
+        headers = auth_headers(user)
+        for name, query in FIELDSETS:
+            query = dict(query, page_size=args.page_size)
+
+            def fetch():
+                for _ in range(args.requests):
+                    todo_cache.bump_version(user.id)
+                    client.get(url, query, **headers)
+
+            size = len(client.get(url, query, **headers).content)
+            elapsed = timed(fetch, repeat=3) / args.requests
+            rows.append((memo_bytes, name, size, '%.0f' % (size / args.page_size), '%.2f' % (elapsed * 1000)))
+        Todo.objects.filter(owner=user).delete()
+    print('pages of %d todos' % args.page_size)
+    print_table(('memo bytes', 'fields', 'page bytes', 'bytes/todo', 'ms/page'), rows)
+
+
+if __name__ == '__main__':
+    main()
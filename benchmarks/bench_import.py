@@ -0,0 +1,87 @@
+"""
+Import throughput of TodoImporter, parsing included, for NDJSON and CSV
+files held in memory, compared with validating through
+TodoSerializer(many=True) and saving with its bulk_create().
+
+    python -m benchmarks.bench_import --rows 10000 100000
+"""
+import argparse
+import csv
+import io
+import json
+import time
+
+from benchmarks.common import make_user, print_table, setup_django
+
+
+def make_rows(count):
+    # a realistic mix: a memo on some todos, about a third completed
+    for i in range(count):
+        row = {'title': 'Imported todo #%d' % i}
+        if i % 4 == 0:
+            row['memo'] = 'Use the book \'Python Testing with Pytest\''
+        if i % 3 == 0:
+            row['date_completed'] = '2020-06-%02dT12:00:00Z' % (i % 28 + 1)
+        yield row
+
+
+def make_ndjson(count):
+    return ''.join(json.dumps(row) + '\n' for row in make_rows(count))
+
+
+def make_csv(count):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, ['title', 'memo', 'date_completed'])
+    writer.writeheader()
+    writer.writerows(make_rows(count))
+    return buffer.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000])
+    args = parser.parse_args()
+
+    setup_django()
+
+    from Todo.importer import TodoImporter, iter_csv_rows, iter_ndjson_rows
+    from Todo.models import Todo
+    from Todo.serializers import TodoSerializer
+
+    user = make_user('bench')
+
+    def run(func):
+        Todo.objects.all().delete()
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        return elapsed
+
+    rows = []
+    for count in args.rows:
+        ndjson, csv_text = make_ndjson(count), make_csv(count)
+
+        def serializer():
+            lines = iter_ndjson_rows(io.StringIO(ndjson))
+            while True:
+                batch = [row for _, row in zip(range(TodoImporter.batch_size), lines)]
+                if not batch:
+                    break
+                serializer = TodoSerializer(data=batch, many=True)
+                serializer.is_valid(raise_exception=True)
+                # bypass the per-row save() fallback for SQLite, like the importer
+                Todo.objects.bulk_create([Todo(owner_id=user.id, **attrs) for attrs in serializer.validated_data])
+
+        timings = [
+            ('serializer', run(serializer)),
+            ('ndjson', run(lambda: TodoImporter(user.id).run(iter_ndjson_rows(io.StringIO(ndjson))))),
+            ('csv', run(lambda: TodoImporter(user.id).run(iter_csv_rows(io.StringIO(csv_text))))),
+        ]
+        assert Todo.objects.count() == count
+        rows.append([count] + ['%.0f' % (count / elapsed) for name, elapsed in timings])
+
+    print_table(('rows', 'serializer rows/s', 'ndjson rows/s', 'csv rows/s'), rows)
+
+
+if __name__ == '__main__':
+    main()
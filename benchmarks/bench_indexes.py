@@ -0,0 +1,66 @@
+"""
+Time the queries behind the todo list, its open/completed variants and the
+sync feed with the Todo indexes in place, then again with only the implicit
+foreign key index on owner, which is all the model had originally.
+
+The rows are spread over --users owners and every third todo is completed.
+
+    python -m benchmarks.bench_indexes --rows 1000000 --users 20
+"""
+import argparse
+
+from benchmarks.common import make_user, print_table, seed_todos, setup_django, timed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--page-size', type=int, default=50)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.db import connection
+    from django.db.models import F
+
+    from Todo.models import Todo
+
+    users = [make_user('bench%d' % i) for i in range(args.users)]
+    for user in users:
+        seed_todos(user, args.rows // args.users)
+    Todo.objects.annotate(third=F('id') % 3).filter(third=0).update(date_completed=F('created'))
+    # number the rows as the writes that make them would have
+    Todo.objects.update(seq=F('id'))
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+    user = users[len(users) // 2]
+    todos = Todo.objects.filter(owner=user)
+    latest = todos.order_by('-seq').values_list('seq', flat=True)[args.page_size]
+    queries = [
+        ('list', todos.order_by('-created', '-id')),
+        ('open', todos.filter(date_completed__isnull=True).order_by('-created', '-id')),
+        ('completed', todos.filter(date_completed__isnull=False).order_by('-created', '-id')),
+        ('sync', todos.filter(seq__gt=latest).order_by('seq', 'id')),
+    ]
+
+    def measure():
+        return ['%.2f' % (timed(lambda: list(queryset[:args.page_size + 1])) * 1000) for name, queryset in queries]
+
+    indexed = measure()
+    # drop every index declared on the model, leaving the foreign key's own
+    with connection.schema_editor() as schema_editor:
+        for index in Todo._meta.indexes:
+            schema_editor.remove_index(Todo, index)
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+    unindexed = measure()
+
+    rows = [(name, before, after) for (name, queryset), before, after in zip(queries, unindexed, indexed)]
+    print('%d todos, %d per user' % (Todo.objects.count(), args.rows // args.users))
+    print_table(('query', 'owner FK only (ms)', 'indexed (ms)'), rows)
+
+
+if __name__ == '__main__':
+    main()
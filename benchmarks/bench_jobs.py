@@ -0,0 +1,110 @@
+"""
+Measure the job queue. First enqueue --jobs jobs, one transaction each.
+Then drain them with each of the --workers counts of worker threads (in
+place of worker processes) and each of the --batch-sizes, checking that
+every job ran exactly once.
+
+Then delete an account of --todos todos: the request, which now only
+deactivates the user and enqueues the deletion, and the worker's chunked
+deletes, next to deleting the user outright, which cascades in a single
+transaction that holds up every other write.
+
+    python -m benchmarks.bench_jobs --jobs 5000 --workers 1 4 --batch-sizes 1 10 --todos 100000
+"""
+import argparse
+import collections
+import threading
+import time
+
+from benchmarks.common import auth_headers, make_user, print_table, seed_todos, setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--jobs', type=int, default=5000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4])
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 10])
+    parser.add_argument('--todos', type=int, default=100000)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.db import connection
+    from django.test import Client
+    from django.urls import reverse
+
+    from core import tasks
+    from jobs.queue import Worker, enqueue, task
+
+    runs = collections.Counter()
+    runs_lock = threading.Lock()
+
+    @task
+    def count(n):
+        with runs_lock:
+            runs[n] += 1
+
+    def fill():
+        runs.clear()
+        for n in range(args.jobs):
+            enqueue(count, n=n)
+
+    start = time.perf_counter()
+    fill()
+    print('enqueued %d jobs: %.0f jobs/s' % (args.jobs, args.jobs / (time.perf_counter() - start)))
+    print()
+
+    def work(batch_size):
+        try:
+            Worker(batch_size=batch_size).run(burst=True)
+        finally:
+            connection.close()
+
+    rows = []
+    for workers in args.workers:
+        for batch_size in args.batch_sizes:
+            # the first round drains the jobs enqueued above
+            if rows:
+                fill()
+            threads = [threading.Thread(target=work, args=(batch_size,)) for _ in range(workers)]
+            start = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - start
+            assert len(runs) == args.jobs and set(runs.values()) == {1}, 'jobs lost or run twice'
+            rows.append((workers, batch_size, '%.0f' % (args.jobs / elapsed)))
+    print_table(('workers', 'batch size', 'jobs/s'), rows)
+    print()
+
+    client = Client()
+    user = make_user('bench-deleted')
+    seed_todos(user, args.todos)
+    headers = auth_headers(user)
+    # warm up
+    client.get(reverse('todo-stats'), **headers)
+    start = time.perf_counter()
+    assert client.delete(reverse('account-delete'), **headers).status_code == 202
+    request = time.perf_counter() - start
+    start = time.perf_counter()
+    Worker().run(burst=True)
+    deletion = time.perf_counter() - start
+    chunks = -(-args.todos // tasks.DELETE_CHUNK_SIZE)
+
+    user = make_user('bench-cascaded')
+    seed_todos(user, args.todos)
+    start = time.perf_counter()
+    user.delete()
+    cascade = time.perf_counter() - start
+
+    print('deleting an account of %d todos' % args.todos)
+    print_table(('', 'ms', 'ms/transaction'), [
+        ('request', '%.2f' % (request * 1000), '%.2f' % (request * 1000)),
+        ('worker, %d chunks' % chunks, '%.2f' % (deletion * 1000), '%.2f' % (deletion / chunks * 1000)),
+        ('cascade', '%.2f' % (cascade * 1000), '%.2f' % (cascade * 1000)),
+    ])
+
+
+if __name__ == '__main__':
+    main()
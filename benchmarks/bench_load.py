@@ -0,0 +1,309 @@
+"""
+Load test of the whole API: replays a mix of register, token, refresh, list,
+create, update and delete requests against a local server and reports the
+throughput and p50/p95/p99 latency of each.
+
+A scratch database is seeded with --users users holding --todos todos each,
+then a server is started on it (gunicorn by default, or uvicorn with
+--server asgi). --clients threads each play the users given to them for
+--seconds seconds, picking every next request at random with the weights of
+--mix, over one keep-alive connection per thread. Runs are repeatable: the
+same --seed makes the same choices.
+
+--output saves the results as JSON; --compare prints the change from the
+results of an earlier run.
+
+    python -m benchmarks.bench_load --users 200 --todos 100 --clients 16 --seconds 30 --output before.json
+    python -m benchmarks.bench_load --users 200 --todos 100 --clients 16 --seconds 30 --compare before.json
+"""
+import argparse
+import asyncio
+import datetime
+import http.client
+import json
+import os
+import random
+import subprocess
+import tempfile
+import threading
+import time
+
+from benchmarks.bench_asgi import SERVERS, percentile, wait_until_up
+from benchmarks.common import print_table, setup_django
+
+PASSWORD = 'johnnyappleseed'
+
+# relative weights of the requests in each mix
+MIXES = {
+    'default': {'list': 40, 'create': 15, 'update': 10, 'delete': 5, 'token': 10, 'refresh': 15, 'register': 5},
+    'read-heavy': {'list': 80, 'create': 5, 'update': 5, 'token': 2, 'refresh': 8},
+    'write-heavy': {'list': 20, 'create': 40, 'update': 25, 'delete': 15},
+    'auth': {'token': 40, 'refresh': 40, 'register': 20},
+}
+
+
+def seed(users, todos, batch_size=10000):
+    """
+    Creates `users` users with `todos` todos each, and their counters.
+    Returns their usernames.
+    """
+    from django.contrib.auth.hashers import make_password
+    from django.contrib.auth.models import User
+
+    from Todo.models import Todo
+    from Todo.stats import rebuild_stats
+
+    # one hash for every user; hashing each password would take minutes
+    password = make_password(PASSWORD)
+    usernames = ['load%d' % i for i in range(users)]
+    User.objects.bulk_create([User(username=username, password=password) for username in usernames])
+    owner_ids = list(User.objects.filter(username__in=usernames).values_list('id', flat=True))
+    rows = ((owner_id, i) for owner_id in owner_ids for i in range(todos))
+    while True:
+        batch = [Todo(title='Todo #%d' % i, memo='Seeded for the load test', owner_id=owner_id)
+                 for owner_id, i in (next(rows, (None, None)) for _ in range(batch_size)) if owner_id]
+        if not batch:
+            break
+        Todo.objects.bulk_create(batch)
+    rebuild_stats(owner_ids)
+    return usernames
+
+
+class VirtualUser:
+    """
+    A user's tokens and the ids of the todos it knows about.
+    """
+
+    def __init__(self, username):
+        self.username = username
+        self.access = None
+        self.refresh = None
+        self.todo_ids = []
+
+
+class Client:
+    """
+    Plays requests for its virtual users over one keep-alive connection,
+    recording the latency of each by operation.
+    """
+
+    def __init__(self, port, users, mix, rng, name):
+        self.port = port
+        self.users = users
+        self.operations, self.weights = zip(*mix.items())
+        self.rng = rng
+        self.name = name
+        self.connection = http.client.HTTPConnection('127.0.0.1', port)
+        self.latencies = {operation: [] for operation in self.operations}
+        self.errors = {operation: 0 for operation in self.operations}
+        self.registered = 0
+
+    def request(self, method, path, body=None, user=None):
+        headers = {'Content-Type': 'application/json'}
+        if user is not None:
+            headers['Authorization'] = 'Bearer ' + user.access
+        for attempt in range(2):
+            try:
+                self.connection.request(method, path, json.dumps(body) if body is not None else None, headers)
+                response = self.connection.getresponse()
+                content = response.read()
+                break
+            except (http.client.HTTPException, ConnectionError):
+                # the server closed the keep-alive connection; reconnect once
+                self.connection.close()
+                if attempt:
+                    raise
+        return response.status, json.loads(content) if content and response.status < 500 else None
+
+    def log_in(self, user):
+        status, data = self.request('POST', '/api/token', {'username': user.username, 'password': PASSWORD})
+        if status == 200:
+            user.access, user.refresh = data['access'], data['refresh']
+        return status == 200
+
+    def list(self, user):
+        status, data = self.request('GET', '/api/todos/?page_size=50', user=user)
+        if status == 200:
+            user.todo_ids = [todo['id'] for todo in data['results']]
+        return status == 200
+
+    def create(self, user):
+        status, data = self.request('POST', '/api/todos/', {'title': 'Load test todo'}, user=user)
+        if status == 201:
+            user.todo_ids.append(data['id'])
+        return status == 201
+
+    def update(self, user):
+        if not user.todo_ids:
+            return None
+        pk = self.rng.choice(user.todo_ids)
+        status, data = self.request('PATCH', '/api/todos/%d/' % pk, {'memo': 'Updated by the load test'}, user=user)
+        return status == 200
+
+    def delete(self, user):
+        if not user.todo_ids:
+            return None
+        pk = user.todo_ids.pop(self.rng.randrange(len(user.todo_ids)))
+        status, data = self.request('DELETE', '/api/todos/%d/' % pk, user=user)
+        return status == 204
+
+    def token(self, user):
+        return self.log_in(user)
+
+    def refresh(self, user):
+        status, data = self.request('POST', '/api/token/refresh', {'refresh': user.refresh})
+        if status == 200:
+            user.access = data['access']
+            user.refresh = data.get('refresh', user.refresh)
+        return status == 200
+
+    def register(self, user):
+        self.registered += 1
+        username = 'load-%s-%d' % (self.name, self.registered)
+        status, data = self.request('POST', '/api/users', {'username': username, 'password': PASSWORD})
+        return status == 201
+
+    def run(self, ready, seconds, think):
+        for user in self.users:
+            self.log_in(user)
+        # start measuring once every client has logged its users in
+        ready.wait()
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            operation = self.rng.choices(self.operations, self.weights)[0]
+            user = self.rng.choice(self.users)
+            start = time.perf_counter()
+            ok = getattr(self, operation)(user)
+            elapsed = time.perf_counter() - start
+            if ok is None:
+                # nothing to update or delete yet
+                continue
+            if ok:
+                self.latencies[operation].append(elapsed)
+            else:
+                self.errors[operation] += 1
+            if think:
+                time.sleep(think)
+        self.connection.close()
+
+
+def summarize(latencies, errors, elapsed):
+    latencies = sorted(latencies)
+    summary = {'requests': len(latencies), 'errors': errors, 'rps': len(latencies) / elapsed}
+    for name, fraction in (('p50', 0.5), ('p95', 0.95), ('p99', 0.99)):
+        summary[name] = percentile(latencies, fraction) * 1000 if latencies else None
+    return summary
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def format_ms(value):
+    return '-' if value is None else '%.1f' % value
+
+
+def print_comparison(results, previous):
+    rows = []
+    for operation, summary in results['operations'].items():
+        before = previous['operations'].get(operation)
+        if before is None:
+            continue
+        row = [operation]
+        for key in ('rps', 'p50', 'p95', 'p99'):
+            old, new = before[key], summary[key]
+            change = '%+.0f%%' % ((new - old) / old * 100) if old and new is not None else '-'
+            row.append('%s -> %s (%s)' % (format_ms(old), format_ms(new), change))
+        rows.append(row)
+    print('compared with %s (commit %s)' % (previous['started'], previous['commit']))
+    print_table(('operation', 'req/s', 'p50 (ms)', 'p95 (ms)', 'p99 (ms)'), rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--todos', type=int, default=100, help='todos per user')
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=30)
+    parser.add_argument('--think-ms', type=float, default=0, help='pause between the requests of a client')
+    parser.add_argument('--mix', choices=sorted(MIXES), default='default')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--server', choices=sorted(SERVERS), default='wsgi')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--wsgi-worker-class', choices=['gthread', 'sync'], default='gthread')
+    parser.add_argument('--threads', type=int, default=8, help='threads per gthread worker')
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--output', help='save the results to this JSON file')
+    parser.add_argument('--compare', help='JSON results of an earlier run to compare with')
+    args = parser.parse_args()
+    if args.clients > args.users:
+        parser.error('--clients cannot exceed --users')
+
+    db_name = os.path.join(tempfile.mkdtemp(prefix='todo-bench-'), 'bench.sqlite3')
+    os.environ['TODO_BENCH_DB'] = db_name
+    os.environ['DJANGO_SETTINGS_MODULE'] = 'benchmarks.settings'
+    setup_django(db_name)
+    usernames = seed(args.users, args.todos)
+
+    rng = random.Random(args.seed)
+    clients = [
+        Client(args.port, [VirtualUser(username) for username in usernames[i::args.clients]], MIXES[args.mix],
+               random.Random(rng.random()), '%d-%d' % (args.seed, i))
+        for i in range(args.clients)
+    ]
+    started = datetime.datetime.now(datetime.timezone.utc).isoformat()
+    server = subprocess.Popen(SERVERS[args.server](args, args.port))
+    try:
+        asyncio.run(wait_until_up(args.port))
+        ready = threading.Barrier(len(clients) + 1)
+        threads = [threading.Thread(target=client.run, args=(ready, args.seconds, args.think_ms / 1000))
+                   for client in clients]
+        for thread in threads:
+            thread.start()
+        ready.wait()
+        start = time.monotonic()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - start
+    finally:
+        server.terminate()
+        server.wait()
+
+    operations = {}
+    for operation in MIXES[args.mix]:
+        operations[operation] = summarize(
+            [latency for client in clients for latency in client.latencies[operation]],
+            sum(client.errors[operation] for client in clients), elapsed)
+    results = {
+        'started': started,
+        'commit': git_commit(),
+        'args': vars(args),
+        'elapsed': elapsed,
+        'operations': operations,
+        'total': summarize([latency for client in clients for latencies in client.latencies.values()
+                            for latency in latencies],
+                           sum(summary['errors'] for summary in operations.values()), elapsed),
+    }
+
+    print('%s mix, %d users with %d todos, %d clients, %s server, %.0f s'
+          % (args.mix, args.users, args.todos, args.clients, args.server, elapsed))
+    print_table(('operation', 'requests', 'errors', 'req/s', 'p50 (ms)', 'p95 (ms)', 'p99 (ms)'), [
+        (operation, summary['requests'], summary['errors'], '%.1f' % summary['rps'],
+         format_ms(summary['p50']), format_ms(summary['p95']), format_ms(summary['p99']))
+        for operation, summary in list(operations.items()) + [('total', results['total'])]
+    ])
+    if args.compare:
+        with open(args.compare) as f:
+            print()
+            print_comparison(results, json.load(f))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Login throughput of each password hashing profile, and the latency of other
+requests served meanwhile.
+
+For each profile, --threads threads log in through '/api/token' as fast as
+they can for --seconds seconds, while one more thread lists todos. Django's
+own hashers hash in the request thread; the core.hashers ones hash in the
+bounded pool (settings.PASSWORD_HASHING['WORKERS'] threads). Throttling is
+turned off.
+
+    python -m benchmarks.bench_login --threads 8 --seconds 5
+"""
+import argparse
+import statistics
+import threading
+import time
+
+from benchmarks.common import auth_headers, make_user, print_table, seed_todos, setup_django
+
+PROFILES = {
+    'pbkdf2 (Django)': 'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'argon2 (Django)': 'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'bcrypt (pooled)': 'core.hashers.BCryptSHA256PasswordHasher',
+    'argon2 (pooled)': 'core.hashers.Argon2PasswordHasher',
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--profiles', nargs='+', choices=PROFILES, default=list(PROFILES))
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.conf import settings
+    from django.contrib.auth.hashers import get_hashers, get_hashers_by_algorithm, make_password
+    from django.db import close_old_connections
+    from django.test import Client
+    from django.urls import reverse
+
+    settings.AUTH_THROTTLES = {scope: {'BURST': 10 ** 9, 'RATE': 10 ** 9} for scope in ('ip', 'username')}
+    reader = make_user('reader')
+    seed_todos(reader, 1000)
+    rows = []
+    for profile in args.profiles:
+        settings.PASSWORD_HASHERS = [PROFILES[profile]]
+        get_hashers.cache_clear()
+        get_hashers_by_algorithm.cache_clear()
+        user = make_user('bench-%s' % profile.split()[0])
+        user.password = make_password('johnnyappleseed')
+        user.save()
+
+        deadline = time.monotonic() + args.seconds
+        latencies = {'login': [], 'list': []}
+
+        def run(kind):
+            client = Client()
+            headers = auth_headers(reader)
+            while time.monotonic() < deadline:
+                start = time.perf_counter()
+                if kind == 'login':
+                    response = client.post(reverse('token-obtain-pair'),
+                                           {'username': user.username, 'password': 'johnnyappleseed'})
+                else:
+                    response = client.get(reverse('todo-list'), {'page_size': 10}, **headers)
+                assert response.status_code == 200, response.content
+                latencies[kind].append(time.perf_counter() - start)
+                close_old_connections()
+
+        threads = [threading.Thread(target=run, args=('login',)) for i in range(args.threads)]
+        threads.append(threading.Thread(target=run, args=('list',)))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        rows.append((profile, '%.1f' % (len(latencies['login']) / args.seconds),
+                     '%.1f' % (statistics.median(latencies['login']) * 1000),
+                     '%.1f' % (statistics.median(latencies['list']) * 1000),
+                     '%.0f' % (len(latencies['list']) / args.seconds)))
+
+    print('%d login threads, %d hashing workers' % (args.threads, settings.PASSWORD_HASHING['WORKERS']))
+    print_table(('profile', 'logins/s', 'login p50 (ms)', 'list p50 (ms)', 'lists/s'), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""
+Overhead of PerformanceMiddleware on a first page of '/api/todos/', without
+the middleware and with it at several sample rates. The response cache is
+turned off so that every request queries the database.
+
+    python -m benchmarks.bench_metrics --rows 10000 --page-size 50
+"""
+import argparse
+import os
+
+from benchmarks.common import auth_headers, make_user, print_table, seed_todos, setup_django, timed
+
+MIDDLEWARE = 'core.middleware.PerformanceMiddleware'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--page-size', type=int, default=50)
+    parser.add_argument('--requests', type=int, default=200)
+    args = parser.parse_args()
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'todolist_api.settings')
+    from django.conf import settings
+    settings.CACHES = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+    setup_django()
+
+    from django.test import Client
+    from django.urls import reverse
+
+    user = make_user('bench')
+    seed_todos(user, args.rows)
+    headers = auth_headers(user)
+    middleware = list(settings.MIDDLEWARE)
+    rows = []
+    for label, sample_rate in [('off', None), ('sample 0', 0.0), ('sample 0.1', 0.1), ('sample 1', 1.0)]:
+        if sample_rate is None:
+            settings.MIDDLEWARE = [name for name in middleware if name != MIDDLEWARE]
+        else:
+            settings.MIDDLEWARE = middleware
+            settings.PERF_METRICS = dict(settings.PERF_METRICS, SAMPLE_RATE=sample_rate)
+        # a new client loads the middleware again
+        client = Client()
+
+        def requests():
+            for i in range(args.requests):
+                client.get(reverse('todo-list'), {'page_size': args.page_size}, **headers)
+
+        rows.append((label, '%.3f' % (timed(requests) / args.requests * 1000)))
+
+    print_table(('middleware', 'ms per request'), rows)
+
+
+if __name__ == '__main__':
+    main()
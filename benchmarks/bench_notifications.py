@@ -0,0 +1,111 @@
+"""
+Compare clients keeping a todo list current by polling GET /api/todos/ (with
+If-None-Match, so unchanged lists cost a 304) against clients listening on
+/api/todos/events/ and refetching only when told to.
+
+--clients threads watch one user's todos for --seconds seconds while another
+thread creates a todo every --write-every seconds. The report gives the list
+requests made, how many of them found nothing new (a 304), and how long each
+new todo took to reach a client.
+
+    python -m benchmarks.bench_notifications --clients 20 --interval 2 --seconds 30
+"""
+import argparse
+import statistics
+import threading
+import time
+
+from benchmarks.bench_asgi import percentile
+from benchmarks.common import auth_headers, make_user, print_table, seed_todos, setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--todos', type=int, default=50)
+    parser.add_argument('--clients', type=int, default=20)
+    parser.add_argument('--seconds', type=float, default=30)
+    parser.add_argument('--interval', type=float, default=2, help='seconds between the requests of a polling client')
+    parser.add_argument('--write-every', type=float, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.conf import settings
+    from django.db import connections
+    from django.test import Client
+    from django.urls import reverse
+
+    user = make_user('bench')
+    seed_todos(user, args.todos)
+    headers = auth_headers(user)
+    list_url = reverse('todo-list')
+    settings.TODO_NOTIFICATIONS = dict(settings.TODO_NOTIFICATIONS, MAX_DURATION=args.seconds)
+
+    def run(watch):
+        written = {}
+        delays, requests = [], {200: 0, 304: 0}
+        lock = threading.Lock()
+        stop = threading.Event()
+
+        def write():
+            client = Client()
+            n = 0
+            while not stop.wait(args.write_every):
+                n += 1
+                client.post(list_url, {'title': 'Write %d' % n}, content_type='application/json', **headers)
+                written[n] = time.perf_counter()
+            connections.close_all()
+
+        def fetch(client, state):
+            response = client.get(list_url, HTTP_IF_NONE_MATCH=state.get('etag', ''), **headers)
+            with lock:
+                requests[response.status_code] += 1
+            if response.status_code == 200:
+                state['etag'] = response['ETag']
+                title = response.json()['results'][0]['title']
+                if title.startswith('Write '):
+                    n = int(title.split()[1])
+                    if n > state.get('seen', 0) and n in written:
+                        with lock:
+                            delays.append(time.perf_counter() - written[n])
+                        state['seen'] = n
+
+        def poll():
+            client, state = Client(), {}
+            while not stop.wait(args.interval):
+                fetch(client, state)
+            connections.close_all()
+
+        def listen():
+            client, state = Client(), {}
+            response = client.get(reverse('todo-events'), HTTP_ACCEPT='text/event-stream', **headers)
+            for chunk in response.streaming_content:
+                if stop.is_set():
+                    break
+                if chunk.startswith(b'id: '):
+                    fetch(client, state)
+            response.close()
+            connections.close_all()
+
+        threads = [threading.Thread(target=write)]
+        threads += [threading.Thread(target=listen if watch == 'events' else poll) for _ in range(args.clients)]
+        for thread in threads:
+            thread.start()
+        time.sleep(args.seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        delays.sort()
+        total = sum(requests.values())
+        return (watch, total, requests[304], '%.1f' % (total / args.seconds),
+                '%.0f' % (statistics.mean(delays) * 1000) if delays else '-',
+                '%.0f' % (percentile(delays, 0.95) * 1000) if delays else '-')
+
+    rows = [run('poll'), run('events')]
+    print('%d clients, one write every %s s, polling every %s s, %s s'
+          % (args.clients, args.write_every, args.interval, args.seconds))
+    print_table(('mode', 'list requests', 'unchanged', 'requests/s', 'mean delay (ms)', 'p95 delay (ms)'), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""
+Compare the cost of fetching the last page of a user's todo list three ways:
+
+- full:   serializing the whole list, which is what the list endpoint did
+          before it was paginated
+- offset: LIMIT/OFFSET paging to the last page
+- cursor: keyset paging (KeysetPagination) to the last page
+
+    python -m benchmarks.bench_pagination --rows 1000 100000 1000000
+"""
+import argparse
+
+from benchmarks.common import make_user, print_table, seed_todos, setup_django, timed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 100000, 1000000])
+    parser.add_argument('--page-size', type=int, default=50)
+    parser.add_argument('--full-limit', type=int, default=100000,
+                        help='skip the full-list measurement above this many rows')
+    args = parser.parse_args()
+
+    setup_django()
+
+    from rest_framework.request import Request
+    from rest_framework.test import APIRequestFactory
+
+    from Todo.models import Todo
+    from Todo.pagination import KeysetPagination
+    from Todo.serializers import TodoSerializer
+
+    user = make_user('bench')
+    factory = APIRequestFactory()
+    rows = []
+    for count in sorted(args.rows):
+        seed_todos(user, count)
+        queryset = Todo.objects.filter(owner=user).order_by('-created', '-id')
+
+        def full():
+            TodoSerializer(queryset, many=True).data
+
+        def offset():
+            TodoSerializer(queryset[count - args.page_size:count], many=True).data
+
+        # build a cursor that points just before the last page
+        boundary = queryset[count - args.page_size - 1]
+        paginator = KeysetPagination()
+        cursor = paginator.encode_cursor(boundary.created, boundary.id)
+        request = Request(factory.get('/api/todos/', {'cursor': cursor, 'page_size': args.page_size}))
+
+        def keyset():
+            page = KeysetPagination().paginate_queryset(queryset, request)
+            TodoSerializer(page, many=True).data
+
+        full_time = '%.2f' % (timed(full, repeat=1) * 1000) if count <= args.full_limit else 'skipped'
+        rows.append((count, full_time, '%.2f' % (timed(offset) * 1000), '%.2f' % (timed(keyset) * 1000)))
+
+    print_table(('rows', 'full (ms)', 'offset (ms)', 'cursor (ms)'), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+"""
+Measure POST /api/token/refresh without rotation, with rotation (revoking
+each refresh token used), and refusing a replayed token from memory and from
+the database. Then fill the revoked token table with --revoked rows and time
+the revocation operations against it: revoking a token, refusing a replay
+from the database (the insert's primary key conflict) and from memory, and
+pruning the 1% of rows that have expired.
+
+    python -m benchmarks.bench_refresh --requests 500 --revoked 10000000
+"""
+import argparse
+import datetime
+import os
+import time
+import uuid
+from unittest import mock
+
+from benchmarks.common import make_user, print_table, setup_django, timed
+
+
+def seed_revoked(count, expired_every=100, batch_size=100000):
+    """
+    Inserts `count` revoked token ids, one in `expired_every` of them already
+    expired.
+    """
+    from django.db import connection, transaction
+    from django.utils import timezone
+
+    now = timezone.now()
+    live = (now + datetime.timedelta(days=1)).isoformat(' ')
+    expired = (now - datetime.timedelta(days=1)).isoformat(' ')
+    for start in range(0, count, batch_size):
+        rows = [(uuid.uuid4().hex, expired if i % expired_every == 0 else live)
+                for i in range(start, min(start + batch_size, count))]
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.executemany('INSERT INTO core_revokedtoken (jti, expires) VALUES (%s, %s)', rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--revoked', type=int, default=1000000)
+    parser.add_argument('--operations', type=int, default=2000, help='revocations timed against the full table')
+    args = parser.parse_args()
+
+    db_name = setup_django()
+
+    from django.db import connection
+    from django.test import Client
+    from django.urls import reverse
+    from rest_framework_simplejwt.exceptions import TokenError
+    from rest_framework_simplejwt.settings import api_settings
+
+    from core import revocation
+    from core.serializers import CustomTokenObtainPairSerializer
+
+    user = make_user('bench')
+    client = Client()
+    url = reverse('token-refresh')
+
+    def refresh_chain(rotate):
+        token = str(CustomTokenObtainPairSerializer.get_token(user))
+
+        def run():
+            nonlocal token
+            with mock.patch.object(api_settings, 'ROTATE_REFRESH_TOKENS', rotate):
+                for _ in range(args.requests):
+                    response = client.post(url, {'refresh': token}, content_type='application/json')
+                    assert response.status_code == 200
+                    token = response.json().get('refresh', token)
+        return run
+
+    def replay(from_memory):
+        token = str(CustomTokenObtainPairSerializer.get_token(user))
+        client.post(url, {'refresh': token}, content_type='application/json')
+
+        def run():
+            for _ in range(args.requests):
+                if not from_memory:
+                    revocation.revoked_ids.clear()
+                response = client.post(url, {'refresh': token}, content_type='application/json')
+                assert response.status_code == 401
+        return run
+
+    rows = []
+    for name, func in (('no rotation', refresh_chain(False)), ('rotation', refresh_chain(True)),
+                       ('replay, memory', replay(True)), ('replay, database', replay(False))):
+        elapsed = timed(func, repeat=3)
+        rows.append((name, '%.3f' % (elapsed / args.requests * 1000), '%.0f' % (args.requests / elapsed)))
+    print_table(('refresh', 'ms/request', 'requests/s'), rows)
+
+    size = os.path.getsize(db_name)
+    start = time.perf_counter()
+    seed_revoked(args.revoked)
+    seeded = time.perf_counter() - start
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    per_row = (os.path.getsize(db_name) - size) / args.revoked
+    print()
+    print('%d revoked tokens seeded in %.0f s, %.0f bytes each on disk' % (args.revoked, seeded, per_row))
+
+    exp = time.time() + 3600
+    fresh = [{'jti': uuid.uuid4().hex, 'exp': exp} for _ in range(args.operations)]
+    with mock.patch.object(revocation, 'prune_if_due'):
+        start = time.perf_counter()
+        for token in fresh:
+            revocation.revoke(token)
+        revoke_time = (time.perf_counter() - start) / args.operations
+
+        def refuse(clear):
+            start = time.perf_counter()
+            for token in fresh:
+                if clear:
+                    revocation.revoked_ids.delete(token['jti'])
+                try:
+                    revocation.revoke(token)
+                except TokenError:
+                    pass
+                else:
+                    raise AssertionError('a revoked token was accepted')
+            return (time.perf_counter() - start) / args.operations
+
+        database_time = refuse(True)
+        memory_time = refuse(False)
+    start = time.perf_counter()
+    pruned = revocation.prune()
+    prune_time = time.perf_counter() - start
+
+    print_table(('operation', 'us'), [
+        ('revoke', '%.1f' % (revoke_time * 1e6)),
+        ('refuse replay, database', '%.1f' % (database_time * 1e6)),
+        ('refuse replay, memory', '%.1f' % (memory_time * 1e6)),
+    ])
+    print('pruned %d expired tokens in %.2f s' % (pruned, prune_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+Measure polling GET /api/todos/ with the per-user response cache: a cold
+cache (the version is bumped before every request), warm cache hits, and
+conditional requests answered with a 304. Also prints the cache's hit-rate
+counters for a polling mix with one write every --write-every requests.
+
+    python -m benchmarks.bench_response_cache --todos 50 --requests 500
+"""
+import argparse
+
+from benchmarks.common import auth_headers, make_user, print_table, seed_todos, setup_django, timed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--todos', type=int, default=50)
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--write-every', type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.test import Client
+    from django.urls import reverse
+
+    from core import metrics
+    from Todo import cache as todo_cache
+
+    user = make_user('bench')
+    seed_todos(user, args.todos)
+    client = Client()
+    url = reverse('todo-list')
+    headers = auth_headers(user)
+    etag = client.get(url, **headers)['ETag']
+
+    def cold():
+        for _ in range(args.requests):
+            todo_cache.bump_version(user.id)
+            client.get(url, **headers)
+
+    def warm():
+        for _ in range(args.requests):
+            client.get(url, **headers)
+
+    def conditional():
+        for _ in range(args.requests):
+            client.get(url, HTTP_IF_NONE_MATCH=etag, **headers)
+
+    rows = []
+    for name, func in (('cold', cold), ('warm', warm)):
+        elapsed = timed(func, repeat=3)
+        rows.append((name, '%.3f' % (elapsed / args.requests * 1000), '%.0f' % (args.requests / elapsed)))
+    # conditional requests need the etag of the current version
+    etag = client.get(url, **headers)['ETag']
+    elapsed = timed(conditional, repeat=3)
+    rows.append(('304', '%.3f' % (elapsed / args.requests * 1000), '%.0f' % (args.requests / elapsed)))
+    print_table(('mode', 'ms/request', 'requests/s'), rows)
+
+    # polling clients that revalidate, with the occasional write
+    results = ('hit', 'miss', 'not_modified')
+    before = [metrics.todo_cache_requests.get(result) for result in results]
+    etag = None
+    for i in range(args.requests):
+        if i % args.write_every == 0:
+            client.post(url, {'title': 'Todo'}, content_type='application/json', **headers)
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag or '', **headers)
+        etag = response['ETag']
+    hits, misses, not_modified = (metrics.todo_cache_requests.get(result) - count
+                                  for result, count in zip(results, before))
+    print()
+    print('polling mix: %d hits, %d misses, %d not modified, hit rate %.1f%%'
+          % (hits, misses, not_modified, (hits + not_modified) / (hits + misses + not_modified) * 100))
+
+
+if __name__ == '__main__':
+    main()
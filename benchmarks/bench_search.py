@@ -0,0 +1,70 @@
+"""
+Time a first page of `?search=` results, through the full-text index and
+through a LIKE scan of title and memo, for a rare word, a common word and a
+pair of words. Titles and memos are drawn from a fixed vocabulary, and the
+rows are spread over --users owners.
+
+    python -m benchmarks.bench_search --rows 1000000 --users 20
+"""
+import argparse
+import random
+from functools import reduce
+from operator import and_
+
+from benchmarks.common import make_user, print_table, setup_django, timed
+
+VOCABULARY = [
+    'buy', 'milk', 'call', 'mom', 'write', 'report', 'review', 'pull', 'request', 'book', 'flight',
+    'pay', 'rent', 'clean', 'kitchen', 'plan', 'sprint', 'fix', 'bug', 'email', 'team', 'read',
+    'chapter', 'walk', 'dog', 'water', 'plants', 'renew', 'passport', 'update', 'resume',
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--page-size', type=int, default=50)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.db.models import Q
+
+    from Todo.models import Todo
+    from Todo.search import search_todos
+
+    users = [make_user('bench%d' % i) for i in range(args.users)]
+    rng = random.Random(0)
+    batch_size = 10000
+    for start in range(Todo.objects.count(), args.rows, batch_size):
+        Todo.objects.bulk_create([
+            Todo(title=' '.join(rng.sample(VOCABULARY, 3)).capitalize(),
+                 memo=' '.join(rng.sample(VOCABULARY, 8)) if i % 2 else '',
+                 owner=users[i % len(users)])
+            for i in range(start, min(start + batch_size, args.rows))
+        ])
+    # one needle per user, for the rare word
+    for user in users:
+        Todo.objects.create(title='Find the xylophone', owner=user)
+
+    user = users[len(users) // 2]
+    todos = Todo.objects.filter(owner=user).order_by('-created', '-id')
+    rows = []
+    for text in ['xylophone', 'milk', 'renew passport']:
+        def fts():
+            list(search_todos(todos, user.id, text)[:args.page_size + 1])
+
+        def like():
+            words = text.split()
+            list(todos.filter(reduce(and_, (Q(title__icontains=word) | Q(memo__icontains=word)
+                                            for word in words)))[:args.page_size + 1])
+
+        rows.append((text, '%.2f' % (timed(like) * 1000), '%.2f' % (timed(fts) * 1000)))
+
+    print('%d todos, %d per user' % (Todo.objects.count(), args.rows // args.users))
+    print_table(('search', 'LIKE (ms)', 'full-text (ms)'), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""
+Microbenchmark of the todo list serialization paths, from query to bytes:
+
+- serializer: TodoSerializer(many=True) on model instances + JSONRenderer
+- rows:       values_list() rows + TodoRowSerializer + FastJSONRenderer on
+              the stdlib json module
+- rows+orjson: the same with orjson, when it is installed
+
+    python -m benchmarks.bench_serialization --rows 100 10000 100000
+"""
+import argparse
+
+from benchmarks.common import make_user, print_table, seed_todos, setup_django, timed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, nargs='+', default=[100, 10000, 100000])
+    args = parser.parse_args()
+
+    setup_django()
+
+    from rest_framework.renderers import JSONRenderer
+
+    from Todo import renderers
+    from Todo.models import Todo
+    from Todo.renderers import FastJSONRenderer
+    from Todo.serializers import TODO_FIELDS, TodoRowSerializer, TodoSerializer
+    from Todo.views import TodoViewSet
+
+    user = make_user('bench')
+    context = {'view': TodoViewSet()}
+    orjson = renderers.orjson
+    rows = []
+    for count in sorted(args.rows):
+        seed_todos(user, count, memo='Use the book \'Python Testing with Pytest\'')
+        queryset = Todo.objects.filter(owner=user).order_by('-created', '-id')
+
+        def serializer():
+            JSONRenderer().render(TodoSerializer(queryset, many=True).data)
+
+        def fast():
+            FastJSONRenderer().render(TodoRowSerializer(queryset.values_list(*TODO_FIELDS)).data,
+                                      renderer_context=context)
+
+        repeat = 3 if count >= 100000 else 10
+        serializer_time = timed(serializer, repeat)
+        renderers.orjson = None
+        stdlib_time = timed(fast, repeat)
+        renderers.orjson = orjson
+        orjson_time = timed(fast, repeat) if orjson is not None else None
+        rows.append((
+            count,
+            '%.2f' % (serializer_time * 1000),
+            '%.2f' % (stdlib_time * 1000),
+            '%.2f' % (orjson_time * 1000) if orjson_time is not None else 'n/a',
+            '%.1fx' % (serializer_time / (orjson_time or stdlib_time)),
+        ))
+
+    print_table(('rows', 'serializer (ms)', 'rows (ms)', 'rows+orjson (ms)', 'speedup'), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""
+Measure the cost of signing and verifying an access token with each
+algorithm: HS256 with the SECRET_KEY (simplejwt's default), RS256 with a
+2048-bit key and EdDSA (Ed25519), through the key ring backend of
+core/signing.py. Also times a downstream service verifying the token with
+the key from the JWKS, without the API.
+
+    python -m benchmarks.bench_signing --tokens 2000
+"""
+import argparse
+import json
+import time
+
+from benchmarks.common import print_table, setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tokens', type=int, default=2000)
+    args = parser.parse_args()
+
+    setup_django()
+
+    import jwt
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    from core import signing
+
+    payload = dict(AccessToken().payload, user_id=1, username='bench', is_admin=0)
+
+    def per_token(func, *func_args):
+        start = time.perf_counter()
+        for _ in range(args.tokens):
+            func(*func_args)
+        return (time.perf_counter() - start) / args.tokens * 1e6
+
+    rows = []
+    for algorithm in ('HS256',) + signing.ALGORITHMS:
+        options = {'ACTIVE': None, 'KEYS': []}
+        if algorithm != 'HS256':
+            options = {'ACTIVE': 'bench', 'KEYS': [
+                {'KID': 'bench', 'ALGORITHM': algorithm, 'PRIVATE_KEY': signing.generate_private_key(algorithm)}]}
+        backend = signing.get_token_backend(options)
+        token = backend.encode(payload)
+        sign = per_token(backend.encode, payload)
+        verify = per_token(backend.decode, token)
+        offline = '-'
+        if algorithm != 'HS256':
+            # what a service holding the JWKS does, without this project's code
+            jwk = backend.active.to_jwk()
+            key = backend.active.public_key
+            if jwk['kty'] == 'RSA':
+                key = jwt.algorithms.RSAAlgorithm.from_jwk(json.dumps(jwk))
+            offline = '%.1f' % per_token(jwt.decode, token, key, True, [algorithm])
+        rows.append((algorithm, '%.1f' % sign, '%.1f' % verify, offline, len(token)))
+    print_table(('algorithm', 'sign (us)', 'verify (us)', 'verify with JWKS (us)', 'token bytes'), rows)
+
+
+if __name__ == '__main__':
+    main()
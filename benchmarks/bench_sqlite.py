@@ -0,0 +1,137 @@
+"""
+Concurrent read/write stress test of the SQLite database settings.
+
+For each profile a fresh database is migrated, then --readers threads list
+todos and --writers threads create them through the API for --seconds
+seconds. Connections are handled as the server handles them: after every
+request, the ones older than CONN_MAX_AGE are closed. The profiles are
+
+    stock       Django's SQLite backend with a rollback journal, a new
+                connection per request and a 5 s busy timeout
+    tuned       core.backends.sqlite3 as configured in settings (WAL,
+                tuned pragmas, BEGIN IMMEDIATE, persistent connections)
+    tuned+ro    tuned, with the 'readonly' alias as a replica
+
+The response cache is turned off so that every request reaches the database.
+
+    python -m benchmarks.bench_sqlite --readers 8 --writers 4 --seconds 10
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+from benchmarks.common import auth_headers, make_user, print_table, seed_todos, setup_django
+
+PROFILES = {
+    'stock': ({'ENGINE': 'django.db.backends.sqlite3'}, []),
+    'tuned': ({'ENGINE': 'core.backends.sqlite3', 'CONN_MAX_AGE': 600, 'OPTIONS': {'timeout': 20}}, []),
+    'tuned+ro': ({'ENGINE': 'core.backends.sqlite3', 'CONN_MAX_AGE': 600, 'OPTIONS': {'timeout': 20}}, ['readonly']),
+}
+
+
+def use_database(profile, name):
+    """
+    Points the 'default' and 'readonly' aliases at a new database file with a profile's settings, and migrates it.
+    """
+    from django.conf import settings
+    from django.core.management import call_command
+    from django.db import connections
+
+    database, replicas = PROFILES[profile]
+    connections.close_all()
+    for alias in ('default', 'readonly'):
+        if hasattr(connections._connections, alias):
+            del connections[alias]
+    connections.databases['default'] = {**database, 'NAME': name}
+    connections.databases['readonly'] = {
+        **database, 'NAME': name, 'OPTIONS': {**database.get('OPTIONS', {}), 'read_only': True}}
+    for alias in ('default', 'readonly'):
+        connections.ensure_defaults(alias)
+        connections.prepare_test_settings(alias)
+    settings.DATABASE_REPLICAS = replicas
+    call_command('migrate', verbosity=0)
+
+
+def stress(readers, writers, seconds):
+    """
+    Runs reader and writer threads against the API, returning the latencies of successful reads and writes and the
+    number of failed requests
+    """
+    from django.db import close_old_connections, connections
+    from django.test import Client
+    from django.urls import reverse
+
+    reader = make_user('reader')
+    seed_todos(reader, 1000)
+    headers = [auth_headers(reader)] + [auth_headers(make_user('writer%d' % i)) for i in range(writers)]
+    latencies = {'read': [], 'write': []}
+    failures = []
+    deadline = time.monotonic() + seconds
+
+    def run(kind, headers):
+        client = Client(raise_request_exception=False)
+        url = reverse('todo-list')
+        i = 0
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            if kind == 'read':
+                response = client.get(url, **headers)
+                ok = response.status_code == 200
+            else:
+                response = client.post(url, {'title': 'Todo #%d' % i}, content_type='application/json', **headers)
+                ok = response.status_code == 201
+            elapsed = time.perf_counter() - start
+            # what the request_finished signal does on a server
+            close_old_connections()
+            if ok:
+                latencies[kind].append(elapsed)
+            else:
+                failures.append(response.status_code)
+            i += 1
+        connections.close_all()
+
+    threads = [threading.Thread(target=run, args=('read', headers[0])) for i in range(readers)]
+    threads += [threading.Thread(target=run, args=('write', headers[i + 1])) for i in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, len(failures)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--profiles', nargs='+', choices=PROFILES, default=list(PROFILES))
+    args = parser.parse_args()
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'todolist_api.settings')
+    from django.conf import settings
+    settings.CACHES = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+    setup_django()
+
+    directory = tempfile.mkdtemp(prefix='todo-bench-')
+    rows = []
+    for profile in args.profiles:
+        use_database(profile, os.path.join(directory, '%s.sqlite3' % profile))
+        latencies, failures = stress(args.readers, args.writers, args.seconds)
+        row = [profile]
+        for kind in ('read', 'write'):
+            samples = sorted(latencies[kind]) or [0]
+            row += ['%.0f' % (len(latencies[kind]) / args.seconds),
+                    '%.1f' % (statistics.median(samples) * 1000),
+                    '%.1f' % (samples[int(len(samples) * 0.99)] * 1000 if len(samples) > 1 else 0)]
+        rows.append(row + [failures])
+
+    print('%d readers, %d writers, %g s per profile' % (args.readers, args.writers, args.seconds))
+    print_table(('profile', 'reads/s', 'read p50 (ms)', 'read p99 (ms)',
+                 'writes/s', 'write p50 (ms)', 'write p99 (ms)', 'errors'), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+"""
+Compare reading a user's todo stats from their counters (get_stats) with
+counting their todos on the fly (count_todos), as the user's todo count
+grows. Every third todo is completed.
+
+    python -m benchmarks.bench_stats --rows 1000 100000 1000000
+"""
+import argparse
+
+from benchmarks.common import make_user, print_table, seed_todos, setup_django, timed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 100000, 1000000])
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.db.models import F
+
+    from Todo.models import Todo
+    from Todo.stats import count_todos, get_stats, rebuild_stats
+
+    user = make_user('bench')
+    rows = []
+    for count in sorted(args.rows):
+        seed_todos(user, count)
+        Todo.objects.annotate(third=F('id') % 3).filter(third=0).update(date_completed=F('created'))
+        rebuild_stats([user.id])
+
+        def counters():
+            get_stats(user.id)
+
+        def aggregate():
+            count_todos([user.id])
+
+        rows.append((count, '%.3f' % (timed(aggregate) * 1000), '%.3f' % (timed(counters) * 1000)))
+
+    print_table(('todos', 'COUNT (ms)', 'counters (ms)'), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+Measure a page of GET /api/todos/ for todos with each of the --tags counts
+of tags apiece, with the queries it takes, next to serializing the same
+page with TodoSerializer without prefetching the tags, one query per todo.
+Then time a page of one list of --list-size todos among --todos.
+
+    python -m benchmarks.bench_tags --page-size 500 --tags 0 5 20 --todos 100000
+"""
+import argparse
+
+from benchmarks.common import auth_headers, make_user, print_table, seed_todos, setup_django, timed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--page-size', type=int, default=500)
+    parser.add_argument('--tags', type=int, nargs='+', default=[0, 5, 20])
+    parser.add_argument('--todos', type=int, default=100000)
+    parser.add_argument('--list-size', type=int, default=1000)
+    parser.add_argument('--requests', type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import CaptureQueriesContext
+    from django.urls import reverse
+
+    from Todo import cache as todo_cache
+    from Todo.models import Tag, Todo, TodoList
+    from Todo.serializers import TODO_SUMMARY_FIELDS, TodoSerializer
+
+    client = Client()
+    url = reverse('todo-list')
+    rows = []
+    for tag_count in args.tags:
+        user = make_user('bench-%d' % tag_count)
+        seed_todos(user, args.page_size)
+        tags = [Tag.objects.create(name='tag %d' % i, owner=user) for i in range(tag_count)]
+        through = Todo.tags.through
+        through.objects.bulk_create([
+            through(todo_id=pk, tag_id=tag.pk)
+            for pk in Todo.objects.filter(owner=user).values_list('id', flat=True) for tag in tags
+        ], batch_size=10000)
+        headers = auth_headers(user)
+        query = {'page_size': args.page_size}
+
+        def fetch():
+            for _ in range(args.requests):
+                todo_cache.bump_version(user.id)
+                client.get(url, query, **headers)
+
+        def naive():
+            todos = Todo.objects.filter(owner=user).order_by('-created', '-id')[:args.page_size]
+            TodoSerializer(todos, many=True, fields=TODO_SUMMARY_FIELDS).data
+
+        with CaptureQueriesContext(connection) as queries:
+            todo_cache.bump_version(user.id)
+            client.get(url, query, **headers)
+        with CaptureQueriesContext(connection) as naive_queries:
+            naive()
+        # counted now, as the requests timed below clear the query log
+        query_counts = len(queries), len(naive_queries)
+        rows.append((tag_count, query_counts[0], '%.2f' % (timed(fetch, repeat=3) / args.requests * 1000),
+                     query_counts[1], '%.2f' % (timed(naive, repeat=3) * 1000)))
+        Todo.objects.filter(owner=user).delete()
+    print('pages of %d todos' % args.page_size)
+    print_table(('tags/todo', 'queries', 'ms/page', 'unprefetched queries', 'unprefetched ms'), rows)
+
+    user = make_user('bench-lists')
+    seed_todos(user, args.todos)
+    todo_list = TodoList.objects.create(name='Project', owner=user, todo_count=args.list_size)
+    ids = list(Todo.objects.filter(owner=user).values_list('id', flat=True))
+    Todo.objects.filter(id__in=ids[::len(ids) // args.list_size][:args.list_size]).update(list=todo_list)
+    headers = auth_headers(user)
+    query = {'list': todo_list.id, 'page_size': 50}
+
+    def fetch_list():
+        for _ in range(args.requests):
+            todo_cache.bump_version(user.id)
+            assert len(client.get(url, query, **headers).json()['results']) == 50
+
+    print()
+    print('a page of 50 of a list of %d todos among %d: %.2f ms' % (
+        args.list_size, args.todos, timed(fetch_list, repeat=3) / args.requests * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+Load test for /api/token/verify: requests per second of the original view
+(two JWTAuthentication instances plus a user query), of the verify service
+with its cache disabled, and of the verify service answering from cache.
+
+    python -m benchmarks.bench_token_verify --requests 2000 --threads 1 4
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import make_user, print_table, setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 4])
+    args = parser.parse_args()
+
+    setup_django()
+
+    from rest_framework import status
+    from rest_framework.decorators import api_view
+    from rest_framework.response import Response
+    from rest_framework.test import APIRequestFactory
+    from rest_framework_simplejwt import authentication
+
+    from core import verify
+    from core.serializers import CustomTokenObtainPairSerializer
+    from core.views import check_user_token
+
+    @api_view(['POST'])
+    def original_check_user_token(request):
+        token = authentication.JWTAuthentication().get_validated_token(request.data['token'])
+        user = authentication.JWTAuthentication().get_user(token)
+        return Response({"username": user.username}, status=status.HTTP_200_OK)
+
+    user = make_user('bench')
+    factory = APIRequestFactory()
+
+    def load(view, threads):
+        token = str(CustomTokenObtainPairSerializer.get_token(user).access_token)
+
+        def call(_):
+            response = view(factory.post('/api/token/verify', {'token': token}, format='json'))
+            assert response.status_code == status.HTTP_200_OK
+
+        call(None)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            list(pool.map(call, range(args.requests)))
+        return args.requests / (time.perf_counter() - start)
+
+    rows = []
+    for threads in args.threads:
+        original = load(original_check_user_token, threads)
+        maxsize, verify.verified_tokens.maxsize = verify.verified_tokens.maxsize, 0
+        uncached = load(check_user_token, threads)
+        verify.verified_tokens.maxsize = maxsize
+        cached = load(check_user_token, threads)
+        rows.append((threads, '%.0f' % original, '%.0f' % uncached, '%.0f' % cached))
+
+    print_table(('threads', 'original req/s', 'uncached req/s', 'cached req/s'), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""
+Shared helpers for the benchmark scripts.
+
+Every script runs against a throwaway SQLite database so db.sqlite3 is never
+touched. Run them as modules from the repository root, e.g.
+
+    python -m benchmarks.bench_pagination --rows 1000 100000
+"""
+import datetime
+import itertools
+import os
+import statistics
+import tempfile
+import time
+from unittest import mock
+
+import django
+
+
+def setup_django(db_name=None):
+    """
+    Point the project settings at a scratch database, then set up Django and
+    migrate it. Returns the path of the database file.
+    """
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'todolist_api.settings')
+    from django.conf import settings
+
+    if db_name is None:
+        db_name = os.path.join(tempfile.mkdtemp(prefix='todo-bench-'), 'bench.sqlite3')
+    settings.DATABASES['default']['NAME'] = db_name
+    settings.ALLOWED_HOSTS = ['*']
+    settings.DEBUG = False
+    django.setup()
+
+    from django.core.management import call_command
+    call_command('migrate', verbosity=0)
+    return db_name
+
+
+def make_user(username, password='johnnyappleseed'):
+    from django.contrib.auth.models import User
+
+    user = User.objects.filter(username=username).first()
+    if user is None:
+        user = User.objects.create_user(username, password=password)
+    return user
+
+
+def auth_headers(user):
+    """
+    Test client headers carrying a freshly minted access token for `user`.
+    """
+    from core.serializers import CustomTokenObtainPairSerializer
+
+    token = CustomTokenObtainPairSerializer.get_token(user).access_token
+    return {'HTTP_AUTHORIZATION': 'Bearer %s' % token}
+
+
+def seed_todos(user, count, batch_size=10000, memo=''):
+    """
+    Bulk-insert `count` todos for `user`, skipping whatever already exists.
+
+    `timezone.now()` is stepped by a millisecond per call while inserting so
+    the rows get distinct `created` values, as they would in real use, rather
+    than one timestamp per batch.
+    """
+    from django.utils import timezone
+    from Todo.models import Todo
+
+    existing = Todo.objects.filter(owner=user).count()
+    origin = timezone.now() - datetime.timedelta(milliseconds=count)
+    for start in range(existing, count, batch_size):
+        stop = min(start + batch_size, count)
+        clock = (origin + datetime.timedelta(milliseconds=i) for i in itertools.count(start))
+        with mock.patch('django.utils.timezone.now', side_effect=clock):
+            Todo.objects.bulk_create(
+                [Todo(title='Todo #%d' % i, memo=memo, owner=user) for i in range(start, stop)],
+                batch_size=batch_size,
+            )
+
+
+def timed(func, repeat=5):
+    """
+    Call `func` `repeat` times after one warm-up call and return the median
+    wall time in seconds.
+    """
+    func()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def print_table(headers, rows):
+    widths = [max(len(str(cell)) for cell in column) for column in zip(headers, *rows)]
+    line = '  '.join('{:>%d}' % width for width in widths)
+    print(line.format(*headers))
+    for row in rows:
+        print(line.format(*row))
@@ -0,0 +1,17 @@
+"""
+Project settings for servers started by the benchmarks: the database is the
+scratch file named by the TODO_BENCH_DB environment variable, tokens outlive
+a benchmark run, and logins are not throttled.
+"""
+import os
+from datetime import timedelta
+
+from todolist_api.settings import *  # noqa: F401,F403
+from todolist_api.settings import DATABASES, SIMPLE_JWT
+
+for alias in DATABASES:
+    DATABASES[alias]['NAME'] = os.environ['TODO_BENCH_DB']
+DEBUG = False
+ALLOWED_HOSTS = ['*']
+SIMPLE_JWT = dict(SIMPLE_JWT, ACCESS_TOKEN_LIFETIME=timedelta(hours=1), REFRESH_TOKEN_LIFETIME=timedelta(hours=1))
+AUTH_THROTTLES = {scope: {'BURST': 10 ** 9, 'RATE': 10 ** 9} for scope in ('ip', 'username')}
@@ -0,0 +1,82 @@
+"""
+Microbenchmarks of the serializers and the JWT authentication classes, run
+with pytest-benchmark:
+
+    pip install pytest-benchmark
+    pytest benchmarks --benchmark-autosave
+    pytest benchmarks --benchmark-compare
+
+`pytest` on its own only runs the tests in tests/.
+"""
+import datetime
+
+import pytest
+
+from django.contrib.auth.models import User
+from django.utils import timezone
+
+from core.authentication import StatelessJWTAuthentication
+from core.serializers import CustomTokenObtainPairSerializer
+from Todo.models import Tag, Todo
+from Todo.serializers import TODO_FIELDS, TodoRowSerializer, TodoSerializer, get_columns
+
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+pytest.importorskip('pytest_benchmark')
+
+
+@pytest.fixture
+def todos():
+    """
+    Fixture returning a page of 50 unsaved todos, half of them completed, with their (no) tags prefetched
+    """
+
+    now = timezone.now()
+    todos = [
+        Todo(id=i, title='Todo #%d' % i, memo='Use the book "Python Testing with Pytest"', owner_id=1,
+             created=now - datetime.timedelta(minutes=i), date_completed=now if i % 2 else None)
+        for i in range(50)
+    ]
+    for todo in todos:
+        todo._prefetched_objects_cache = {'tags': Tag.objects.none()}
+    return todos
+
+
+@pytest.fixture
+def auth_request(db):
+    """
+    Fixture returning a request carrying a valid access token
+    """
+
+    user = User.objects.create_user('johnsmith', 'johnsmith@gmail.com', 'johnnyappleseed')
+    token = CustomTokenObtainPairSerializer.get_token(user).access_token
+    return APIRequestFactory().get('/api/todos/', HTTP_AUTHORIZATION='Bearer %s' % token)
+
+
+def test_todo_serializer_list(benchmark, todos):
+    data = benchmark(lambda: TodoSerializer(todos, many=True).data)
+    assert len(data) == 50
+
+
+def test_todo_row_serializer_list(benchmark, db, todos):
+    # the tags are read with one query, as in the list view
+    rows = [tuple(getattr(todo, {'id': 'pk', 'list': 'list_id'}.get(field, field)) for field in get_columns(TODO_FIELDS))
+            for todo in todos]
+    data = benchmark(lambda: TodoRowSerializer(rows).data)
+    assert data == TodoSerializer(todos, many=True).data
+
+
+def test_todo_serializer_validate(benchmark):
+    data = {'title': 'Learn how to use pytest', 'memo': 'Use the book', 'date_completed': '2020-06-01T12:00:00Z'}
+    assert benchmark(lambda: TodoSerializer(data=data).is_valid())
+
+
+def test_jwt_authentication(benchmark, auth_request):
+    user, token = benchmark(JWTAuthentication().authenticate, auth_request)
+    assert user.username == 'johnsmith'
+
+
+def test_stateless_jwt_authentication(benchmark, auth_request):
+    user, token = benchmark(StatelessJWTAuthentication().authenticate, auth_request)
+    assert user.username == 'johnsmith'
@@ -0,0 +1,76 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+from .cache import TTLCache
+
+
+# full auth.User rows looked up through ClaimsUser.get_user(), keyed by id
+user_cache = TTLCache(
+    maxsize=settings.TOKEN_USER_CACHE.get('MAXSIZE', 1024),
+    ttl=settings.TOKEN_USER_CACHE.get('TTL', 30),
+)
+
+
+class ClaimsUser(TokenUser):
+    """
+    A stateless user built from the claims of a validated access token, so
+    authenticating a request needs no database query. Views which only need
+    the user's id or username can use it as is; `get_user()` returns the
+    full `auth.User` for the rare code paths that need one.
+
+    Since tokens are not re-checked against the database, a user who is
+    deactivated keeps access until their current access token expires.
+    """
+
+    @cached_property
+    def is_admin(self):
+        return bool(self.token.get('is_admin', 0))
+
+    def get_user(self):
+        """
+        Returns the `auth.User` behind the token, from the in-process cache
+        when possible. The instance may be shared between requests, so treat
+        it as read-only.
+        """
+        user = user_cache.get(self.id)
+        if user is None:
+            user = get_user_model().objects.get(**{api_settings.USER_ID_FIELD: self.id})
+            user_cache.set(self.id, user)
+        return user
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """
+    Authenticates requests with a JSON web token like `JWTAuthentication`,
+    but returns a `ClaimsUser` instead of loading `auth.User` from the
+    database on every request.
+    """
+
+    def get_user(self, validated_token):
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+        return ClaimsUser(validated_token)
+
+
+class QueryStringJWTAuthentication(StatelessJWTAuthentication):
+    """
+    Also accepts the access token as `?token=`, for clients which cannot set
+    an Authorization header, such as the browser's EventSource. Tokens in
+    URLs can end up in logs, so only use it for the views that need it.
+    """
+
+    def authenticate(self, request):
+        result = super().authenticate(request)
+        if result is not None:
+            return result
+        raw_token = request.query_params.get('token')
+        if not raw_token:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        return self.get_user(validated_token), validated_token
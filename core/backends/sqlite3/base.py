@@ -0,0 +1,74 @@
+"""
+SQLite backend tuned for serving the API from several threads and processes.
+
+On top of Django's backend, every new connection sets the `PRAGMAS` below
+(or the ones given in OPTIONS['pragmas']): WAL so that readers and a writer
+no longer block each other, `synchronous=NORMAL`, which is durable in WAL
+mode apart from the last transactions before a power loss, and larger page
+and mmap caches. OPTIONS['timeout'] is SQLite's busy timeout, in seconds.
+
+Transactions are started with `BEGIN IMMEDIATE` (OPTIONS['transaction_mode']).
+A plain `BEGIN` takes the write lock only at the first write, and SQLite
+gives up at once, without waiting out the busy timeout, when another
+connection has written in the meantime; that is where "database is locked"
+came from under concurrent writes.
+
+OPTIONS['read_only'] opens the database read-only, for an alias that only
+serves reads.
+
+    DATABASES = {
+        'default': {
+            'ENGINE': 'core.backends.sqlite3',
+            'NAME': 'db.sqlite3',
+            'CONN_MAX_AGE': 600,
+            'OPTIONS': {'timeout': 20},
+        },
+    }
+"""
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+
+
+PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    # in bytes
+    'mmap_size': 256 * 1024 * 1024,
+    # negative sizes are in KiB
+    'cache_size': -64 * 1024,
+}
+
+TRANSACTION_MODES = ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_connection_params(self):
+        options = self.settings_dict['OPTIONS']
+        # the options below are read here rather than passed on to sqlite3.connect()
+        self.pragmas = {**PRAGMAS, **options.get('pragmas', {})}
+        self.read_only = options.get('read_only', False)
+        # a read-only connection cannot take the write lock
+        self.transaction_mode = options.get('transaction_mode', 'DEFERRED' if self.read_only else 'IMMEDIATE').upper()
+        if self.transaction_mode not in TRANSACTION_MODES:
+            raise ImproperlyConfigured(
+                "settings.DATABASES OPTIONS['transaction_mode'] must be one of %s." % ', '.join(TRANSACTION_MODES))
+
+        kwargs = super().get_connection_params()
+        for option in ('pragmas', 'transaction_mode', 'read_only'):
+            kwargs.pop(option, None)
+        if self.read_only and not kwargs['database'].startswith('file:'):
+            kwargs['database'] = 'file:%s?mode=ro' % kwargs['database']
+        return kwargs
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for pragma, value in self.pragmas.items():
+            # the journal mode is stored in the database, and only a writer can change it
+            if not (self.read_only and pragma == 'journal_mode'):
+                conn.execute('PRAGMA %s = %s' % (pragma, value))
+        if self.read_only:
+            conn.execute('PRAGMA query_only = ON')
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute('BEGIN %s' % self.transaction_mode)
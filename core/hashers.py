@@ -0,0 +1,80 @@
+"""
+Password hashers that hash in a bounded thread pool, with their costs read
+from settings.PASSWORD_HASHING.
+
+Hashing a password is slow on purpose. Done in the request thread, a burst of
+logins takes every thread of the server and the CPU with them; through the
+pool, at most PASSWORD_HASHING['WORKERS'] passwords are hashed at once per
+process and the other logins wait their turn while the rest of the API is
+served.
+
+Django rehashes a password as it checks it when its hasher is not the first
+of PASSWORD_HASHERS, or its costs differ from the hasher's, so users move to
+a new profile as they log in.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+_pool = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASHING.get('WORKERS', 2),
+    thread_name_prefix='password-hash',
+)
+_local = threading.local()
+
+
+def _call_in_pool(func, *args, **kwargs):
+    _local.in_pool = True
+    try:
+        return func(*args, **kwargs)
+    finally:
+        _local.in_pool = False
+
+
+def run_in_pool(func, *args, **kwargs):
+    """
+    Calls `func` on the hashing pool and waits for its result.
+    """
+    # hashers call each other, e.g. verify() calls encode(); waiting on the
+    # pool from one of its own threads could deadlock
+    if getattr(_local, 'in_pool', False):
+        return func(*args, **kwargs)
+    return _pool.submit(_call_in_pool, func, *args, **kwargs).result()
+
+
+class PooledHasherMixin:
+    def encode(self, *args, **kwargs):
+        return run_in_pool(super().encode, *args, **kwargs)
+
+    def verify(self, *args, **kwargs):
+        return run_in_pool(super().verify, *args, **kwargs)
+
+    def harden_runtime(self, *args, **kwargs):
+        return run_in_pool(super().harden_runtime, *args, **kwargs)
+
+
+class Argon2PasswordHasher(PooledHasherMixin, hashers.Argon2PasswordHasher):
+    """
+    Argon2id with PASSWORD_HASHING['ARGON2'] costs. Needs `argon2-cffi`.
+    """
+    time_cost = settings.PASSWORD_HASHING['ARGON2']['time_cost']
+    memory_cost = settings.PASSWORD_HASHING['ARGON2']['memory_cost']
+    parallelism = settings.PASSWORD_HASHING['ARGON2']['parallelism']
+
+
+class BCryptSHA256PasswordHasher(PooledHasherMixin, hashers.BCryptSHA256PasswordHasher):
+    """
+    bcrypt of the password's SHA-256, with PASSWORD_HASHING['BCRYPT_ROUNDS']
+    rounds. Needs `bcrypt`.
+    """
+    rounds = settings.PASSWORD_HASHING['BCRYPT_ROUNDS']
+
+
+class PBKDF2PasswordHasher(PooledHasherMixin, hashers.PBKDF2PasswordHasher):
+    """
+    Django's default PBKDF2-SHA256, for hashes made before the profile was
+    set up. Needs nothing more than Python.
+    """
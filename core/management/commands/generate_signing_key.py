@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from core.signing import ALGORITHMS, generate_private_key
+
+
+class Command(BaseCommand):
+    help = 'Prints a new private key for signing tokens, in PEM, to add to JWT_KEYS.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('algorithm', choices=ALGORITHMS)
+
+    def handle(self, *args, **options):
+        self.stdout.write(generate_private_key(options['algorithm']), ending='')
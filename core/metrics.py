@@ -0,0 +1,192 @@
+"""
+In-process request metrics, exported in the Prometheus text format at
+/metrics.
+
+PerformanceMiddleware (core/middleware.py) records every request in the
+histograms below, labelled with its view and method. Each process keeps its
+own metrics, so with several workers every scrape sees one of them; run the
+server with a single worker per container, or add the worker to the scrape
+target, to see them all.
+
+Code can time a part of a sampled request with `span()`; the time is added
+to the Server-Timing header and to the matching histogram.
+"""
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter as Tally, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+
+TIME_BUCKETS = (.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+def format_labels(names, values, **extra):
+    pairs = list(zip(names, values)) + list(extra.items())
+    escaped = ('%s="%s"' % (name, str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n'))
+               for name, value in pairs)
+    return '{%s}' % ','.join(escaped) if pairs else ''
+
+
+class Counter:
+    type = 'counter'
+
+    def __init__(self, name, help, labels=('view',)):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] += amount
+
+    def get(self, *labels):
+        return self._values.get(labels, 0)
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for labels, value in sorted(values.items()):
+            yield self.name + format_labels(self.labels, labels), value
+
+
+class Histogram:
+    type = 'histogram'
+
+    def __init__(self, name, help, buckets, labels=('view', 'method')):
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        self.labels = labels
+        # labels -> [count per bucket, then above the last one], sum
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0]
+            series[0][bisect_left(self.buckets, value)] += 1
+            series[1] += value
+
+    def get_count(self, *labels):
+        series = self._series.get(labels)
+        return sum(series[0]) if series else 0
+
+    def samples(self):
+        with self._lock:
+            series = {labels: (list(counts), total) for labels, (counts, total) in self._series.items()}
+        for labels, (counts, total) in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                yield self.name + '_bucket' + format_labels(self.labels, labels, le=bound), cumulative
+            yield self.name + '_sum' + format_labels(self.labels, labels), total
+            yield self.name + '_count' + format_labels(self.labels, labels), cumulative
+
+
+request_duration = Histogram(
+    'todolist_request_duration_seconds', 'Time to handle a request, excluding streamed content.', TIME_BUCKETS)
+response_size = Histogram(
+    'todolist_response_size_bytes', 'Size of response bodies, excluding streamed ones.', SIZE_BUCKETS)
+db_queries = Histogram(
+    'todolist_request_db_queries', 'Database queries per sampled request.', COUNT_BUCKETS)
+db_duration = Histogram(
+    'todolist_request_db_duration_seconds', 'Time spent in database queries per sampled request.', TIME_BUCKETS)
+serialize_duration = Histogram(
+    'todolist_request_serialize_duration_seconds', 'Time spent serializing todos per sampled request.', TIME_BUCKETS)
+render_duration = Histogram(
+    'todolist_request_render_duration_seconds', 'Time spent rendering the response per sampled request.', TIME_BUCKETS)
+n_plus_one = Counter(
+    'todolist_n_plus_one_total', 'Sampled requests that ran the same query statement repeatedly.')
+todo_cache_requests = Counter(
+    'todolist_todo_cache_requests_total', 'Cacheable todo reads, by whether they were a hit, a miss or a 304.',
+    labels=('result',))
+
+REGISTRY = [request_duration, response_size, db_queries, db_duration, serialize_duration, render_duration, n_plus_one,
+            todo_cache_requests]
+
+
+def render_metrics():
+    """
+    Returns every metric in the Prometheus text exposition format.
+    """
+    lines = []
+    for metric in REGISTRY:
+        lines.append('# HELP %s %s' % (metric.name, metric.help))
+        lines.append('# TYPE %s %s' % (metric.name, metric.type))
+        lines.extend('%s %s' % (name, repr(float(value)) if isinstance(value, float) else value)
+                     for name, value in metric.samples())
+    return '\n'.join(lines) + '\n'
+
+
+# collapses the placeholders of IN (...) lists, whose length varies
+IN_LIST = re.compile(r'\((?:%s, )+%s\)')
+
+
+class RequestMetrics:
+    """
+    What a sampled request did: its database queries, by statement, and the
+    time spent in each span. Install it with `connection.execute_wrapper()`.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.statements = Tally()
+        self.timings = defaultdict(float)
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+            self.statements[IN_LIST.sub('(...)', sql)] += 1
+
+    def repeated_statements(self, threshold):
+        """
+        Returns the (statement, count) of queries run at least `threshold` times.
+        """
+        return [(sql, count) for sql, count in self.statements.most_common()
+                if count >= threshold and not sql.startswith(('SAVEPOINT', 'RELEASE SAVEPOINT'))]
+
+
+_current = ContextVar('request_metrics', default=None)
+
+
+@contextmanager
+def record(metrics):
+    """
+    Makes `metrics` the current request's for the duration of the block.
+    """
+    token = _current.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def span(name):
+    """
+    Adds the time spent in the block to the current request's `name` timing,
+    if the request is sampled.
+    """
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.timings[name] += time.perf_counter() - start
@@ -0,0 +1,102 @@
+import logging
+import random
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from . import metrics
+
+
+logger = logging.getLogger(__name__)
+
+
+def get_view_name(request):
+    """
+    Names the view that handled `request` by its URL name, or by its
+    function's dotted path for unnamed URLs.
+    """
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return '<unresolved>'
+    return match.view_name or match._func_path
+
+
+class PerformanceMiddleware:
+    """
+    Records the latency and response size of every request in core.metrics.
+
+    A sample of PERF_METRICS['SAMPLE_RATE'] of the requests is looked at more
+    closely: the number and time of its database queries, the time spent in
+    `metrics.span('serialize')` blocks and rendering the response are
+    recorded too and sent back in a Server-Timing header. When a view in one
+    of PERF_METRICS['N_PLUS_ONE_MODULES'] runs the same statement
+    PERF_METRICS['N_PLUS_ONE_THRESHOLD'] times or more, typically a query
+    per item of a list, a warning is logged.
+
+    Put it first in MIDDLEWARE, so that it times the others too.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        options = settings.PERF_METRICS
+        start = time.perf_counter()
+        if random.random() >= options['SAMPLE_RATE']:
+            response = self.get_response(request)
+            self.record_response(request, response, time.perf_counter() - start)
+            return response
+
+        recorder = metrics.RequestMetrics()
+        with ExitStack() as stack:
+            stack.enter_context(metrics.record(recorder))
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            request.request_metrics = recorder
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - start
+        view, method = self.record_response(request, response, elapsed)
+
+        metrics.db_queries.observe(recorder.queries, view, method)
+        metrics.db_duration.observe(recorder.db_time, view, method)
+        metrics.serialize_duration.observe(recorder.timings['serialize'], view, method)
+        metrics.render_duration.observe(recorder.timings['render'], view, method)
+        if options['SERVER_TIMING']:
+            response['Server-Timing'] = ', '.join([
+                'db;dur=%.3f;desc="queries: %d"' % (recorder.db_time * 1000, recorder.queries),
+                'serialize;dur=%.3f' % (recorder.timings['serialize'] * 1000),
+                'render;dur=%.3f' % (recorder.timings['render'] * 1000),
+                'total;dur=%.3f' % (elapsed * 1000),
+            ])
+        self.check_n_plus_one(request, view, recorder, options)
+        return response
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered right after this hook returns
+        recorder = getattr(request, 'request_metrics', None)
+        if recorder is not None:
+            start = time.perf_counter()
+
+            def rendered(response):
+                recorder.timings['render'] += time.perf_counter() - start
+            response.add_post_render_callback(rendered)
+        return response
+
+    def record_response(self, request, response, elapsed):
+        view, method = get_view_name(request), request.method
+        metrics.request_duration.observe(elapsed, view, method)
+        if not response.streaming:
+            metrics.response_size.observe(len(response.content), view, method)
+        return view, method
+
+    def check_n_plus_one(self, request, view, recorder, options):
+        match = getattr(request, 'resolver_match', None)
+        if match is None or not match._func_path.startswith(tuple(options['N_PLUS_ONE_MODULES'])):
+            return
+        repeated = recorder.repeated_statements(options['N_PLUS_ONE_THRESHOLD'])
+        if repeated:
+            metrics.n_plus_one.inc(view)
+        for sql, count in repeated:
+            logger.warning('Possible N+1 queries: %s %s ran %d times: %s', request.method, view, count, sql)
@@ -1,3 +1,14 @@
 from django.db import models
 
-# Create your models here.
+
+class RevokedToken(models.Model):
+    """
+    The id (`jti` claim) of a refresh token that may no longer be used,
+    because it was rotated or revoked. Rows are only needed until the token
+    expires, and are pruned after that. See core/revocation.py.
+    """
+    jti = models.CharField(max_length=255, primary_key=True)
+    expires = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return 'Revoked token %s' % self.jti
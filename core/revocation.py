@@ -0,0 +1,90 @@
+"""
+Revocation of refresh tokens, for rotation and logout.
+
+A token is revoked by inserting its `jti` into RevokedToken. The insert
+fails on the primary key if the token was revoked already, so the write
+that rotation needs anyway doubles as the check: refreshing costs no extra
+query, and two processes can never both accept the same token.
+
+Ids revoked in this process are also kept in memory until their token
+expires, so a replayed token is refused without a query. With rotation
+turned off, refreshing doesn't revoke the token, and check() looks it up
+instead. Expired rows are
+deleted every TOKEN_REVOCATION['PRUNE_INTERVAL'] seconds by whichever
+request comes next, so the table only ever holds tokens that are still live.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+from .cache import TTLCache
+from .models import RevokedToken
+
+
+revoked_ids = TTLCache(
+    maxsize=settings.TOKEN_REVOCATION.get('CACHE_MAXSIZE', 100000),
+    ttl=api_settings.REFRESH_TOKEN_LIFETIME.total_seconds(),
+)
+
+_last_prune = 0
+_prune_lock = threading.Lock()
+
+
+def revoke(token):
+    """
+    Revokes `token`, raising `TokenError` if it had been revoked before.
+    """
+    jti = token[api_settings.JTI_CLAIM]
+    if revoked_ids.get(jti) is not None:
+        raise TokenError(_('Token is blacklisted'))
+    try:
+        with transaction.atomic():
+            RevokedToken.objects.create(jti=jti, expires=datetime_from_epoch(token['exp']))
+    except IntegrityError:
+        revoked_ids.set(jti, True, ttl=token['exp'] - time.time())
+        raise TokenError(_('Token is blacklisted'))
+    revoked_ids.set(jti, True, ttl=token['exp'] - time.time())
+    prune_if_due()
+
+
+def check(token):
+    """
+    Raises `TokenError` if `token` has been revoked.
+    """
+    jti = token[api_settings.JTI_CLAIM]
+    if revoked_ids.get(jti) is None:
+        if not RevokedToken.objects.filter(jti=jti).exists():
+            return
+        revoked_ids.set(jti, True, ttl=token['exp'] - time.time())
+    raise TokenError(_('Token is blacklisted'))
+
+
+def prune(batch_size=1000):
+    """
+    Deletes the revoked tokens that have expired, `batch_size` at a time so
+    that writers are never held up for long. Returns how many.
+    """
+    expired = RevokedToken.objects.filter(expires__lt=timezone.now())
+    deleted = 0
+    while True:
+        jtis = list(expired.values_list('jti', flat=True)[:batch_size])
+        if not jtis:
+            return deleted
+        deleted += RevokedToken.objects.filter(jti__in=jtis).delete()[0]
+
+
+def prune_if_due():
+    global _last_prune
+    now = time.monotonic()
+    with _prune_lock:
+        if now - _last_prune < settings.TOKEN_REVOCATION['PRUNE_INTERVAL']:
+            return
+        _last_prune = now
+    prune()
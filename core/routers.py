@@ -0,0 +1,85 @@
+"""
+Sends reads of the busiest endpoints to read replicas of the database.
+
+Views opt in by running their reads inside `read_from_replica()`; every other
+read, and every write, goes to 'default', the primary. Replicas are listed by
+alias in settings.DATABASE_REPLICAS, and one is picked at random per block.
+
+Replicas lag behind the primary, so once a user has written, their reads stay
+on the primary for settings.DATABASE_REPLICA_PIN_SECONDS: call
+`pin_to_primary()` after a write. Pins are kept in the default cache, which
+has to be shared between processes for them to hold across processes.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+# alias reads are sent to in the current read_from_replica() block
+_read_database = ContextVar('read_database', default=None)
+
+
+def get_pin_key(user_id):
+    return 'db:pinned:%s' % user_id
+
+
+def pin_to_primary(user_id):
+    """
+    Keeps the user's reads on the primary for DATABASE_REPLICA_PIN_SECONDS.
+    """
+    if settings.DATABASE_REPLICAS and settings.DATABASE_REPLICA_PIN_SECONDS:
+        cache.set(get_pin_key(user_id), True, settings.DATABASE_REPLICA_PIN_SECONDS)
+
+
+def is_pinned(user_id):
+    return cache.get(get_pin_key(user_id), False)
+
+
+@contextmanager
+def read_from_replica(user_id=None):
+    """
+    Routes the reads in the block to a replica, unless there are none or
+    `user_id` is pinned to the primary. Yields the alias chosen.
+    """
+    replicas = settings.DATABASE_REPLICAS
+    alias = None
+    if replicas and (user_id is None or not is_pinned(user_id)):
+        alias = random.choice(replicas)
+    token = _read_database.set(alias)
+    try:
+        yield alias or DEFAULT_DB_ALIAS
+    finally:
+        _read_database.reset(token)
+
+
+class ReplicaRouter:
+    """
+    Database router for `read_from_replica()`. Writes, and reads made in a
+    transaction on the primary, always go to the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        alias = _read_database.get()
+        if alias is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replicas hold the same rows as the primary
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # replicas get their schema from the primary
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
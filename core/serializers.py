@@ -1,7 +1,13 @@
 from django.contrib.auth.models import User
 
+from django.utils.translation import gettext_lazy as _
 from rest_framework import serializers
+from rest_framework_simplejwt.exceptions import TokenError
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from . import revocation
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -16,5 +22,44 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     def get_token(cls, user):
         token = super(CustomTokenObtainPairSerializer, cls).get_token(user)
 
+        token['username'] = user.username
         token['is_admin'] = 0
-        return token
\ No newline at end of file
+        return token
+
+
+class RotatingTokenRefreshSerializer(serializers.Serializer):
+    """
+    Like simplejwt's TokenRefreshSerializer, but revokes the refresh token
+    it is given when rotating it (see core/revocation.py), so that each
+    refresh token can be used once, and refuses revoked tokens either way.
+    Tokens of users who were deactivated or deleted since they logged in are
+    refused too.
+    """
+    refresh = serializers.CharField()
+
+    def validate(self, attrs):
+        refresh = RefreshToken(attrs['refresh'])
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            revocation.revoke(refresh)
+        else:
+            revocation.check(refresh)
+        # after revoking, so that replayed tokens are still refused without a query
+        active = User.objects.filter(**{
+            api_settings.USER_ID_FIELD: refresh[api_settings.USER_ID_CLAIM], 'is_active': True,
+        }).exists()
+        if not active:
+            raise TokenError(_('User not found or inactive'))
+        data = {'access': str(refresh.access_token)}
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            refresh.set_jti()
+            refresh.set_exp()
+            data['refresh'] = str(refresh)
+        return data
+
+
+class TokenRevokeSerializer(serializers.Serializer):
+    refresh = serializers.CharField()
+
+    def validate(self, attrs):
+        revocation.revoke(RefreshToken(attrs['refresh']))
+        return {}
@@ -0,0 +1,212 @@
+"""
+Signing of JSON web tokens with a ring of asymmetric keys.
+
+Tokens are signed with the key JWT_KEYS['ACTIVE'] names, whose id goes in
+the token's `kid` header, and verified with whichever key of JWT_KEYS['KEYS']
+the header names. The public halves are served as a JSON Web Key Set at
+/api/.well-known/jwks.json, so other services can verify tokens themselves
+instead of calling /api/token/verify.
+
+To rotate keys: publish the new key in KEYS for longer than JWKS_MAX_AGE,
+so every verifier has it, then make it ACTIVE, and drop the old key once
+the last refresh token signed with it has expired. Retired keys only need
+their PUBLIC_KEY.
+
+With ACTIVE unset, tokens are signed as simplejwt does on its own, by
+default with HS256 and the SECRET_KEY. Such tokens, which have no `kid`, are
+still accepted while ACCEPT_LEGACY_TOKENS is true, so that switching to the
+key ring doesn't log anybody out.
+"""
+import base64
+import hashlib
+import json
+from functools import lru_cache
+
+import jwt
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from jwt.algorithms import Algorithm
+from rest_framework_simplejwt.backends import TokenBackend
+from rest_framework_simplejwt.exceptions import TokenBackendError
+from rest_framework_simplejwt.settings import api_settings
+
+try:
+    from cryptography.exceptions import InvalidSignature
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+except ImportError:
+    serialization = None
+
+
+ALGORITHMS = ('RS256', 'EdDSA')
+
+
+class EdDSAAlgorithm(Algorithm):
+    """
+    Ed25519 signatures for PyJWT, which only supports them from version 2.
+    """
+
+    def prepare_key(self, key):
+        if isinstance(key, (ed25519.Ed25519PrivateKey, ed25519.Ed25519PublicKey)):
+            return key
+        raise jwt.InvalidKeyError('Expected an Ed25519 key object.')
+
+    def sign(self, msg, key):
+        return key.sign(msg)
+
+    def verify(self, msg, key, sig):
+        if isinstance(key, ed25519.Ed25519PrivateKey):
+            key = key.public_key()
+        try:
+            key.verify(sig, msg)
+        except InvalidSignature:
+            return False
+        return True
+
+
+def register_algorithms():
+    try:
+        jwt.register_algorithm('EdDSA', EdDSAAlgorithm())
+    except ValueError:
+        # registered already, or supported natively
+        pass
+
+
+def b64(number_or_bytes):
+    if isinstance(number_or_bytes, int):
+        number_or_bytes = number_or_bytes.to_bytes((number_or_bytes.bit_length() + 7) // 8, 'big')
+    return base64.urlsafe_b64encode(number_or_bytes).rstrip(b'=').decode('ascii')
+
+
+class SigningKey:
+    """
+    One key of the ring: its id, algorithm and key objects. `private_key` is
+    None for keys that are only used to verify.
+    """
+
+    def __init__(self, kid, algorithm, private_key=None, public_key=None):
+        if algorithm not in ALGORITHMS:
+            raise ValueError('JWT_KEYS: key %r has an unsupported algorithm %r; expected one of %s.'
+                             % (kid, algorithm, ', '.join(ALGORITHMS)))
+        if serialization is None:
+            raise ImportError('JWT_KEYS: signing with %s needs the cryptography package.' % algorithm)
+        self.kid = kid
+        self.algorithm = algorithm
+        self.private_key = None
+        if private_key:
+            self.private_key = serialization.load_pem_private_key(private_key.encode(), password=None)
+        if public_key:
+            self.public_key = serialization.load_pem_public_key(public_key.encode())
+        elif self.private_key is not None:
+            self.public_key = self.private_key.public_key()
+        else:
+            raise ValueError('JWT_KEYS: key %r needs a PRIVATE_KEY or a PUBLIC_KEY.' % kid)
+        expected = rsa.RSAPublicKey if algorithm == 'RS256' else ed25519.Ed25519PublicKey
+        if not isinstance(self.public_key, expected):
+            raise ValueError('JWT_KEYS: key %r is not a %s key.' % (kid, algorithm))
+
+    def to_jwk(self):
+        jwk = {'kid': self.kid, 'use': 'sig', 'alg': self.algorithm}
+        if self.algorithm == 'RS256':
+            numbers = self.public_key.public_numbers()
+            jwk.update(kty='RSA', n=b64(numbers.n), e=b64(numbers.e))
+        else:
+            raw = self.public_key.public_bytes(serialization.Encoding.Raw, serialization.PublicFormat.Raw)
+            jwk.update(kty='OKP', crv='Ed25519', x=b64(raw))
+        return jwk
+
+
+def generate_private_key(algorithm):
+    """
+    Returns a new private key for `algorithm` as unencrypted PEM.
+    """
+    if algorithm == 'RS256':
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    else:
+        key = ed25519.Ed25519PrivateKey.generate()
+    return key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                             serialization.NoEncryption()).decode('ascii')
+
+
+class KeyRingTokenBackend(TokenBackend):
+    """
+    simplejwt token backend signing with the active key of the ring and
+    verifying with the key named by each token's `kid` header. The
+    algorithm always comes from the key, never from the token.
+    """
+
+    def __init__(self, keys, active=None, accept_legacy_tokens=True):
+        super().__init__(api_settings.ALGORITHM, api_settings.SIGNING_KEY, api_settings.VERIFYING_KEY,
+                         api_settings.AUDIENCE, api_settings.ISSUER)
+        self.keys = {key.kid: key for key in keys}
+        self.active = self.keys[active] if active is not None else None
+        if self.active is not None and self.active.private_key is None:
+            raise ValueError('JWT_KEYS: the ACTIVE key %r has no PRIVATE_KEY.' % active)
+        self.accept_legacy_tokens = accept_legacy_tokens
+
+    def encode(self, payload):
+        if self.active is None:
+            return super().encode(payload)
+        jwt_payload = payload.copy()
+        if self.audience is not None:
+            jwt_payload['aud'] = self.audience
+        if self.issuer is not None:
+            jwt_payload['iss'] = self.issuer
+        token = jwt.encode(jwt_payload, self.active.private_key, algorithm=self.active.algorithm,
+                           headers={'kid': self.active.kid})
+        return token.decode('utf-8')
+
+    def decode(self, token, verify=True):
+        try:
+            kid = jwt.get_unverified_header(token).get('kid')
+        except jwt.InvalidTokenError:
+            raise TokenBackendError(_('Token is invalid or expired'))
+        if kid is None:
+            if not self.accept_legacy_tokens:
+                raise TokenBackendError(_('Token is invalid or expired'))
+            return super().decode(token, verify=verify)
+        key = self.keys.get(kid) if isinstance(kid, str) else None
+        if key is None:
+            raise TokenBackendError(_('Token is invalid or expired'))
+        try:
+            return jwt.decode(token, key.public_key, algorithms=[key.algorithm], verify=verify,
+                              audience=self.audience, issuer=self.issuer,
+                              options={'verify_aud': self.audience is not None})
+        except jwt.InvalidTokenError:
+            raise TokenBackendError(_('Token is invalid or expired'))
+
+
+def load_keys(options):
+    return [
+        SigningKey(key['KID'], key['ALGORITHM'], key.get('PRIVATE_KEY'), key.get('PUBLIC_KEY'))
+        for key in options.get('KEYS', ())
+    ]
+
+
+def get_token_backend(options=None):
+    options = settings.JWT_KEYS if options is None else options
+    register_algorithms()
+    return KeyRingTokenBackend(load_keys(options), options.get('ACTIVE'), options.get('ACCEPT_LEGACY_TOKENS', True))
+
+
+def install():
+    """
+    Makes simplejwt sign and verify tokens with the key ring.
+    """
+    from rest_framework_simplejwt import state
+
+    state.token_backend = get_token_backend()
+    get_jwks.cache_clear()
+
+
+@lru_cache(maxsize=None)
+def get_jwks():
+    """
+    Returns the JSON Web Key Set of the ring's public keys, as bytes, and
+    its ETag.
+    """
+    from rest_framework_simplejwt import state
+
+    keys = getattr(state.token_backend, 'keys', {})
+    body = json.dumps({'keys': [key.to_jwk() for key in keys.values()]}, separators=(',', ':')).encode()
+    return body, '"%s"' % hashlib.sha1(body).hexdigest()
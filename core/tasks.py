@@ -0,0 +1,45 @@
+"""
+Background tasks, run by `manage.py run_worker`; see jobs/queue.py.
+"""
+from django.contrib.auth.models import User
+
+from jobs.queue import enqueue, task
+from Todo.models import Tag, Todo, TodoList, TodoTombstone
+
+
+# rows deleted per query, so that other writers are never held up for long
+DELETE_CHUNK_SIZE = 1000
+# chunks deleted per job, well within the visibility timeout, before the
+# rest is left to another
+DELETE_CHUNKS_PER_JOB = 100
+
+
+@task
+def delete_account(user_id, chunk_size=DELETE_CHUNK_SIZE, max_chunks=DELETE_CHUNKS_PER_JOB):
+    """
+    Deletes a user's todos, sync tombstones, lists and tags `chunk_size`
+    rows at a time, then the user. After `max_chunks` chunks, the rest is
+    left to another job, enqueued to carry on.
+
+    Deleting the user alone would cascade to all of these in one
+    transaction, holding up every other write for as long as it takes.
+    """
+    querysets = [
+        # todos first, so that deleting their lists has no todos to update
+        Todo.objects.filter(owner_id=user_id),
+        TodoTombstone.objects.filter(owner_id=user_id),
+        TodoList.objects.filter(owner_id=user_id),
+        Tag.objects.filter(owner_id=user_id),
+    ]
+    chunks = 0
+    for queryset in querysets:
+        while True:
+            ids = list(queryset.values_list('id', flat=True)[:chunk_size])
+            if not ids:
+                break
+            if chunks == max_chunks:
+                enqueue(delete_account, user_id=user_id, chunk_size=chunk_size, max_chunks=max_chunks)
+                return
+            queryset.model.objects.filter(id__in=ids).delete()
+            chunks += 1
+    User.objects.filter(id=user_id).delete()
@@ -0,0 +1,98 @@
+"""
+Token bucket throttles for the login and registration endpoints.
+
+Each client gets a bucket of settings.AUTH_THROTTLES[scope]['BURST'] tokens,
+refilled at ['RATE'] tokens per second. A request takes a token, and is
+refused with 429 and a Retry-After header when the bucket is empty. Buckets
+are kept in memory, per process.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from rest_framework.throttling import BaseThrottle
+
+
+class TokenBuckets:
+    """
+    A thread-safe in-memory set of token buckets, keeping the `maxsize` most
+    recently used. A bucket that is dropped comes back full, as it would be
+    after a while unused anyway.
+    """
+
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def take(self, key, burst, rate):
+        """
+        Takes a token from the bucket for `key`. Returns 0 if there was one,
+        or else the number of seconds until there is.
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            wait = 0 if tokens >= 1 else (1 - tokens) / rate
+            if not wait:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+        return wait
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+buckets = TokenBuckets()
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Throttles requests by the key `get_key()` returns, with the burst and
+    rate of its scope in settings.AUTH_THROTTLES. Requests without a key are
+    not throttled.
+    """
+    scope = None
+
+    def get_key(self, request):
+        raise NotImplementedError('.get_key() must be overridden')
+
+    def allow_request(self, request, view):
+        self.wait_time = 0
+        key = self.get_key(request)
+        if key is None:
+            return True
+        limits = settings.AUTH_THROTTLES[self.scope]
+        self.wait_time = buckets.take((self.scope, key), limits['BURST'], limits['RATE'])
+        return not self.wait_time
+
+    def wait(self):
+        return self.wait_time
+
+
+class IPThrottle(TokenBucketThrottle):
+    scope = 'ip'
+
+    def get_key(self, request):
+        return self.get_ident(request)
+
+
+class UsernameThrottle(TokenBucketThrottle):
+    """
+    Throttles attempts on a username, from however many addresses they come.
+    """
+    scope = 'username'
+
+    def get_key(self, request):
+        username = request.data.get('username') if hasattr(request.data, 'get') else None
+        if not isinstance(username, str):
+            return None
+        return username.lower()
@@ -1,19 +1,25 @@
 from django.urls import path, include
 
 from rest_framework.routers import DefaultRouter
-from rest_framework_simplejwt import views as jwt_views
 
-from Todo.views import TodoViewSet
+from Todo.views import TagViewSet, TodoListViewSet, TodoViewSet, sync_todos, todo_stats
 from . import views
 
 # set up router and register the viewsets; does URL binding automatically
 router = DefaultRouter()
 router.register(r'todos', TodoViewSet)
+router.register(r'lists', TodoListViewSet)
+router.register(r'tags', TagViewSet)
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('todos/sync', sync_todos, name='todo-sync'),
+    path('todos/stats', todo_stats, name='todo-stats'),
     path('users', views.register_user),
+    path('users/me', views.delete_account, name='account-delete'),
     path('token', views.CustomTokenObtainPairView.as_view(), name='token-obtain-pair'),
-    path('token/refresh', jwt_views.TokenRefreshView.as_view(), name='token-refresh'),
+    path('token/refresh', views.RotatingTokenRefreshView.as_view(), name='token-refresh'),
+    path('token/revoke', views.TokenRevokeView.as_view(), name='token-revoke'),
     path('token/verify', views.check_user_token, name='token-verify'),
+    path('.well-known/jwks.json', views.jwks, name='jwks'),
 ]
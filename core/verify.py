@@ -0,0 +1,50 @@
+import hmac
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from .cache import TTLCache
+
+
+# claims of recently verified tokens keyed by their signature; entries never
+# outlive the token itself
+verified_tokens = TTLCache(
+    maxsize=settings.TOKEN_VERIFY_CACHE.get('MAXSIZE', 10000),
+    ttl=settings.TOKEN_VERIFY_CACHE.get('TTL', 60),
+)
+
+
+def verify_token(raw_token):
+    """
+    Validates an access token and returns its claims, raising `InvalidToken`
+    if it is not valid. Tokens that were verified recently are answered from
+    the cache without decoding them again.
+    """
+    if not isinstance(raw_token, str):
+        raise InvalidToken(_('Token is invalid or expired'))
+
+    signature = raw_token.rsplit('.', 1)[-1]
+    cached = verified_tokens.get(signature)
+    # compare the whole token: a forged header or payload reusing a valid
+    # signature must not be accepted
+    if cached is not None and hmac.compare_digest(cached[0], raw_token):
+        return cached[1]
+
+    claims = JWTAuthentication().get_validated_token(raw_token).payload
+    if 'username' not in claims:
+        # tokens issued before the username claim was added
+        user_model = get_user_model()
+        try:
+            user = user_model.objects.only('username').get(
+                **{api_settings.USER_ID_FIELD: claims[api_settings.USER_ID_CLAIM]})
+        except (KeyError, user_model.DoesNotExist):
+            raise AuthenticationFailed(_('User not found'), code='user_not_found')
+        claims = dict(claims, username=user.username)
+
+    verified_tokens.set(signature, (raw_token, claims), ttl=claims['exp'] - time.time())
+    return claims
@@ -1,21 +1,36 @@
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
+from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status, generics
+from rest_framework_simplejwt.exceptions import TokenError
 from rest_framework_simplejwt.tokens import RefreshToken
-from rest_framework_simplejwt import authentication
-from rest_framework_simplejwt.views import TokenObtainPairView
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView, TokenViewBase
 
+from django.conf import settings
 from django.contrib.auth.models import User
-from django.db import IntegrityError
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse, HttpResponseForbidden, HttpResponseNotModified
+from django.utils.cache import parse_etags
 
-from .serializers import UserSerializer, CustomTokenObtainPairSerializer
+from jobs.queue import enqueue
+
+from . import revocation, tasks
+from .authentication import user_cache
+from .metrics import render_metrics
+from .signing import get_jwks
+from .routers import read_from_replica
+from .serializers import (
+    CustomTokenObtainPairSerializer, RotatingTokenRefreshSerializer, TokenRevokeSerializer, UserSerializer,
+)
+from .throttling import IPThrottle, UsernameThrottle
+from .verify import verify_token
 
 
 # helper method for manual creation of JWT tokens
 
 
 def get_tokens_for_user(user):
-    refresh = RefreshToken.for_user(user)
+    refresh = CustomTokenObtainPairSerializer.get_token(user)
     return {
         'refresh': str(refresh),
         'access': str(refresh.access_token),
@@ -24,13 +39,16 @@ def get_tokens_for_user(user):
 
 @api_view(['POST'])
 def check_user_token(request):
+    token = request.data.get('token') if isinstance(request.data, dict) else None
+    if not isinstance(token, str) or not token:
+        return Response({'token': ['This field is required.']}, status=status.HTTP_400_BAD_REQUEST)
     # if the token is not valid, an invalid token response is automatically returned
-    token = authentication.JWTAuthentication().get_validated_token(request.data['token'])
-    # however, if valid token, proceed to find the user
-    user = authentication.JWTAuthentication().get_user(token)
-    return Response({"username": user.username}, status=status.HTTP_200_OK)
+    with read_from_replica():
+        claims = verify_token(token)
+    return Response({"username": claims['username']}, status=status.HTTP_200_OK)
 
 @api_view(['POST'])
+@throttle_classes([IPThrottle, UsernameThrottle])
 def register_user(request):
     try:
         user = request.data
@@ -43,5 +61,73 @@ def register_user(request):
         return Response({"error": "Username is taken. Please choose another."}, status=status.HTTP_409_CONFLICT)
 
 
+@api_view(['DELETE'])
+@permission_classes([IsAuthenticated])
+def delete_account(request):
+    """
+    Deletes the current user's account. The user is deactivated at once, so
+    they can no longer log in, and the account and everything in it are
+    deleted in the background (see core/tasks.py). Pass the client's
+    `refresh` token to revoke it too.
+    """
+    if not isinstance(request.data, dict):
+        return Response({'detail': 'Expected an object, optionally with a "refresh" token.'},
+                        status=status.HTTP_400_BAD_REQUEST)
+    with transaction.atomic():
+        # only the first request enqueues a deletion
+        if User.objects.filter(id=request.user.id, is_active=True).update(is_active=False):
+            enqueue(tasks.delete_account, user_id=request.user.id)
+    user_cache.delete(request.user.id)
+    if request.data.get('refresh'):
+        try:
+            revocation.revoke(RefreshToken(request.data['refresh']))
+        except TokenError:
+            # invalid, or revoked already
+            pass
+    return Response(status=status.HTTP_202_ACCEPTED)
+
+
 class CustomTokenObtainPairView(TokenObtainPairView):
-    serializer_class = CustomTokenObtainPairSerializer
\ No newline at end of file
+    serializer_class = CustomTokenObtainPairSerializer
+    throttle_classes = [IPThrottle, UsernameThrottle]
+
+
+class RotatingTokenRefreshView(TokenRefreshView):
+    serializer_class = RotatingTokenRefreshSerializer
+
+
+class TokenRevokeView(TokenViewBase):
+    """
+    Revokes a refresh token, e.g. on logout. Its access tokens stay valid
+    until they expire.
+    """
+    serializer_class = TokenRevokeSerializer
+
+    def post(self, request, *args, **kwargs):
+        super().post(request, *args, **kwargs)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+def metrics(request):
+    """
+    Serves the request metrics in the Prometheus text format, to the
+    addresses in PERF_METRICS['ALLOWED_IPS'] only.
+    """
+    if request.META.get('REMOTE_ADDR') not in settings.PERF_METRICS['ALLOWED_IPS']:
+        return HttpResponseForbidden()
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def jwks(request):
+    """
+    Serves the public signing keys as a JSON Web Key Set, for services that
+    verify tokens themselves.
+    """
+    body, etag = get_jwks()
+    if etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(body, content_type='application/json')
+    response['ETag'] = etag
+    response['Cache-Control'] = 'public, max-age=%d' % settings.JWT_KEYS['JWKS_MAX_AGE']
+    return response
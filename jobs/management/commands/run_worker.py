@@ -0,0 +1,32 @@
+import signal
+
+from django.core.management.base import BaseCommand
+
+from jobs.queue import Worker
+
+
+class Command(BaseCommand):
+    help = ('Runs background jobs until interrupted, finishing the job at hand first. '
+            'Run several at once to run jobs in parallel.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--burst', action='store_true',
+                            help='Exit once no jobs are due instead of waiting for more.')
+        parser.add_argument('--batch-size', type=int, help='Jobs to claim at a time.')
+        parser.add_argument('--poll-interval', type=float,
+                            help='Seconds to wait before looking for jobs again when none are due.')
+
+    def handle(self, *args, **options):
+        worker = Worker(batch_size=options['batch_size'], poll_interval=options['poll_interval'])
+
+        def stop(signum, frame):
+            self.stdout.write('Stopping once the current job is finished')
+            worker.stop()
+
+        handlers = {signum: signal.signal(signum, stop) for signum in (signal.SIGINT, signal.SIGTERM)}
+        try:
+            worker.run(burst=options['burst'])
+        finally:
+            for signum, handler in handlers.items():
+                signal.signal(signum, handler)
+        self.stdout.write('%d jobs succeeded, %d failed' % (worker.succeeded, worker.failed))
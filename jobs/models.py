@@ -0,0 +1,43 @@
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """
+    A call of a task to run in the background, by `manage.py run_worker`.
+    See jobs/queue.py.
+
+    While a job is queued, `run_at` is the earliest it may start. Once a
+    worker claims it, it is running and `run_at` is when the claim expires:
+    a job still running by then is presumed lost with its worker and is
+    claimed again. Jobs are deleted once they succeed, and kept as failed
+    once they have used up their attempts.
+    """
+
+    class Status(models.IntegerChoices):
+        QUEUED = 0
+        RUNNING = 1
+        FAILED = 2
+
+    task = models.CharField(max_length=200)
+    kwargs = models.JSONField(default=dict)
+    status = models.SmallIntegerField(choices=Status.choices, default=Status.QUEUED)
+    run_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField()
+    # a token set by each claim, so that a worker whose claim expired cannot
+    # finish or fail a job another worker has claimed since
+    lock = models.CharField(max_length=32, blank=True, db_index=True)
+    last_error = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # the jobs workers may claim, in the order they claim them
+            models.Index(fields=['run_at', 'id'], name='job_ready_idx',
+                         condition=Q(status__in=[0, 1])),
+        ]
+
+    def __str__(self):
+        return 'Job #%d (%s)' % (self.pk, self.task)
@@ -0,0 +1,222 @@
+"""
+A small job queue kept in the database, for work too slow to do within a
+request. Jobs are rows of jobs.Job, so they are enqueued in the same
+transaction as the writes that call for them, and are run by
+`python manage.py run_worker` processes.
+
+Tasks are functions registered with @task, in a `tasks` module of an
+installed app so that workers find them:
+
+    @task(max_attempts=3)
+    def delete_account(user_id):
+        ...
+
+    enqueue(delete_account, user_id=user.id)
+
+Keyword arguments must be JSON-serializable.
+
+Jobs run at least once. A worker claims jobs for JOBS['VISIBILITY_TIMEOUT']
+seconds, and a job that is not finished by then, e.g. because its worker
+died, is claimed again by another. Tasks must therefore be idempotent, and
+work that may take longer than the timeout should be done a part at a time,
+each job enqueueing the next. A job that raises is retried after its task's
+`retry_delay` seconds, doubled after every attempt, until it has been tried
+`max_attempts` times; it is then kept as failed, with the error.
+
+Any number of workers can run at once. Where the database supports it,
+jobs are claimed with SELECT ... FOR UPDATE SKIP LOCKED, so that workers
+skip each other's claims rather than wait for them. Elsewhere, e.g. on
+SQLite, which has a single writer anyway, a claim is one UPDATE of the next
+jobs due, which marks them with a token of its own.
+"""
+import datetime
+import logging
+import threading
+import traceback
+import uuid
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F, Subquery
+from django.utils import timezone
+
+from .models import Job
+
+
+logger = logging.getLogger(__name__)
+
+# registered tasks by name
+registry = {}
+
+
+class Task:
+    """
+    A registered task. `max_attempts` and `retry_delay` default to the
+    JOBS settings.
+    """
+
+    def __init__(self, func, max_attempts=None, retry_delay=None):
+        self.func = func
+        self.name = get_task_name(func)
+        self._max_attempts = max_attempts
+        self._retry_delay = retry_delay
+
+    @property
+    def max_attempts(self):
+        return self._max_attempts or settings.JOBS['MAX_ATTEMPTS']
+
+    @property
+    def retry_delay(self):
+        return self._retry_delay if self._retry_delay is not None else settings.JOBS['RETRY_DELAY']
+
+
+def get_task_name(func):
+    return '%s.%s' % (func.__module__, func.__qualname__)
+
+
+def task(func=None, *, max_attempts=None, retry_delay=None):
+    """
+    Registers a function as a task, with @task or @task(...). The function
+    is returned as is, so it can still be called directly.
+    """
+    def register(func):
+        registry[get_task_name(func)] = Task(func, max_attempts, retry_delay)
+        return func
+    return register if func is None else register(func)
+
+
+def enqueue(func, **kwargs):
+    """
+    Queues a call of the task `func` with `kwargs`, and returns its Job.
+    """
+    name = get_task_name(func)
+    if name not in registry:
+        raise ValueError('%s is not a registered task.' % name)
+    return Job.objects.create(task=name, kwargs=kwargs, max_attempts=registry[name].max_attempts)
+
+
+def claim(limit=1, visibility_timeout=None):
+    """
+    Claims up to `limit` of the jobs due, in the order they were due, for
+    `visibility_timeout` seconds (JOBS['VISIBILITY_TIMEOUT'] by default),
+    and returns them.
+    """
+    if visibility_timeout is None:
+        visibility_timeout = settings.JOBS['VISIBILITY_TIMEOUT']
+    now = timezone.now()
+    lock = uuid.uuid4().hex
+    due = (Job.objects.filter(status__in=[Job.Status.QUEUED, Job.Status.RUNNING], run_at__lte=now)
+           .order_by('run_at', 'id'))
+    changes = {
+        'status': Job.Status.RUNNING,
+        'run_at': now + datetime.timedelta(seconds=visibility_timeout),
+        'attempts': F('attempts') + 1,
+        'lock': lock,
+    }
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            ids = list(due.select_for_update(skip_locked=True).values_list('id', flat=True)[:limit])
+            claimed = Job.objects.filter(id__in=ids).update(**changes) if ids else 0
+    else:
+        claimed = Job.objects.filter(id__in=Subquery(due.values('id')[:limit])).update(**changes)
+    if not claimed:
+        return []
+    return list(Job.objects.filter(lock=lock).order_by('id'))
+
+
+def run(job):
+    """
+    Runs a claimed job, then deletes it, or if it raised, queues it to be
+    retried or marks it as failed. Returns whether it succeeded.
+    """
+    registered = registry.get(job.task)
+    if registered is None:
+        fail(job, 'There is no task %s.' % job.task)
+        return False
+    if job.attempts > job.max_attempts:
+        # its last attempt was claimed by a worker that never finished it
+        fail(job, 'The last attempt timed out.')
+        return False
+    try:
+        registered.func(**job.kwargs)
+    except Exception:
+        logger.exception('Job #%d (%s) failed on attempt %d of %d', job.pk, job.task, job.attempts, job.max_attempts)
+        fail(job, traceback.format_exc(), registered.retry_delay)
+        return False
+    Job.objects.filter(pk=job.pk, lock=job.lock).delete()
+    return True
+
+
+def fail(job, error, retry_delay=None):
+    """
+    Records that an attempt at `job` failed with `error`, and queues the job
+    to be tried again `retry_delay` seconds from now, doubled for every
+    attempt so far after the first, unless it has no attempts left or
+    `retry_delay` is None, in which case it is marked as failed.
+    """
+    changes = {'last_error': error, 'lock': ''}
+    if retry_delay is not None and job.attempts < job.max_attempts:
+        changes['status'] = Job.Status.QUEUED
+        changes['run_at'] = timezone.now() + datetime.timedelta(seconds=retry_delay * 2 ** (job.attempts - 1))
+    else:
+        changes['status'] = Job.Status.FAILED
+    # a claim that expired has lost the job to another worker
+    Job.objects.filter(pk=job.pk, lock=job.lock).update(**changes)
+
+
+def release(jobs):
+    """
+    Hands claimed jobs that were not started back to the queue, as they were.
+    """
+    Job.objects.filter(pk__in=[job.pk for job in jobs], lock__in={job.lock for job in jobs}).update(
+        status=Job.Status.QUEUED, run_at=timezone.now(), attempts=F('attempts') - 1, lock='')
+
+
+class Worker:
+    """
+    Claims jobs `batch_size` at a time and runs them, looking for more every
+    `poll_interval` seconds when none are due, until stop() is called.
+    Defaults are taken from the JOBS settings.
+
+    All the jobs of a batch must be finished within the visibility timeout,
+    or the last ones may be claimed and run by another worker too.
+    """
+
+    def __init__(self, batch_size=None, poll_interval=None, visibility_timeout=None):
+        options = settings.JOBS
+        self.batch_size = batch_size or options['BATCH_SIZE']
+        self.poll_interval = poll_interval if poll_interval is not None else options['POLL_INTERVAL']
+        self.visibility_timeout = visibility_timeout or options['VISIBILITY_TIMEOUT']
+        self.succeeded = 0
+        self.failed = 0
+        self.stopped = threading.Event()
+
+    def run(self, burst=False):
+        """
+        Runs jobs until stopped or, with `burst`, until no more are due.
+        """
+        while not self.stopped.is_set():
+            # as between requests, but not within a transaction, e.g. a test's
+            if not connection.in_atomic_block:
+                close_old_connections()
+            jobs = claim(self.batch_size, self.visibility_timeout)
+            if not jobs:
+                if burst:
+                    return
+                self.stopped.wait(self.poll_interval)
+                continue
+            for i, job in enumerate(jobs):
+                if self.stopped.is_set():
+                    release(jobs[i:])
+                    return
+                if run(job):
+                    self.succeeded += 1
+                else:
+                    self.failed += 1
+
+    def stop(self):
+        """
+        Stops the worker once the job it is running is finished. Safe to
+        call from a signal handler or another thread.
+        """
+        self.stopped.set()
@@ -0,0 +1,211 @@
+import datetime
+
+import pytest
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from Todo.importer import TodoImporter
+from Todo.models import Todo
+from Todo.positions import GAP
+from tests.Todo.test_todo_endpoints import auto_login_user, create_todo
+
+from rest_framework import status
+
+
+TODAY = datetime.date(2020, 6, 10)
+
+
+@pytest.fixture
+def todo_headers(db, auto_login_user):
+    """
+    Fixture to log in a user, returning the user and its auth headers
+    """
+
+    user, access_token, refresh_token = auto_login_user(username='johnsmith', email='johnsmith@gmail.com')
+    return user, {'HTTP_AUTHORIZATION': 'Bearer ' + access_token}
+
+
+def manual_order(client, headers):
+    response = client.get(reverse('todo-list'), {'ordering': 'position', 'fields': 'title'}, **headers)
+    return [todo['title'] for todo in response.json()['results']]
+
+
+def writes(queries):
+    return [query['sql'] for query in queries if query['sql'].startswith(('UPDATE', 'INSERT', 'DELETE'))
+            and 'Todo_todo"' in query['sql']]
+
+
+class TestTodoPositions:
+    def test_new_todos_go_last(self, client, todo_headers):
+        """
+        Test that todos created one at a time, in batches and by import are added to the end of the manual order
+        """
+
+        user, headers = todo_headers
+        client.post(reverse('todo-list'), {'title': 'First'}, **headers)
+        client.post(reverse('todo-batch'), {'create': [{'title': 'Second'}, {'title': 'Third'}]},
+                    content_type='application/json', **headers)
+        TodoImporter(user.id).run(iter([{'title': 'Fourth'}, {'title': 'Fifth'}]))
+
+        assert manual_order(client, headers) == ['First', 'Second', 'Third', 'Fourth', 'Fifth']
+        positions = list(Todo.objects.order_by('position').values_list('position', flat=True))
+        assert positions == [GAP * i for i in range(1, 6)]
+
+
+    def test_move_writes_one_row(self, client, todo_headers):
+        """
+        Test that moving a todo before or after another writes the moved todo's row alone
+        """
+
+        user, headers = todo_headers
+        ids = [client.post(reverse('todo-list'), {'title': title}, **headers).json()['id'] for title in 'ABCD']
+
+        with CaptureQueriesContext(connection) as queries:
+            response = client.post(reverse('todo-move', args=[ids[3]]), {'after': ids[0]},
+                                   content_type='application/json', **headers)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()['position'] == GAP + GAP // 2
+        assert len(writes(queries)) == 1
+        assert manual_order(client, headers) == ['A', 'D', 'B', 'C']
+
+        with CaptureQueriesContext(connection) as queries:
+            client.post(reverse('todo-move', args=[ids[1]]), {'before': ids[0]},
+                        content_type='application/json', **headers)
+        assert len(writes(queries)) == 1
+        assert manual_order(client, headers) == ['B', 'A', 'D', 'C']
+
+
+    def test_move_renumbers_when_out_of_room(self, client, create_todo, todo_headers):
+        """
+        Test that the list is renumbered once two neighbours leave no room between them, keeping the order
+        """
+
+        user, headers = todo_headers
+        todos = [create_todo(title=title, owner=user, position=i) for i, title in enumerate('ABCD')]
+
+        response = client.post(reverse('todo-move', args=[todos[3].id]), {'after': todos[0].id},
+                               content_type='application/json', **headers)
+        assert response.status_code == status.HTTP_200_OK
+        assert manual_order(client, headers) == ['A', 'D', 'B', 'C']
+        positions = list(Todo.objects.order_by('position').values_list('position', flat=True))
+        assert positions == [GAP * i for i in range(1, 5)]
+
+        # the room made is enough for many more moves into the same spot
+        for _ in range(10):
+            with CaptureQueriesContext(connection) as queries:
+                client.post(reverse('todo-move', args=[todos[2].id]), {'after': todos[0].id},
+                            content_type='application/json', **headers)
+                client.post(reverse('todo-move', args=[todos[3].id]), {'after': todos[0].id},
+                            content_type='application/json', **headers)
+            assert len(writes(queries)) == 2
+        assert manual_order(client, headers) == ['A', 'D', 'C', 'B']
+
+
+    def test_move_errors(self, client, create_todo, todo_headers):
+        """
+        Test that moves next to no todo, to two places, next to itself, next to another user's todo or next to an
+        id too large for the database are rejected
+        """
+
+        user, headers = todo_headers
+        todo = create_todo(title='Mine', owner=user)
+        other = create_todo(title='Mine too', owner=user)
+        stranger = create_todo(title='Not mine', owner=User.objects.create_user('janesmith'))
+        url = reverse('todo-move', args=[todo.id])
+
+        for data in ({}, {'before': other.id, 'after': other.id}, {'after': 'first'}, {'after': todo.id},
+                     {'after': stranger.id}, {'before': 10 ** 30}):
+            response = client.post(url, data, content_type='application/json', **headers)
+            assert response.status_code == status.HTTP_400_BAD_REQUEST, data
+        response = client.post(reverse('todo-move', args=[stranger.id]), {'after': todo.id},
+                               content_type='application/json', **headers)
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+    def test_position_is_read_only(self, client, todo_headers):
+        """
+        Test that the position cannot be set directly when creating or updating a todo
+        """
+
+        user, headers = todo_headers
+        todo = client.post(reverse('todo-list'), {'title': 'A', 'position': 5}, **headers).json()
+        assert todo['position'] == GAP
+        response = client.patch(reverse('todo-detail', args=[todo['id']]), {'position': 5},
+                                content_type='application/json', **headers)
+        assert response.json()['position'] == GAP
+
+
+class TestTodoAgenda:
+    def test_agenda_buckets(self, client, create_todo, todo_headers):
+        """
+        Test that '/api/todos/agenda/' splits open todos with a due date into overdue, today and upcoming, most
+        urgent first, with one query for the todos
+        """
+
+        user, headers = todo_headers
+        day = datetime.timedelta(days=1)
+        create_todo(title='Overdue', owner=user, due_date=TODAY - 3 * day)
+        create_todo(title='Today', owner=user, due_date=TODAY, priority=Todo.Priority.LOW)
+        create_todo(title='Today, high', owner=user, due_date=TODAY, priority=Todo.Priority.HIGH)
+        create_todo(title='Tomorrow', owner=user, due_date=TODAY + day)
+        create_todo(title='Next month', owner=user, due_date=TODAY + 30 * day)
+        create_todo(title='Done', owner=user, due_date=TODAY, date_completed='2020-06-01T12:00:00Z')
+        create_todo(title='Someday', owner=user)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(reverse('todo-agenda'), {'date': TODAY.isoformat()}, **headers)
+        assert response.status_code == status.HTTP_200_OK
+        assert len([query for query in queries if 'Todo_todo"' in query['sql']]) == 1
+
+        data = response.json()
+        assert data['date'] == '2020-06-10'
+        assert [todo['title'] for todo in data['overdue']] == ['Overdue']
+        assert [todo['title'] for todo in data['today']] == ['Today, high', 'Today']
+        assert [todo['title'] for todo in data['upcoming']] == ['Tomorrow']
+        assert data['today'][0]['due_date'] == '2020-06-10'
+        assert data['today'][0]['priority'] == Todo.Priority.HIGH
+        assert 'memo' not in data['today'][0]
+        assert data['truncated'] is False
+
+        data = client.get(reverse('todo-agenda'), {'date': TODAY.isoformat(), 'days': 30, 'fields': 'title'},
+                          **headers).json()
+        assert data['upcoming'] == [{'title': 'Tomorrow'}, {'title': 'Next month'}]
+
+
+    def test_agenda_truncated(self, client, create_todo, todo_headers, monkeypatch):
+        """
+        Test that the agenda returns at most agenda_max_size todos and says when it left some out
+        """
+
+        from Todo.views import TodoViewSet
+
+        user, headers = todo_headers
+        monkeypatch.setattr(TodoViewSet, 'agenda_max_size', 2)
+        for i in range(3):
+            create_todo(title='Todo #%d' % i, owner=user, due_date=TODAY)
+
+        data = client.get(reverse('todo-agenda'), {'date': TODAY.isoformat()}, **headers).json()
+        assert [todo['title'] for todo in data['today']] == ['Todo #0', 'Todo #1']
+        assert data['truncated'] is True
+
+
+    @pytest.mark.parametrize('params, errors', [
+        ({'days': '-1'}, {'days'}),
+        ({'days': '1000'}, {'days'}),
+        ({'days': 'week'}, {'days'}),
+        ({'date': '10/06/2020'}, {'date'}),
+        ({'date': '9999-12-31'}, {'date'}),
+        ({'date': '9999-12-30', 'days': '2'}, {'date'}),
+    ])
+    def test_agenda_invalid_params(self, client, todo_headers, params, errors):
+        """
+        Test that an invalid number of days or date, or one past the last date there is, is rejected
+        """
+
+        user, headers = todo_headers
+        response = client.get(reverse('todo-agenda'), params, **headers)
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert set(response.json()) == errors
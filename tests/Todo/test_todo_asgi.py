@@ -0,0 +1,134 @@
+import json
+import time
+
+import pytest
+
+from asgiref.sync import async_to_sync
+from asgiref.testing import ApplicationCommunicator
+from django.urls import reverse
+
+from Todo import notifications
+from Todo.models import Todo
+from todolist_api.asgi import application
+from tests.Todo.test_todo_endpoints import auto_login_user, create_todo
+
+
+def asgi_request(method, path, headers=(), body=b''):
+    """
+    Sends a request straight to the ASGI application, returning the status, headers and body of its response
+    """
+
+    async def run():
+        communicator = ApplicationCommunicator(application, {
+            'type': 'http',
+            'method': method,
+            'path': path,
+            'query_string': b'',
+            'headers': [(b'host', b'testserver'), (b'content-length', str(len(body)).encode())] +
+                       [(name.encode(), value.encode()) for name, value in headers],
+        })
+        await communicator.send_input({'type': 'http.request', 'body': body})
+        start = await communicator.receive_output(timeout=5)
+        content = b''
+        while True:
+            message = await communicator.receive_output(timeout=5)
+            content += message.get('body', b'')
+            if not message.get('more_body'):
+                break
+        await communicator.wait()
+        return start['status'], dict(start['headers']), content
+    return async_to_sync(run)()
+
+
+# requests are served from pool threads with their own database connections,
+# so test data has to be committed for them to see it
+@pytest.mark.django_db(transaction=True)
+class TestTodoASGI:
+    def test_todo_list_asgi(self, client, create_todo, auto_login_user):
+        """
+        Test that the ASGI application serves the todo list
+        """
+
+        user, access_token, refresh_token = auto_login_user(username='johnsmith', email='johnsmith@gmail.com')
+        todo = create_todo(title='Learn how to use pytest', owner=user)
+        status, headers, content = asgi_request('GET', reverse('todo-list'), [('authorization', 'Bearer ' + access_token)])
+
+        assert status == 200
+        assert json.loads(content)['results'][0]['id'] == todo.id
+
+
+    def test_todo_create_asgi(self, client, auto_login_user):
+        """
+        Test that the ASGI application accepts writes as well as reads
+        """
+
+        user, access_token, refresh_token = auto_login_user(username='johnsmith', email='johnsmith@gmail.com')
+        status, headers, content = asgi_request(
+            'POST', reverse('todo-list'),
+            [('authorization', 'Bearer ' + access_token), ('content-type', 'application/json')],
+            json.dumps({'title': 'Learn how to use ASGI'}).encode())
+
+        assert status == 201, content
+        assert Todo.objects.get(owner=user).title == 'Learn how to use ASGI'
+
+
+    def test_todo_export_asgi(self, client, create_todo, auto_login_user):
+        """
+        Test that the ASGI application streams exports, which read from the database as they are sent
+        """
+
+        user, access_token, refresh_token = auto_login_user(username='johnsmith', email='johnsmith@gmail.com')
+        todos = [create_todo(title='Todo #%d' % i, owner=user) for i in range(3)]
+        status, headers, content = asgi_request('GET', reverse('todo-export'), [('authorization', 'Bearer ' + access_token)])
+
+        assert status == 200, content
+        assert [todo['id'] for todo in json.loads(content)] == [todo.id for todo in reversed(todos)]
+
+
+    def test_token_verify_asgi(self, client, auto_login_user):
+        """
+        Test that the ASGI application verifies tokens
+        """
+
+        user, access_token, refresh_token = auto_login_user(username='johnsmith', email='johnsmith@gmail.com')
+        status, headers, content = asgi_request(
+            'POST', reverse('token-verify'), [('content-type', 'application/json')],
+            json.dumps({'token': access_token}).encode())
+
+        assert status == 200
+        assert json.loads(content) == {'username': 'johnsmith'}
+
+
+    def test_event_stream_disconnect_asgi(self, client, auto_login_user, settings):
+        """
+        Test that an event stream stops, releasing its subscription, as soon as the client disconnects
+        """
+
+        settings.TODO_NOTIFICATIONS = dict(settings.TODO_NOTIFICATIONS, MAX_DURATION=300, HEARTBEAT=0.1)
+        user, access_token, refresh_token = auto_login_user(username='johnsmith', email='johnsmith@gmail.com')
+
+        async def run():
+            communicator = ApplicationCommunicator(application, {
+                'type': 'http',
+                'method': 'GET',
+                'path': reverse('todo-events'),
+                'query_string': b'',
+                'headers': [(b'host', b'testserver'), (b'accept', b'text/event-stream'),
+                            (b'authorization', ('Bearer ' + access_token).encode())],
+            })
+            await communicator.send_input({'type': 'http.request', 'body': b''})
+            start = await communicator.receive_output(timeout=5)
+            first = await communicator.receive_output(timeout=5)
+            subscribed = bool(notifications.get_backend()._subscriptions.get(user.id))
+            await communicator.send_input({'type': 'http.disconnect'})
+            started = time.monotonic()
+            await communicator.wait(timeout=5)
+            return start['status'], first['body'], subscribed, time.monotonic() - started
+
+        status, body, subscribed, elapsed = async_to_sync(run)()
+
+        assert status == 200
+        assert body.startswith(b'retry: ')
+        assert subscribed
+        assert elapsed < 1
+        assert not notifications.get_backend()._subscriptions.get(user.id)
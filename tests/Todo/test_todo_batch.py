@@ -0,0 +1,88 @@
+import pytest
+
+from django.urls import reverse
+
+from Todo.models import Todo
+from tests.Todo.test_todo_endpoints import auto_login_user, create_todo
+
+from rest_framework import status
+
+
+class TestTodoBatch:
+    def test_todo_batch(self, db, client, create_todo, auto_login_user):
+        """
+        Test that a POST request to '/api/todos/batch/' creates, updates and deletes todos in one go
+        """
+
+        # login user
+        user, access_token, refresh_token = auto_login_user(username='johnsmith', email='johnsmith@gmail.com')
+        # create the todos to be updated and deleted
+        todo = create_todo(title='Learn how to use pytest', owner=user)
+        done = create_todo(title='Learn how to use Django', owner=user)
+        # add access token to request headers
+        headers = {
+            'HTTP_AUTHORIZATION': 'Bearer ' + access_token,
+        }
+        response = client.post(
+                            reverse('todo-batch'),
+                            {
+                                'create': [{'title': 'Learn how to use DRF'}, {'title': 'Write tests', 'memo': 'Lots'}],
+                                'update': [{'id': todo.id, 'memo': "Use the book 'Python Testing with Pytest'"}],
+                                'delete': [done.id],
+                            },
+                            **headers,
+                            content_type='application/json')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert [item['title'] for item in response.json()['created']] == ['Learn how to use DRF', 'Write tests']
+        assert all(item['id'] for item in response.json()['created'])
+        assert response.json()['deleted'] == [done.id]
+        assert Todo.objects.get(pk=todo.pk).memo == "Use the book 'Python Testing with Pytest'"
+        assert Todo.objects.get(pk=todo.pk).title == 'Learn how to use pytest'
+        assert set(Todo.objects.values_list('title', flat=True)) == {
+            'Learn how to use pytest', 'Learn how to use DRF', 'Write tests'}
+
+
+    def test_todo_batch_invalid(self, db, client, create_todo, auto_login_user):
+        """
+        Test that nothing in a batch is applied when one of its operations is invalid
+        """
+
+        # login user
+        user, access_token, refresh_token = auto_login_user(username='johnsmith', email='johnsmith@gmail.com')
+        todo = create_todo(title='Learn how to use pytest', owner=user)
+        # todo owned by a second user can't be touched
+        user2, access_token2, refresh_token2 = auto_login_user(username='johndoe', email='johndoe@gmail.com')
+        other = create_todo(title='Learn how to use Ant.design', owner=user2)
+        headers = {
+            'HTTP_AUTHORIZATION': 'Bearer ' + access_token,
+        }
+        response = client.post(
+                            reverse('todo-batch'),
+                            {
+                                'create': [{'title': 'Learn how to use DRF'}, {'memo': 'missing a title'}],
+                                'update': [{'id': other.id, 'title': 'Mine now'}],
+                                'delete': [todo.id, todo.id],
+                            },
+                            **headers,
+                            content_type='application/json')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.json()['create'][0] == {}
+        assert 'title' in response.json()['create'][1]
+        assert response.json()['update'][0]['id'] == ['Not found.']
+        assert response.json()['delete'] == [[], ['Duplicate id.']]
+        assert Todo.objects.count() == 2
+        assert Todo.objects.get(pk=other.pk).title == 'Learn how to use Ant.design'
+
+        # ids too large for the database
+        response = client.post(
+                            reverse('todo-batch'),
+                            {'update': [{'id': 10 ** 30, 'title': 'Too large'}], 'delete': [10 ** 30, todo.id]},
+                            **headers,
+                            content_type='application/json')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.json()['update'][0]['id'] == ['A valid integer is required.']
+        assert response.json()['delete'] == [['A valid integer is required.'], []]
+        assert Todo.objects.filter(pk=todo.pk).exists()
@@ -0,0 +1,85 @@
+import pytest
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core import metrics
+from tests.Todo.test_todo_endpoints import auto_login_user, create_todo
+
+from rest_framework import status
+
+
+class TestTodoCache:
+    def test_todo_list_not_modified(self, db, client, create_todo, auto_login_user):
+        """
+        Test that a conditional GET to '/api/todos' with the current ETag returns a 304 without touching the database
+        """
+
+        # login user
+        user, access_token, refresh_token = auto_login_user(username='johnsmith', email='johnsmith@gmail.com')
+        create_todo(title='Learn how to use pytest', owner=user)
+        headers = {
+            'HTTP_AUTHORIZATION': 'Bearer ' + access_token,
+        }
+        response = client.get(reverse('todo-list'), **headers)
+        assert response.status_code == status.HTTP_200_OK
+        etag = response['ETag']
+
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(reverse('todo-list'), HTTP_IF_NONE_MATCH=etag, **headers)
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response['ETag'] == etag
+        assert len(queries) == 0
+
+
+    def test_todo_list_cache_hit(self, db, client, create_todo, auto_login_user):
+        """
+        Test that a repeated GET to '/api/todos' is served from the cache
+        """
+
+        # login user
+        user, access_token, refresh_token = auto_login_user(username='johnsmith', email='johnsmith@gmail.com')
+        todo = create_todo(title='Learn how to use pytest', owner=user)
+        headers = {
+            'HTTP_AUTHORIZATION': 'Bearer ' + access_token,
+        }
+        hits, misses = metrics.todo_cache_requests.get('hit'), metrics.todo_cache_requests.get('miss')
+        first = client.get(reverse('todo-list'), **headers)
+        with CaptureQueriesContext(connection) as queries:
+            second = client.get(reverse('todo-list'), **headers)
+
+        assert second.status_code == status.HTTP_200_OK
+        assert second.json() == first.json()
+        assert len(queries) == 0
+        assert metrics.todo_cache_requests.get('hit') == hits + 1
+        assert metrics.todo_cache_requests.get('miss') == misses + 1
+
+
+    def test_todo_write_invalidates(self, db, client, create_todo, auto_login_user):
+        """
+        Test that creating, updating or deleting a todo through the API changes the ETag of the list
+        """
+
+        # login user
+        user, access_token, refresh_token = auto_login_user(username='johnsmith', email='johnsmith@gmail.com')
+        todo = create_todo(title='Learn how to use pytest', owner=user)
+        headers = {
+            'HTTP_AUTHORIZATION': 'Bearer ' + access_token,
+        }
+        etag = client.get(reverse('todo-list'), **headers)['ETag']
+        writes = [
+            lambda: client.post(reverse('todo-list'), {'title': 'Learn how to use DRF'}, **headers),
+            lambda: client.patch(reverse('todo-detail', args=(todo.pk,)), {'memo': 'Read the docs'},
+                                 content_type='application/json', **headers),
+            lambda: client.delete(reverse('todo-detail', args=(todo.pk,)), **headers),
+        ]
+        for write in writes:
+            write()
+            response = client.get(reverse('todo-list'), HTTP_IF_NONE_MATCH=etag, **headers)
+            assert response.status_code == status.HTTP_200_OK
+            assert response['ETag'] != etag
+            etag = response['ETag']
+
+        assert [item['title'] for item in response.json()['results']] == ['Learn how to use DRF']
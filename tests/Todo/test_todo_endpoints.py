@@ -1,3 +1,6 @@
+import base64
+import json
+
 import pytest
 
 from django.urls import reverse
@@ -70,7 +73,7 @@ class TestTodoAuthorized:
         response = client.get(url, **headers)
         
         assert response.status_code == status.HTTP_200_OK
-        assert response.json()[0]['title'] == todo.title
+        assert response.json()['results'][0]['title'] == todo.title
 
 
     def test_todo_create(self, db, client, auto_login_user):
@@ -307,8 +310,8 @@ class TestTodoUnauthorized:
         response = client.get(url, **headers)
         
         assert response.status_code == status.HTTP_200_OK
-        assert len(response.json()) == 1
-        assert response.json()[0]['id'] == todo.id
+        assert len(response.json()['results']) == 1
+        assert response.json()['results'][0]['id'] == todo.id
 
 
     def test_todo_update_owner(self, db, client, create_todo, auto_login_user):
@@ -341,3 +344,58 @@ class TestTodoUnauthorized:
                             content_type="application/json")
         assert response.status_code == status.HTTP_404_NOT_FOUND
 
+
+
+# --- Pagination ---
+class TestTodoPagination:
+    def test_todo_list_cursor_pages(self, db, client, create_todo, auto_login_user):
+        """
+        Test that following the 'next' links of '/api/todos' returns every todo exactly once, newest first
+        """
+
+        # login user
+        user, access_token, refresh_token = auto_login_user(username='johnsmith', email='johnsmith@gmail.com')
+        # create five todos; give them the same timestamp so the id tie-breaker is exercised
+        todos = [create_todo(title='Todo #%d' % i, owner=user) for i in range(5)]
+        Todo.objects.update(created=todos[0].created)
+        # add access token to request headers
+        headers = {
+            'HTTP_AUTHORIZATION': 'Bearer ' + access_token,
+        }
+        # walk through the pages two todos at a time
+        url = reverse('todo-list') + '?page_size=2'
+        seen = []
+        while url:
+            response = client.get(url, **headers)
+            assert response.status_code == status.HTTP_200_OK
+            assert len(response.json()['results']) <= 2
+            seen += [todo['id'] for todo in response.json()['results']]
+            url = response.json()['next']
+
+        assert seen == sorted((todo.id for todo in todos), reverse=True)
+
+
+    def test_todo_list_invalid_cursor(self, db, client, auto_login_user):
+        """
+        Test that a malformed cursor is rejected with a 404
+        """
+
+        # login user
+        user, access_token, refresh_token = auto_login_user(username='johnsmith', email='johnsmith@gmail.com')
+        url = reverse('todo-list') + '?cursor=not-a-cursor'
+        headers = {
+            'HTTP_AUTHORIZATION': 'Bearer ' + access_token,
+        }
+        response = client.get(url, **headers)
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+        # well formed, with values of the wrong type
+        for payload in (b'["-created",5,1]', b'["-created",[1],1]', b'["position",{},1]',
+                        # numbers out of the range of any integer column
+                        b'["-created","2020-01-01T00:00:00Z",1000000000000000000000000000000]',
+                        b'["position",1000000000000000000000000000000,1]', b'["position",-9223372036854775809,1]'):
+            cursor = base64.urlsafe_b64encode(payload).decode('ascii')
+            ordering = json.loads(payload)[0]
+            response = client.get(reverse('todo-list'), {'cursor': cursor, 'ordering': ordering}, **headers)
+            assert response.status_code == status.HTTP_404_NOT_FOUND, payload
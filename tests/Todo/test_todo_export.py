@@ -0,0 +1,99 @@
+import gzip
+import json
+import os
+import tracemalloc
+
+import pytest
+
+from django.urls import reverse
+
+from Todo.models import Todo
+from tests.Todo.test_todo_endpoints import auto_login_user, create_todo
+
+from rest_framework import status
+
+
+# rows in the large export fixture; run with TODO_EXPORT_TEST_ROWS=1000000 for the full-size check
+EXPORT_TEST_ROWS = int(os.environ.get('TODO_EXPORT_TEST_ROWS', 20000))
+
+
+def consume(response):
+    """
+    Reads a streaming response chunk by chunk, keeping only its size
+    """
+
+    size = 0
+    for chunk in response.streaming_content:
+        size += len(chunk)
+    return size
+
+
+class TestTodoExport:
+    def test_todo_export_json(self, db, client, create_todo, auto_login_user):
+        """
+        Test that a GET request to '/api/todos/export/' streams the user's todos as a JSON array
+        """
+
+        # login user
+        user, access_token, refresh_token = auto_login_user(username='johnsmith', email='johnsmith@gmail.com')
+        todos = [create_todo(title='Todo #%d' % i, owner=user) for i in range(3)]
+        headers = {
+            'HTTP_AUTHORIZATION': 'Bearer ' + access_token,
+        }
+        response = client.get(reverse('todo-export'), **headers)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.streaming
+        assert response['Content-Type'] == 'application/json'
+        exported = json.loads(b''.join(response.streaming_content))
+        assert [todo['id'] for todo in exported] == [todo.id for todo in reversed(todos)]
+
+
+    def test_todo_export_ndjson_gzip(self, db, client, create_todo, auto_login_user):
+        """
+        Test that '/api/todos/export/?type=ndjson' streams one JSON object per line, gzipped when accepted
+        """
+
+        # login user
+        user, access_token, refresh_token = auto_login_user(username='johnsmith', email='johnsmith@gmail.com')
+        todos = [create_todo(title='Todo #%d' % i, owner=user) for i in range(3)]
+        headers = {
+            'HTTP_AUTHORIZATION': 'Bearer ' + access_token,
+            'HTTP_ACCEPT_ENCODING': 'gzip, deflate',
+        }
+        response = client.get(reverse('todo-export'), {'type': 'ndjson'}, **headers)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response['Content-Encoding'] == 'gzip'
+        lines = gzip.decompress(b''.join(response.streaming_content)).decode().splitlines()
+        assert [json.loads(line)['title'] for line in lines] == ['Todo #2', 'Todo #1', 'Todo #0']
+
+
+    def test_todo_export_memory(self, db, client, auto_login_user):
+        """
+        Test that peak memory while exporting stays flat as the number of todos grows
+        """
+
+        # login user
+        user, access_token, refresh_token = auto_login_user(username='johnsmith', email='johnsmith@gmail.com')
+        headers = {
+            'HTTP_AUTHORIZATION': 'Bearer ' + access_token,
+        }
+
+        peaks = []
+        for count in (EXPORT_TEST_ROWS // 10, EXPORT_TEST_ROWS):
+            # top the fixture up to `count` rows
+            existing = Todo.objects.count()
+            Todo.objects.bulk_create(
+                [Todo(title='Todo #%d' % i, memo='Exported', owner=user) for i in range(existing, count)],
+                batch_size=10000,
+            )
+            tracemalloc.start()
+            response = client.get(reverse('todo-export'), {'type': 'ndjson'}, **headers)
+            size = consume(response)
+            peaks.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+            assert size > count * 50
+
+        # ten times the rows must not take anywhere near ten times the memory
+        assert peaks[1] < peaks[0] * 2
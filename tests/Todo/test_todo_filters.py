@@ -0,0 +1,156 @@
+import datetime
+
+import pytest
+
+from django.core.management import call_command
+from django.db import connection
+from django.urls import reverse
+from django.utils import timezone
+
+from Todo.importer import TodoImporter
+from Todo.models import Todo
+from tests.Todo.test_todo_endpoints import auto_login_user, create_todo
+
+from rest_framework import status
+
+
+@pytest.fixture
+def todo_headers(db, auto_login_user):
+    """
+    Fixture to log in a user, returning the user and its auth headers
+    """
+
+    user, access_token, refresh_token = auto_login_user(username='johnsmith', email='johnsmith@gmail.com')
+    return user, {'HTTP_AUTHORIZATION': 'Bearer ' + access_token}
+
+
+def titles(response):
+    assert response.status_code == status.HTTP_200_OK, response.content
+    return [todo['title'] for todo in response.json()['results']]
+
+
+class TestTodoFilters:
+    def test_todo_list_completed(self, client, create_todo, todo_headers):
+        """
+        Test that '/api/todos/?completed=' lists only completed or only open todos
+        """
+
+        user, headers = todo_headers
+        create_todo(title='Open', owner=user)
+        create_todo(title='Done', owner=user, date_completed=timezone.now())
+
+        assert titles(client.get(reverse('todo-list'), {'completed': 'true'}, **headers)) == ['Done']
+        assert titles(client.get(reverse('todo-list'), {'completed': 'false'}, **headers)) == ['Open']
+        assert titles(client.get(reverse('todo-list'), **headers)) == ['Done', 'Open']
+
+
+    def test_todo_list_date_ranges(self, client, create_todo, todo_headers):
+        """
+        Test that the created and completed date ranges include their start and exclude their end
+        """
+
+        user, headers = todo_headers
+        now = timezone.now()
+        create_todo(title='Last week', owner=user, date_completed=now - datetime.timedelta(days=7))
+        create_todo(title='Yesterday', owner=user, date_completed=now - datetime.timedelta(days=1))
+        create_todo(title='Open', owner=user)
+        Todo.objects.filter(title='Last week').update(created=now - datetime.timedelta(days=10))
+        week_ago = (now - datetime.timedelta(days=6)).date().isoformat()
+
+        assert titles(client.get(reverse('todo-list'), {'completed_after': week_ago}, **headers)) == ['Yesterday']
+        assert titles(client.get(reverse('todo-list'), {'completed_before': week_ago}, **headers)) == ['Last week']
+        assert titles(client.get(reverse('todo-list'), {'created_after': week_ago}, **headers)) == ['Open', 'Yesterday']
+        assert titles(client.get(reverse('todo-list'), {'created_before': now.isoformat()}, **headers)) == ['Last week']
+
+
+    def test_todo_list_ordering(self, client, create_todo, todo_headers):
+        """
+        Test that '/api/todos/?ordering=' orders the list, paginating through completed todos by completion date
+        """
+
+        user, headers = todo_headers
+        now = timezone.now()
+        for i in range(5):
+            create_todo(title='Todo #%d' % i, owner=user, date_completed=now - datetime.timedelta(days=i))
+        create_todo(title='Open', owner=user)
+
+        assert titles(client.get(reverse('todo-list'), {'ordering': 'created'}, **headers))[0] == 'Todo #0'
+        response = client.get(reverse('todo-list'), {'ordering': 'date_completed', 'page_size': 3}, **headers)
+        assert titles(response) == ['Todo #4', 'Todo #3', 'Todo #2']
+        assert titles(client.get(response.json()['next'], **headers)) == ['Todo #1', 'Todo #0']
+        response = client.get(reverse('todo-list'), {'ordering': '-date_completed'}, **headers)
+        assert titles(response) == ['Todo #0', 'Todo #1', 'Todo #2', 'Todo #3', 'Todo #4']
+
+
+    @pytest.mark.parametrize('params', [
+        {'completed': 'maybe'},
+        {'created_after': 'last week'},
+        {'completed_before': '2020-13-01'},
+        {'ordering': 'title'},
+        {'list': 'inbox'},
+        {'list': '1' * 30},
+    ])
+    def test_todo_list_invalid_filter(self, client, todo_headers, params):
+        """
+        Test that an invalid filter or ordering is rejected with the parameter at fault
+        """
+
+        user, headers = todo_headers
+        response = client.get(reverse('todo-list'), params, **headers)
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert list(response.json()) == list(params)
+
+
+    def test_todo_search(self, client, create_todo, todo_headers, auto_login_user):
+        """
+        Test that '/api/todos/?search=' finds the user's todos with every word in the title or memo
+        """
+
+        user, headers = todo_headers
+        other, other_access_token, other_refresh_token = auto_login_user(username='janesmith', email='janesmith@gmail.com')
+        create_todo(title='Learn how to use pytest', memo="Use the book 'Python Testing with Pytest'", owner=user)
+        create_todo(title='Learn Django', memo='', owner=user)
+        create_todo(title='Learn pytest', memo='', owner=other)
+
+        assert titles(client.get(reverse('todo-list'), {'search': 'pytest'}, **headers)) == ['Learn how to use pytest']
+        assert titles(client.get(reverse('todo-list'), {'search': 'LEARN book'}, **headers)) == ['Learn how to use pytest']
+        assert titles(client.get(reverse('todo-list'), {'search': 'learn'}, **headers)) == ['Learn Django', 'Learn how to use pytest']
+        assert titles(client.get(reverse('todo-list'), {'search': 'learn NOT "django*'}, **headers)) == []
+        assert len(titles(client.get(reverse('todo-list'), {'search': '"*'}, **headers))) == 2
+
+
+    def test_todo_search_follows_writes(self, client, create_todo, todo_headers):
+        """
+        Test that the search index follows updates, deletes and bulk writes
+        """
+
+        user, headers = todo_headers
+        todo = create_todo(title='Learn Django', owner=user)
+        client.patch(reverse('todo-detail', args=[todo.id]), {'title': 'Learn Flask'}, content_type='application/json', **headers)
+        Todo.objects.bulk_create([Todo(title='Learn Django REST Framework', owner=user)])
+        TodoImporter(user.id).run(iter([{'title': 'Import', 'memo': 'Django fixtures'}]))
+
+        assert titles(client.get(reverse('todo-list'), {'search': 'django'}, **headers)) == ['Import', 'Learn Django REST Framework']
+        assert titles(client.get(reverse('todo-list'), {'search': 'flask'}, **headers)) == ['Learn Flask']
+
+        Todo.objects.filter(title__startswith='Learn').update(memo='Django docs')
+        client.delete(reverse('todo-detail', args=[todo.id]), **headers)
+        assert titles(client.get(reverse('todo-list'), {'search': 'django docs'}, **headers)) == ['Learn Django REST Framework']
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.parametrize('migration', ['0007_todostats', '0008_todo_agenda'])
+def test_todo_search_index_after_migrating_back(migration):
+    """
+    Test that migrating back to a migration that already had the search index keeps it
+    """
+
+    try:
+        call_command('migrate', 'Todo', migration, verbosity=0)
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT name FROM sqlite_master WHERE name LIKE 'Todo_todo_fts%'")
+            names = {name for name, in cursor.fetchall()}
+        assert {'Todo_todo_fts', 'Todo_todo_fts_insert', 'Todo_todo_fts_delete', 'Todo_todo_fts_update'} <= names
+    finally:
+        call_command('migrate', verbosity=0)
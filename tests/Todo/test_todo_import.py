@@ -0,0 +1,221 @@
+import io
+import json
+
+import pytest
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from Todo.importer import TodoImporter, iter_ndjson_rows
+from Todo.models import Tag, Todo
+from Todo.serializers import TodoSerializer
+from tests.Todo.test_todo_endpoints import auto_login_user, create_todo
+
+from rest_framework import status
+
+
+def ndjson(rows):
+    return ''.join(json.dumps(row) + '\n' for row in rows)
+
+
+class TestTodoImport:
+    def test_todo_import_ndjson(self, db, client, auto_login_user):
+        """
+        Test that a POST request of NDJSON to '/api/todos/import/' imports the todos and reports invalid rows
+        """
+
+        # login user
+        user, access_token, refresh_token = auto_login_user(username='johnsmith', email='johnsmith@gmail.com')
+        headers = {
+            'HTTP_AUTHORIZATION': 'Bearer ' + access_token,
+        }
+        body = ndjson([
+            {'title': 'Learn how to use pytest', 'memo': "Use the book 'Python Testing with Pytest'"},
+            {'memo': 'No title'},
+            {'title': '  Learn how to use DRF  ', 'date_completed': '2020-06-01T12:00:00Z'},
+            {'title': 'x' * 201},
+        ]) + '{not json\n'
+        response = client.post(reverse('todo-import'), body, content_type='application/x-ndjson', **headers)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()['imported'] == 2
+        assert response.json()['position'] == 5
+        assert response.json()['error_count'] == 3
+        assert [error['row'] for error in response.json()['errors']] == [2, 4, 5]
+        assert response.json()['errors'][0]['errors'] == {'title': ['This field is required.']}
+        todos = Todo.objects.filter(owner=user).order_by('id')
+        assert [todo.title for todo in todos] == ['Learn how to use pytest', 'Learn how to use DRF']
+        assert todos[1].date_completed is not None
+        assert all(todo.created and todo.updated for todo in todos)
+
+
+    def test_todo_import_csv_resume(self, db, client, auto_login_user):
+        """
+        Test that '/api/todos/import/?start=' skips the rows an earlier import already dealt with
+        """
+
+        # login user
+        user, access_token, refresh_token = auto_login_user(username='johnsmith', email='johnsmith@gmail.com')
+        headers = {
+            'HTTP_AUTHORIZATION': 'Bearer ' + access_token,
+        }
+        body = 'title,memo,date_completed\nTodo #1,,\nTodo #2,"Memo, with a comma",\nTodo #3,,2020-06-01T12:00:00Z\n'
+        response = client.post(reverse('todo-import') + '?start=1', body, content_type='text/csv', **headers)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()['imported'] == 2
+        assert response.json()['position'] == 3
+        assert list(Todo.objects.filter(owner=user).order_by('id').values_list('title', 'memo')) == [
+            ('Todo #2', 'Memo, with a comma'), ('Todo #3', '')]
+
+        for start in ('-1', 'first', '1' * 30):
+            response = client.post(reverse('todo-import') + '?start=' + start, body, content_type='text/csv', **headers)
+            assert response.status_code == status.HTTP_400_BAD_REQUEST, start
+            assert 'start' in response.json()
+
+
+    @pytest.mark.parametrize('content_type', ['application/x-ndjson', 'text/csv'])
+    def test_todo_import_invalid_encoding(self, db, client, auto_login_user, content_type):
+        """
+        Test that a body that isn't valid UTF-8 is rejected with a 400 and the position to resume from
+        """
+
+        user, access_token, refresh_token = auto_login_user(username='johnsmith', email='johnsmith@gmail.com')
+        body = b'title\n' if content_type == 'text/csv' else b''
+        body += b'{"title": "Caf\xff"}\n'
+        response = client.post(reverse('todo-import'), body, content_type=content_type,
+                               HTTP_AUTHORIZATION='Bearer ' + access_token)
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'not valid utf-8' in response.json()['detail']
+        assert response.json()['position'] == 0
+
+
+    def test_todo_import_invalidates_list(self, db, client, create_todo, auto_login_user):
+        """
+        Test that imported todos show up in a todo list that was cached before the import
+        """
+
+        # login user
+        user, access_token, refresh_token = auto_login_user(username='johnsmith', email='johnsmith@gmail.com')
+        create_todo(title='Learn how to use pytest', owner=user)
+        headers = {
+            'HTTP_AUTHORIZATION': 'Bearer ' + access_token,
+        }
+        assert len(client.get(reverse('todo-list'), **headers).json()['results']) == 1
+        client.post(reverse('todo-import'), ndjson([{'title': 'Imported'}]), content_type='application/x-ndjson', **headers)
+
+        assert len(client.get(reverse('todo-list'), **headers).json()['results']) == 2
+
+
+    def test_todo_import_unauthorized(self, db, client):
+        """
+        Test that an anonymous import is rejected
+        """
+
+        response = client.post(reverse('todo-import'), ndjson([{'title': 'Imported'}]), content_type='application/x-ndjson')
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        assert not Todo.objects.exists()
+
+
+    @pytest.mark.parametrize('row', [
+        {'title': 'Learn how to use pytest'},
+        {'title': '   '},
+        {'title': 'x' * 200, 'memo': ''},
+        {'title': 'x' * 201},
+        {'title': 'null\x00char'},
+        {'title': 12},
+        {'title': None},
+        {'title': 'Done', 'date_completed': 'yesterday'},
+        {'title': 'Done', 'date_completed': None},
+        {'title': 'Done', 'id': 99, 'created': '2000-01-01T00:00:00Z'},
+        {'title': 'Tagged', 'tags': ['work', 'home']},
+        {'title': 'Tagged', 'tags': ['work', 'work']},
+        {'title': 'Tagged', 'tags': []},
+        {'title': 'Tagged', 'tags': ['work', 'nope']},
+        {'title': 'Tagged', 'tags': ['theirs']},
+        {'title': 'Tagged', 'tags': [5]},
+        {'title': 'Tagged', 'tags': 'work'},
+        {'title': 'Tagged', 'tags': None},
+    ])
+    def test_todo_import_matches_serializer(self, db, auto_login_user, row):
+        """
+        Test that the importer accepts and rejects rows exactly like TodoSerializer
+        """
+
+        user, access_token, refresh_token = auto_login_user(username='johnsmith', email='johnsmith@gmail.com')
+        for name in ('work', 'home', '5'):
+            Tag.objects.create(name=name, owner=user)
+        Tag.objects.create(name='theirs', owner=User.objects.create_user('janesmith'))
+        serializer = TodoSerializer(data=row, context={'owner_id': user.id})
+        importer = TodoImporter(user.id).run(iter([row]))
+
+        assert importer.imported == int(serializer.is_valid())
+        if serializer.errors:
+            assert importer.errors[0]['errors'] == serializer.errors
+        else:
+            todo = Todo.objects.get(owner=user)
+            assert todo.created.year != 2000
+            for name, value in serializer.validated_data.items():
+                if name == 'tags':
+                    assert set(todo.tags.all()) == set(value)
+                else:
+                    assert getattr(todo, name) == value
+
+
+    def test_todo_import_tags(self, db, create_todo, auto_login_user):
+        """
+        Test that imported todos get their tags, looked up and inserted with one query each per batch
+        """
+
+        user, access_token, refresh_token = auto_login_user(username='johnsmith', email='johnsmith@gmail.com')
+        work, home = Tag.objects.create(name='work', owner=user), Tag.objects.create(name='home', owner=user)
+        create_todo(title='Existing', owner=user).tags.set([home])
+        rows = [{'title': 'A', 'tags': ['work']}, {'title': 'B'}, {'title': 'C', 'tags': ['home', 'work']},
+                {'title': 'D', 'tags': ['nope']}]
+
+        with CaptureQueriesContext(connection) as queries:
+            importer = TodoImporter(user.id).run(iter(rows))
+        assert importer.imported == 3
+        assert importer.errors == [{'row': 4, 'errors': {'tags': ['Object with name=nope does not exist.']}}]
+        tags = {todo.title: {tag.name for tag in todo.tags.all()} for todo in Todo.objects.prefetch_related('tags')}
+        assert tags == {'Existing': {'home'}, 'A': {'work'}, 'B': set(), 'C': {'home', 'work'}}
+        # looked up for the batch, plus one lookup by the serializer's field for the row in error
+        assert len([query for query in queries if 'Todo_tag"' in query['sql']]) == 2
+        assert len([query for query in queries if query['sql'].startswith('INSERT INTO "Todo_todo_tags"')]) == 1
+
+
+    def test_import_todos_command_checkpoint(self, db, tmp_path, auto_login_user):
+        """
+        Test that 'manage.py import_todos' records its progress and resumes from the checkpoint
+        """
+
+        user, access_token, refresh_token = auto_login_user(username='johnsmith', email='johnsmith@gmail.com')
+        path = tmp_path / 'todos.ndjson'
+        path.write_text(ndjson({'title': 'Todo #%d' % i} for i in range(5)))
+        checkpoint = tmp_path / 'todos.checkpoint'
+        checkpoint.write_text('3\n')
+        call_command('import_todos', str(path), user='johnsmith', checkpoint=str(checkpoint), batch_size=1, stdout=io.StringIO())
+
+        assert list(Todo.objects.filter(owner=user).order_by('id').values_list('title', flat=True)) == ['Todo #3', 'Todo #4']
+        assert checkpoint.read_text() == '5\n'
+
+        with pytest.raises(CommandError):
+            call_command('import_todos', str(path), user='nobody')
+
+
+    def test_ndjson_rows_are_streamed(self):
+        """
+        Test that NDJSON is parsed lazily, one line at a time
+        """
+
+        lines = iter(['{"title": "a"}\n', '\n', '{"title": "b"}\n'])
+        rows = iter_ndjson_rows(lines)
+
+        assert next(rows) == {'title': 'a'}
+        assert next(lines) == '\n'
@@ -0,0 +1,248 @@
+import io
+
+import pytest
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from Todo import cache as todo_cache
+from Todo.importer import TodoImporter
+from Todo.models import Tag, Todo, TodoList
+from Todo.stats import find_list_inconsistencies
+from tests.Todo.test_todo_endpoints import auto_login_user, create_todo
+
+from rest_framework import status
+
+
+@pytest.fixture
+def todo_headers(db, auto_login_user):
+    """
+    Fixture to log in a user, returning the user and its auth headers
+    """
+
+    user, access_token, refresh_token = auto_login_user(username='johnsmith', email='johnsmith@gmail.com')
+    return user, {'HTTP_AUTHORIZATION': 'Bearer ' + access_token}
+
+
+def make_tagged_todos(user, count, tags_per_todo):
+    """
+    Creates `count` todos for `user` in one list, each with `tags_per_todo` tags
+    """
+
+    # behind the API's back, so the cached responses have to go
+    todo_cache.bump_version(user.id)
+
+    todo_list = TodoList.objects.create(name='Project', owner=user)
+    tags = [Tag.objects.create(name='tag %d' % i, owner=user) for i in range(tags_per_todo)]
+    todos = [Todo.objects.create(title='Todo #%d' % i, owner=user, list=todo_list, due_date='2020-06-01')
+             for i in range(count)]
+    Todo.tags.through.objects.bulk_create([
+        Todo.tags.through(todo_id=todo.id, tag_id=tag.id) for todo in todos for tag in tags])
+    return todo_list
+
+
+def count_queries(func):
+    with CaptureQueriesContext(connection) as queries:
+        func()
+    return len(queries)
+
+
+class TestTodoLists:
+    def test_list_todos(self, client, create_todo, todo_headers):
+        """
+        Test that '/api/todos/?list=' lists the todos of one of the user's lists, or of none
+        """
+
+        user, headers = todo_headers
+        todo_list = client.post(reverse('todolist-list'), {'name': 'Project'}, **headers).json()
+        client.post(reverse('todo-list'), {'title': 'Filed', 'list': todo_list['id']}, **headers)
+        client.post(reverse('todo-list'), {'title': 'Unfiled'}, **headers)
+
+        response = client.get(reverse('todo-list'), {'list': todo_list['id']}, **headers)
+        assert [todo['title'] for todo in response.json()['results']] == ['Filed']
+        assert response.json()['results'][0]['list'] == todo_list['id']
+        response = client.get(reverse('todo-list'), {'list': 'none'}, **headers)
+        assert [todo['title'] for todo in response.json()['results']] == ['Unfiled']
+        response = client.get(reverse('todo-list'), {'list': 'project'}, **headers)
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+    def test_other_users_lists(self, client, todo_headers):
+        """
+        Test that todos cannot be filed in another user's list, and that lists are private
+        """
+
+        user, headers = todo_headers
+        other = TodoList.objects.create(name='Theirs', owner=User.objects.create_user('janesmith'))
+
+        response = client.post(reverse('todo-list'), {'title': 'Filed', 'list': other.id}, **headers)
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'list' in response.json()
+        assert client.get(reverse('todolist-list'), **headers).json() == []
+        response = client.get(reverse('todolist-detail', args=[other.id]), **headers)
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+    def test_todo_counts(self, client, todo_headers):
+        """
+        Test that creating, moving, batching, importing and deleting todos keep the lists' counts current
+        """
+
+        user, headers = todo_headers
+        first = client.post(reverse('todolist-list'), {'name': 'First'}, **headers).json()['id']
+        second = client.post(reverse('todolist-list'), {'name': 'Second'}, **headers).json()['id']
+
+        todo = client.post(reverse('todo-list'), {'title': 'A', 'list': first}, **headers).json()
+        client.post(reverse('todo-list'), {'title': 'B', 'list': first}, **headers)
+        client.patch(reverse('todo-detail', args=[todo['id']]), {'list': second},
+                     content_type='application/json', **headers)
+        response = client.post(reverse('todo-batch'), {
+            'create': [{'title': 'C', 'list': second}, {'title': 'D'}],
+            'update': [{'id': todo['id'], 'list': None}],
+        }, content_type='application/json', **headers)
+        assert response.status_code == status.HTTP_200_OK
+        TodoImporter(user.id).run(iter([{'title': 'E', 'list': first}, {'title': 'F', 'list': second}]))
+        assert TodoImporter(user.id).run(iter([{'title': 'G', 'list': first + second + 1}])).error_count == 1
+        client.delete(reverse('todo-detail', args=[Todo.objects.get(title='B').id]), **headers)
+
+        counts = {todo_list['name']: todo_list['todo_count']
+                  for todo_list in client.get(reverse('todolist-list'), **headers).json()}
+        assert counts == {'First': 1, 'Second': 2}
+        assert find_list_inconsistencies() == []
+
+
+    def test_delete_list(self, client, create_todo, todo_headers):
+        """
+        Test that deleting a list keeps its todos, without a list, and reports them as changed
+        """
+
+        user, headers = todo_headers
+        todo_list = TodoList.objects.create(name='Project', owner=user)
+        todo = create_todo(title='Filed', owner=user, list=todo_list)
+
+        response = client.delete(reverse('todolist-detail', args=[todo_list.id]), **headers)
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        changed = Todo.objects.get(pk=todo.pk)
+        assert changed.list_id is None
+        assert changed.updated > todo.updated
+
+
+    def test_rebuild_list_counts(self, create_todo, todo_headers):
+        """
+        Test that 'manage.py rebuild_todo_stats --check' reports wrong list counts and that rebuilding fixes them
+        """
+
+        user, headers = todo_headers
+        todo_list = TodoList.objects.create(name='Project', owner=user, todo_count=5)
+        create_todo(title='Filed', owner=user, list=todo_list)
+        TodoList.objects.create(name='Empty', owner=user, todo_count=1)
+
+        stderr = io.StringIO()
+        with pytest.raises(CommandError):
+            call_command('rebuild_todo_stats', check=True, stdout=io.StringIO(), stderr=stderr)
+        assert 'List #%d: stored 5 todos; counted 1' % todo_list.id in stderr.getvalue()
+
+        call_command('rebuild_todo_stats', stdout=io.StringIO())
+        assert dict(TodoList.objects.values_list('name', 'todo_count')) == {'Project': 1, 'Empty': 0}
+        call_command('rebuild_todo_stats', check=True, stdout=io.StringIO())
+
+
+class TestTags:
+    def test_tag_todos(self, client, todo_headers):
+        """
+        Test that tags are set by name, listed in name order and limited to the user's own tags
+        """
+
+        user, headers = todo_headers
+        for name in ('work', 'home'):
+            assert client.post(reverse('tag-list'), {'name': name}, **headers).status_code == status.HTTP_201_CREATED
+        assert client.post(reverse('tag-list'), {'name': 'work'}, **headers).status_code == status.HTTP_400_BAD_REQUEST
+        Tag.objects.create(name='theirs', owner=User.objects.create_user('janesmith'))
+
+        todo = client.post(reverse('todo-list'), {'title': 'A', 'tags': ['work', 'home']},
+                           content_type='application/json', **headers).json()
+        assert todo['tags'] == ['home', 'work']
+        response = client.patch(reverse('todo-detail', args=[todo['id']]), {'tags': ['theirs']},
+                                content_type='application/json', **headers)
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+        response = client.post(reverse('todo-batch'), {
+            'create': [{'title': 'B', 'tags': ['work', 'work']}],
+            'update': [{'id': todo['id'], 'tags': []}],
+        }, content_type='application/json', **headers)
+        assert response.json()['created'][0]['tags'] == ['work']
+        assert response.json()['updated'][0]['tags'] == []
+
+        response = client.get(reverse('todo-list'), {'fields': 'title,tags'}, **headers)
+        assert response.json()['results'] == [{'title': 'B', 'tags': ['work']}, {'title': 'A', 'tags': []}]
+
+
+    def test_rename_and_delete_tags(self, client, create_todo, todo_headers):
+        """
+        Test that renaming or deleting a tag shows up in the todo list and the sync feed
+        """
+
+        user, headers = todo_headers
+        tag = Tag.objects.create(name='work', owner=user)
+        create_todo(title='A', owner=user).tags.set([tag])
+        cursor = client.get(reverse('todo-sync'), **headers).json()['cursor']
+        assert client.get(reverse('todo-list'), **headers).json()['results'][0]['tags'] == ['work']
+
+        client.patch(reverse('tag-detail', args=[tag.id]), {'name': 'job'}, content_type='application/json', **headers)
+        assert client.get(reverse('todo-list'), **headers).json()['results'][0]['tags'] == ['job']
+        assert client.get(reverse('todo-sync'), {'since': cursor}, **headers).json()['changed'][0]['tags'] == ['job']
+
+        client.delete(reverse('tag-detail', args=[tag.id]), **headers)
+        assert client.get(reverse('todo-list'), **headers).json()['results'][0]['tags'] == []
+
+
+class TestQueryCounts:
+    @pytest.mark.parametrize('name, view', [
+        ('list', lambda client, headers: client.get(reverse('todo-list'), {'page_size': 500}, **headers)),
+        ('export', lambda client, headers: b''.join(client.get(reverse('todo-export'), **headers).streaming_content)),
+        ('sync', lambda client, headers: client.get(reverse('todo-sync'), **headers)),
+        ('agenda', lambda client, headers: client.get(reverse('todo-agenda'), **headers)),
+    ])
+    def test_constant_queries(self, client, todo_headers, name, view):
+        """
+        Test that reading todos takes as many queries for many todos with many tags as for a few with one
+        """
+
+        user, headers = todo_headers
+        todo_list = make_tagged_todos(user, 2, 1)
+        few = count_queries(lambda: view(client, headers))
+
+        for model in (Todo, Tag, TodoList):
+            model.objects.all().delete()
+        make_tagged_todos(user, 100, 10)
+        many = count_queries(lambda: view(client, headers))
+        assert many == few
+
+
+    def test_batch_writes_tags_in_bulk(self, client, todo_headers):
+        """
+        Test that a batch writes and reads back tags with the same number of queries whatever its size
+        """
+
+        user, headers = todo_headers
+        Tag.objects.create(name='work', owner=user)
+
+        def batch(size):
+            existing = list(Todo.objects.values_list('id', flat=True))
+            with CaptureQueriesContext(connection) as queries:
+                response = client.post(reverse('todo-batch'), {
+                    'create': [{'title': 'New', 'tags': ['work']}] * size,
+                    'update': [{'id': pk, 'tags': []} for pk in existing],
+                }, content_type='application/json', **headers)
+            assert response.status_code == status.HTTP_200_OK
+            return [query['sql'].split()[0] for query in queries if 'Todo_todo_tags' in query['sql']]
+
+        # once there are todos to update
+        batch(1)
+        # insert the new todos' tags and read them back, then delete the updated todos' and read theirs
+        assert batch(1) == ['INSERT', 'SELECT', 'DELETE', 'SELECT']
+        assert batch(20) == ['INSERT', 'SELECT', 'DELETE', 'SELECT']
@@ -0,0 +1,166 @@
+import threading
+
+import pytest
+
+from django.urls import reverse
+
+from Todo import cache as todo_cache
+from Todo import notifications
+from Todo.views import todos_changed
+from tests.Todo.test_todo_endpoints import auto_login_user
+
+from rest_framework import status
+
+
+@pytest.fixture
+def user_token(db, auto_login_user):
+    """
+    Fixture to log in a user, returning the user and their access token
+    """
+
+    user, access_token, refresh_token = auto_login_user(username='johnsmith', email='johnsmith@gmail.com')
+    return user, access_token
+
+
+@pytest.fixture
+def short_streams(settings):
+    """
+    Fixture to end event streams after half a second, with frequent heartbeats
+    """
+
+    settings.TODO_NOTIFICATIONS = dict(settings.TODO_NOTIFICATIONS, MAX_DURATION=0.5, HEARTBEAT=0.1)
+
+
+def change_soon(owner_id, delay=0.1):
+    timer = threading.Timer(delay, todos_changed, [owner_id])
+    timer.start()
+    return timer
+
+
+class TestTodoEvents:
+    def test_event_stream(self, client, user_token, short_streams):
+        """
+        Test that '/api/todos/events/' accepts a token in the query string and sends the current version, a change and heartbeats
+        """
+
+        user, access_token = user_token
+        version = todo_cache.get_version(user.id)
+        timer = change_soon(user.id)
+        response = client.get(reverse('todo-events'), {'token': access_token}, HTTP_ACCEPT='text/event-stream')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response['Content-Type'] == 'text/event-stream'
+        assert response['Cache-Control'] == 'no-cache'
+        events = b''.join(response.streaming_content).decode().split('\n\n')
+        timer.join()
+        assert events[0] == 'retry: 2000'
+        assert events[1] == 'id: %s\nevent: todos\ndata: {"version": %s}' % (version, version)
+        assert events[2] == 'id: %s\nevent: todos\ndata: {"version": %s}' % (version + 1, version + 1)
+        assert ': keep-alive' in events
+
+    def test_event_stream_resumes(self, client, user_token, short_streams):
+        """
+        Test that a stream reconnecting with the current version as Last-Event-ID only gets heartbeats
+        """
+
+        user, access_token = user_token
+        version = todo_cache.get_version(user.id)
+        response = client.get(reverse('todo-events'), HTTP_AUTHORIZATION='Bearer ' + access_token,
+                              HTTP_ACCEPT='text/event-stream', HTTP_LAST_EVENT_ID=str(version))
+
+        content = b''.join(response.streaming_content).decode()
+        assert 'event: todos' not in content
+        assert ': keep-alive' in content
+
+    def test_event_stream_unauthorized(self, client, db):
+        """
+        Test that an EventSource without a valid token gets a 401 rendered as an error event
+        """
+
+        response = client.get(reverse('todo-events'), {'token': 'invalid'}, HTTP_ACCEPT='text/event-stream')
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        assert response.content.startswith(b'event: error\ndata: {"detail":')
+
+
+class TestTodoChanges:
+    def test_changes_without_since(self, client, user_token):
+        """
+        Test that '/api/todos/changes/' returns the current version right away when no version is given
+        """
+
+        user, access_token = user_token
+        response = client.get(reverse('todo-changes'), HTTP_AUTHORIZATION='Bearer ' + access_token)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == {'version': todo_cache.get_version(user.id), 'changed': True}
+
+    def test_changes_waits_for_a_write(self, client, user_token):
+        """
+        Test that a long poll at the current version is answered once the todos change
+        """
+
+        user, access_token = user_token
+        version = todo_cache.get_version(user.id)
+        timer = change_soon(user.id)
+        response = client.get(reverse('todo-changes'), {'since': version, 'timeout': 5},
+                              HTTP_AUTHORIZATION='Bearer ' + access_token)
+        timer.join()
+
+        assert response.json() == {'version': version + 1, 'changed': True}
+
+    def test_changes_timeout(self, client, user_token):
+        """
+        Test that a long poll without a change times out with "changed": false, and rejects a bad timeout
+        """
+
+        user, access_token = user_token
+        headers = {'HTTP_AUTHORIZATION': 'Bearer ' + access_token}
+        version = todo_cache.get_version(user.id)
+        response = client.get(reverse('todo-changes'), {'since': version, 'timeout': 0.1}, **headers)
+        assert response.json() == {'version': version, 'changed': False}
+
+        response = client.get(reverse('todo-changes'), {'timeout': 'soon'}, **headers)
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_changes_rejects_query_token(self, client, user_token):
+        """
+        Test that only the event stream accepts the token in the query string
+        """
+
+        user, access_token = user_token
+        response = client.get(reverse('todo-changes'), {'token': access_token})
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.parametrize('path', ['todo-list', 'todo-batch'])
+def test_writes_publish(client, user_token, path):
+    """
+    Tests that writes through the API wake the user's subscriptions
+    """
+
+    user, access_token = user_token
+    data = {'title': 'Learn how to use pytest'}
+    if path == 'todo-batch':
+        data = {'create': [data]}
+    with notifications.subscribe(user.id) as subscription:
+        response = client.post(reverse(path), data, content_type='application/json',
+                               HTTP_AUTHORIZATION='Bearer ' + access_token)
+        assert response.status_code in (status.HTTP_200_OK, status.HTTP_201_CREATED)
+        assert subscription.wait(0)
+        assert not subscription.wait(0)
+
+
+def test_cache_backend(db, settings):
+    """
+    Tests that the cache backend notices a version bumped without a publish, as by another process
+    """
+
+    backend = notifications.CacheBackend(INTERVAL=0.01)
+    with backend.subscribe(1) as subscription:
+        assert not subscription.wait(0.05)
+        timer = threading.Timer(0.05, todo_cache.bump_version, [1])
+        timer.start()
+        assert subscription.wait(5)
+        timer.join()
@@ -0,0 +1,220 @@
+import re
+
+import pytest
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from Todo.models import Todo
+from tests.Todo.test_todo_endpoints import auto_login_user, create_todo
+
+
+# the plans are read in SQLite's EXPLAIN QUERY PLAN format
+pytestmark = pytest.mark.skipif(connection.vendor != 'sqlite', reason='query plans are checked on SQLite')
+
+TODO_TABLES = re.compile(r'\b(%s|%s)\b' % (Todo._meta.db_table, 'Todo_todotombstone'))
+
+
+def explain(sql, params=()):
+    """
+    Returns the steps of SQLite's query plan for a statement
+    """
+
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def capture_plans(func):
+    """
+    Calls `func` and returns the query plan of every statement it ran against the todo tables, by SQL
+    """
+
+    with CaptureQueriesContext(connection) as context:
+        func()
+    return {
+        query['sql']: explain(query['sql']) for query in context.captured_queries
+        if TODO_TABLES.search(query['sql']) and not query['sql'].startswith(('INSERT', 'SAVEPOINT', 'RELEASE'))
+    }
+
+
+def assert_indexed(plans, *indexes):
+    """
+    Asserts that no statement scans a todo table or sorts in a temporary b-tree, and that `indexes` were used
+    """
+
+    assert plans
+    for sql, plan in plans.items():
+        for step in plan:
+            assert not (step.startswith('SCAN') and TODO_TABLES.search(step)), (sql, plan)
+            assert 'TEMP B-TREE' not in step, (sql, plan)
+    used = ' '.join(step for plan in plans.values() for step in plan)
+    for index in indexes:
+        assert re.search(r'\b%s\b' % index, used), (index, plans)
+
+
+@pytest.fixture
+def todo_client(db, client, create_todo, auto_login_user):
+    """
+    Fixture to log in a user with a few open and completed todos, returning the user, its todos and auth headers
+    """
+
+    user, access_token, refresh_token = auto_login_user(username='johnsmith', email='johnsmith@gmail.com')
+    other, other_access_token, other_refresh_token = auto_login_user(username='janesmith', email='janesmith@gmail.com')
+    todos = []
+    for i in range(60):
+        todos.append(create_todo(title='Todo #%d' % i, owner=user))
+        create_todo(title='Todo #%d' % i, owner=other)
+    Todo.objects.filter(id__in=[todo.id for todo in todos[::3]]).update(date_completed='2020-06-01T12:00:00Z')
+    headers = {
+        'HTTP_AUTHORIZATION': 'Bearer ' + access_token,
+    }
+    return user, todos, headers
+
+
+class TestTodoQueryPlans:
+    def test_list_query_plan(self, client, todo_client):
+        """
+        Test that both the first and a later page of '/api/todos/' are read from the owner + created index
+        """
+
+        user, todos, headers = todo_client
+
+        def list_pages():
+            response = client.get(reverse('todo-list'), **headers)
+            client.get(response.json()['next'], **headers)
+
+        assert_indexed(capture_plans(list_pages), 'todo_owner_created_idx')
+
+
+    def test_detail_query_plan(self, client, todo_client):
+        """
+        Test that reading, updating and deleting a todo look it up by primary key
+        """
+
+        user, todos, headers = todo_client
+        url = reverse('todo-detail', args=[todos[0].id])
+
+        def detail():
+            client.get(url, **headers)
+            client.patch(url, {'memo': 'Updated'}, content_type='application/json', **headers)
+            client.delete(url, **headers)
+
+        assert_indexed(capture_plans(detail), 'PRIMARY KEY')
+
+
+    def test_batch_query_plan(self, client, todo_client):
+        """
+        Test that '/api/todos/batch/' looks up the todos it updates and deletes by primary key
+        """
+
+        user, todos, headers = todo_client
+
+        def batch():
+            client.post(reverse('todo-batch'), {
+                'update': [{'id': todos[0].id, 'memo': 'Updated'}],
+                'delete': [todos[1].id],
+            }, content_type='application/json', **headers)
+
+        assert_indexed(capture_plans(batch), 'PRIMARY KEY')
+
+
+    def test_export_query_plan(self, client, todo_client):
+        """
+        Test that '/api/todos/export/' streams from the owner + created index
+        """
+
+        user, todos, headers = todo_client
+
+        def export():
+            response = client.get(reverse('todo-export'), **headers)
+            b''.join(response.streaming_content)
+
+        assert_indexed(capture_plans(export), 'todo_owner_created_idx')
+
+
+    def test_sync_query_plan(self, client, todo_client):
+        """
+        Test that '/api/todos/sync' reads changes and tombstones from their owner + sequence indexes
+        """
+
+        user, todos, headers = todo_client
+
+        def sync():
+            client.get(reverse('todo-sync'), {'since': '0'}, **headers)
+
+        assert_indexed(capture_plans(sync), 'todo_owner_seq_idx', 'tombstone_owner_seq_idx')
+
+
+    @pytest.mark.parametrize('params, index', [
+        ({'completed': 'false'}, 'todo_owner_open_idx'),
+        ({'completed': 'true'}, 'todo_owner_completed_idx'),
+        ({'completed_after': '2020-01-01', 'ordering': '-date_completed'}, 'todo_owner_date_completed_idx'),
+        ({'created_after': '2020-01-01', 'created_before': '2030-01-01'}, 'todo_owner_created_idx'),
+        ({'ordering': 'created'}, 'todo_owner_created_idx'),
+        ({'ordering': '-date_completed'}, 'todo_owner_date_completed_idx'),
+        ({'ordering': 'date_completed', 'completed_after': '2020-01-01'}, 'todo_owner_date_completed_idx'),
+        ({'ordering': 'position'}, 'todo_owner_position_idx'),
+        ({'ordering': '-position'}, 'todo_owner_position_idx'),
+        ({'list': '1'}, 'todo_owner_list_created_idx'),
+        ({'list': 'none', 'ordering': 'created'}, 'todo_owner_list_created_idx'),
+        ({'list': '1', 'ordering': 'position'}, 'todo_owner_list_position_idx'),
+    ])
+    def test_filtered_list_query_plan(self, client, todo_client, params, index):
+        """
+        Test that the todo list narrowed or reordered with query parameters is read from the matching index
+        """
+
+        user, todos, headers = todo_client
+
+        def list_page():
+            assert client.get(reverse('todo-list'), params, **headers).status_code == 200
+
+        assert_indexed(capture_plans(list_page), index)
+
+
+    def test_agenda_query_plan(self, client, todo_client):
+        """
+        Test that '/api/todos/agenda/' is read from the agenda index, already in due date and priority order
+        """
+
+        user, todos, headers = todo_client
+        for i, todo in enumerate(todos):
+            Todo.objects.filter(pk=todo.pk).update(due_date='2020-06-%02d' % (i % 28 + 1), priority=i % 4)
+
+        def agenda():
+            assert client.get(reverse('todo-agenda'), {'date': '2020-06-10'}, **headers).status_code == 200
+
+        assert_indexed(capture_plans(agenda), 'todo_owner_agenda_idx')
+
+
+    def test_move_query_plan(self, client, todo_client):
+        """
+        Test that '/api/todos/<id>/move/' finds the new neighbour from the owner + position index
+        """
+
+        user, todos, headers = todo_client
+
+        def move():
+            url = reverse('todo-move', args=[todos[0].id])
+            client.post(url, {'after': todos[30].id}, content_type='application/json', **headers)
+            client.post(url, {'before': todos[10].id}, content_type='application/json', **headers)
+
+        assert_indexed(capture_plans(move), 'todo_owner_position_idx')
+
+
+    def test_search_query_plan(self, client, todo_client):
+        """
+        Test that '/api/todos/?search=' looks words up in the full-text index rather than scanning the todos
+        """
+
+        user, todos, headers = todo_client
+
+        def search():
+            client.get(reverse('todo-list'), {'search': 'todo'}, **headers)
+
+        plans = capture_plans(search)
+        used = ' '.join(step for plan in plans.values() for step in plan)
+        assert 'VIRTUAL TABLE INDEX' in used
+        assert not re.search(r'SCAN Todo_todo\b', used), plans
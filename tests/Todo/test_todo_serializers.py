@@ -0,0 +1,136 @@
+import datetime
+
+import pytest
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from Todo import renderers
+from Todo.models import Tag, Todo, TodoList
+from Todo.renderers import FastJSONRenderer
+from Todo.serializers import TODO_FIELDS, TODO_SUMMARY_FIELDS, TodoRowSerializer, TodoSerializer, get_columns
+from Todo.views import TodoViewSet
+from tests.Todo.test_todo_endpoints import auto_login_user, create_todo
+
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+
+
+@pytest.fixture
+def tricky_todos(db, create_todo, auto_login_user):
+    """
+    Fixture to make todos whose titles, memos and dates exercise the corners of JSON encoding
+    """
+
+    user, access_token, refresh_token = auto_login_user(username='johnsmith', email='johnsmith@gmail.com')
+    create_todo(title='Plain', owner=user)
+    tagged = create_todo(title='Ünïcödé ✓ 😀', memo='quotes " and \\ backslashes\nnew\tlines \x01    ',
+                         owner=user, list=TodoList.objects.create(name='Project', owner=user))
+    tagged.tags.set([Tag.objects.create(name=name, owner=user) for name in ('zebra', 'ünïcödé', 'apple')])
+    create_todo(title='Done', owner=user, date_completed=timezone.now())
+    create_todo(title='Done on the hour', owner=user,
+                date_completed=datetime.datetime(2020, 5, 21, 18, 0, tzinfo=datetime.timezone.utc))
+    return user, access_token
+
+
+@pytest.mark.parametrize('use_orjson', [True, False])
+def test_todo_row_serializer_bytes(tricky_todos, monkeypatch, use_orjson):
+    """
+    Test that the read-optimized list path renders exactly the same bytes as TodoSerializer with JSONRenderer
+    """
+
+    if use_orjson and renderers.orjson is None:
+        pytest.skip('orjson is not installed')
+    if not use_orjson:
+        monkeypatch.setattr(renderers, 'orjson', None)
+
+    queryset = Todo.objects.order_by('id')
+    expected = JSONRenderer().render(TodoSerializer(queryset, many=True).data)
+    rows = TodoRowSerializer(queryset.values_list(*get_columns(TODO_FIELDS))).data
+    rendered = FastJSONRenderer().render(rows, renderer_context={'view': TodoViewSet()})
+
+    assert rendered == expected
+
+
+@pytest.mark.parametrize('query, fields', [
+    ({}, TODO_SUMMARY_FIELDS),
+    ({'fields': 'title,id'}, ['id', 'title']),
+    ({'fields': 'memo,date_completed'}, ['memo', 'date_completed']),
+    ({'fields': 'title,tags'}, ['title', 'tags']),
+    ({'fields': ','.join(TODO_FIELDS)}, TODO_FIELDS),
+])
+def test_todo_list_bytes(tricky_todos, client, query, fields):
+    """
+    Test that the body of '/api/todos' is byte-for-byte what the validating serializer would produce for the fields asked for
+    """
+
+    user, access_token = tricky_todos
+    headers = {
+        'HTTP_AUTHORIZATION': 'Bearer ' + access_token,
+    }
+    response = client.get(reverse('todo-list'), query, **headers)
+    assert response.status_code == status.HTTP_200_OK
+
+    queryset = Todo.objects.filter(owner=user).order_by('-created', '-id')
+    expected = JSONRenderer().render({'next': None, 'results': TodoSerializer(queryset, many=True, fields=fields).data})
+    assert response.content == expected
+
+
+class TestSparseFieldsets:
+    def test_list_reads_only_the_fields(self, tricky_todos, client):
+        """
+        Test that the list leaves memos out of the query unless they are asked for
+        """
+
+        user, access_token = tricky_todos
+        headers = {'HTTP_AUTHORIZATION': 'Bearer ' + access_token}
+        with CaptureQueriesContext(connection) as queries:
+            client.get(reverse('todo-list'), {'fields': 'title'}, **headers)
+        [select] = [query['sql'] for query in queries if query['sql'].startswith('SELECT')]
+        assert '"memo"' not in select
+
+        with CaptureQueriesContext(connection) as queries:
+            client.get(reverse('todo-list'), {'fields': 'title,memo'}, **headers)
+        [select] = [query['sql'] for query in queries if query['sql'].startswith('SELECT')]
+        assert '"memo"' in select
+
+    def test_list_pages_without_the_cursor_fields(self, tricky_todos, client):
+        """
+        Test that the list can be paged through when neither the id nor the ordering field is asked for
+        """
+
+        user, access_token = tricky_todos
+        headers = {'HTTP_AUTHORIZATION': 'Bearer ' + access_token}
+        response = client.get(reverse('todo-list'), {'fields': 'title', 'page_size': 3}, **headers)
+        assert response.json()['results'][0] == {'title': 'Done on the hour'}
+
+        response = client.get(response.json()['next'], **headers)
+        assert response.json() == {'next': None, 'results': [{'title': 'Plain'}]}
+
+    def test_retrieve_fields(self, tricky_todos, client):
+        """
+        Test that a todo is retrieved with every field by default and with the fields asked for otherwise
+        """
+
+        user, access_token = tricky_todos
+        headers = {'HTTP_AUTHORIZATION': 'Bearer ' + access_token}
+        todo = Todo.objects.get(title='Plain')
+        url = reverse('todo-detail', args=[todo.id])
+
+        assert list(client.get(url, **headers).json()) == TODO_FIELDS
+        assert client.get(url, {'fields': 'title,id'}, **headers).json() == {'id': todo.id, 'title': 'Plain'}
+
+    @pytest.mark.parametrize('fields', ['', 'title,owner', ','])
+    def test_invalid_fields(self, tricky_todos, client, fields):
+        """
+        Test that unknown or missing field names are rejected
+        """
+
+        user, access_token = tricky_todos
+        headers = {'HTTP_AUTHORIZATION': 'Bearer ' + access_token}
+        response = client.get(reverse('todo-list'), {'fields': fields}, **headers)
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'fields' in response.json()
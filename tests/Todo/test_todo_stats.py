@@ -0,0 +1,167 @@
+import io
+from unittest import mock
+
+import pytest
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from Todo.importer import TodoImporter
+from Todo.models import Todo, TodoStats
+from Todo.stats import find_inconsistencies, record_changes
+from Todo.views import TodoViewSet, delete_todos
+from tests.Todo.test_todo_endpoints import auto_login_user, create_todo
+
+from rest_framework import status
+
+
+@pytest.fixture
+def todo_headers(db, auto_login_user):
+    """
+    Fixture to log in a user, returning the user and its auth headers
+    """
+
+    user, access_token, refresh_token = auto_login_user(username='johnsmith', email='johnsmith@gmail.com')
+    return user, {'HTTP_AUTHORIZATION': 'Bearer ' + access_token}
+
+
+class TestTodoStats:
+    def test_todo_stats(self, client, create_todo, todo_headers):
+        """
+        Test that '/api/todos/stats' counts the user's open and completed todos
+        """
+
+        user, headers = todo_headers
+        create_todo(title='Open', owner=user)
+        create_todo(title='Done', owner=user, date_completed=timezone.now())
+        response = client.get(reverse('todo-stats'), **headers)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == {'open': 1, 'completed': 1, 'total': 2, 'completion_rate': 0.5}
+
+        # the counters are now stored, and read with a single query
+        with CaptureQueriesContext(connection) as context:
+            client.get(reverse('todo-stats'), **headers)
+        assert len(context.captured_queries) == 1
+
+
+    def test_todo_stats_follow_writes(self, client, create_todo, todo_headers):
+        """
+        Test that creating, completing, reopening, deleting, batching and importing todos keep the counters current
+        """
+
+        user, headers = todo_headers
+        assert client.get(reverse('todo-stats'), **headers).json()['total'] == 0
+
+        todo = client.post(reverse('todo-list'), {'title': 'Learn how to use pytest'}, **headers).json()
+        client.post(reverse('todo-list'), {'title': 'Done', 'date_completed': '2020-06-01T12:00:00Z'}, **headers)
+        client.patch(reverse('todo-detail', args=[todo['id']]), {'date_completed': '2020-06-02T12:00:00Z'},
+                     content_type='application/json', **headers)
+        done = Todo.objects.get(title='Done')
+        client.post(reverse('todo-batch'), {
+            'create': [{'title': 'Batch'}, {'title': 'Batch done', 'date_completed': '2020-06-01T12:00:00Z'}],
+            'update': [{'id': todo['id'], 'date_completed': None}],
+            'delete': [done.id],
+        }, content_type='application/json', **headers)
+        TodoImporter(user.id).run(iter([{'title': 'Import'}, {'title': 'Import done', 'date_completed': '2020-06-01T12:00:00Z'}]))
+        client.delete(reverse('todo-detail', args=[todo['id']]), **headers)
+
+        assert client.get(reverse('todo-stats'), **headers).json() == {
+            'open': 2, 'completed': 2, 'total': 4, 'completion_rate': 0.5}
+        assert find_inconsistencies() == []
+
+
+    @pytest.mark.parametrize('method, action', [
+        ('get_object', lambda client, pk, headers: client.patch(
+            reverse('todo-detail', args=[pk]), {'date_completed': '2020-06-02T12:00:00Z'},
+            content_type='application/json', **headers)),
+        ('_get_id_errors', lambda client, pk, headers: client.post(
+            reverse('todo-batch'), {'update': [{'id': pk, 'date_completed': '2020-06-02T12:00:00Z'}]},
+            content_type='application/json', **headers)),
+    ])
+    def test_todo_stats_concurrent_write(self, client, todo_headers, method, action):
+        """
+        Test that completing a todo that another request completed after it was loaded counts it once
+        """
+
+        user, headers = todo_headers
+        todo = client.post(reverse('todo-list'), {'title': 'Learn how to use pytest'}, **headers).json()
+        original = getattr(TodoViewSet, method)
+
+        def complete_meanwhile(*args, **kwargs):
+            result = original(*args, **kwargs)
+            # what the other request did, once this one had loaded the todo
+            if Todo.objects.filter(pk=todo['id'], date_completed__isnull=True).update(date_completed=timezone.now()):
+                record_changes(user.id, opened=-1, completed=1)
+            return result
+
+        with mock.patch.object(TodoViewSet, method, complete_meanwhile):
+            response = action(client, todo['id'], headers)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert client.get(reverse('todo-stats'), **headers).json()['completed'] == 1
+        assert find_inconsistencies() == []
+
+
+    @pytest.mark.parametrize('method, action, expected_status', [
+        ('get_object', lambda client, pk, headers: client.patch(
+            reverse('todo-detail', args=[pk]), {'date_completed': '2020-06-02T12:00:00Z'},
+            content_type='application/json', **headers), status.HTTP_404_NOT_FOUND),
+        ('_get_id_errors', lambda client, pk, headers: client.post(
+            reverse('todo-batch'), {'update': [{'id': pk, 'date_completed': '2020-06-02T12:00:00Z'}]},
+            content_type='application/json', **headers), status.HTTP_400_BAD_REQUEST),
+    ])
+    def test_todo_stats_concurrent_delete(self, client, todo_headers, method, action, expected_status):
+        """
+        Test that a todo deleted by another request after it was loaded is not written back
+        """
+
+        user, headers = todo_headers
+        todo = client.post(reverse('todo-list'), {'title': 'Learn how to use pytest'}, **headers).json()
+        original = getattr(TodoViewSet, method)
+
+        def delete_meanwhile(*args, **kwargs):
+            result = original(*args, **kwargs)
+            # what the other request did, once this one had loaded the todo
+            delete_todos(Todo.objects.filter(pk=todo['id']), user.id)
+            return result
+
+        with mock.patch.object(TodoViewSet, method, delete_meanwhile):
+            response = action(client, todo['id'], headers)
+
+        assert response.status_code == expected_status
+        assert not Todo.objects.exists()
+        assert find_inconsistencies() == []
+
+
+    def test_todo_stats_unauthorized(self, db, client):
+        """
+        Test that an anonymous request for stats is rejected
+        """
+
+        response = client.get(reverse('todo-stats'))
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+    def test_rebuild_todo_stats_command(self, create_todo, todo_headers):
+        """
+        Test that 'manage.py rebuild_todo_stats --check' reports wrong counters and that rebuilding fixes them
+        """
+
+        user, headers = todo_headers
+        create_todo(title='Open', owner=user)
+        TodoStats.objects.create(owner=user, open_count=5, completed_count=1)
+
+        stderr = io.StringIO()
+        with pytest.raises(CommandError):
+            call_command('rebuild_todo_stats', check=True, stdout=io.StringIO(), stderr=stderr)
+        assert 'stored 5 open, 1 completed; counted 1 open, 0 completed' in stderr.getvalue()
+
+        call_command('rebuild_todo_stats', 'johnsmith', stdout=io.StringIO())
+        assert TodoStats.objects.filter(owner=user, open_count=1, completed_count=0).exists()
+        call_command('rebuild_todo_stats', check=True, stdout=io.StringIO())
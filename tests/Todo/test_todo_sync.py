@@ -0,0 +1,216 @@
+import datetime
+import io
+from unittest import mock
+
+import pytest
+
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+
+from Todo.models import Todo, TodoTombstone
+from tests.Todo.test_todo_endpoints import auto_login_user, create_todo
+
+from rest_framework import status
+
+
+class TestTodoSync:
+    def test_todo_sync_full(self, db, client, create_todo, auto_login_user):
+        """
+        Test that a GET request to '/api/todos/sync' without a cursor returns every todo of the current user
+        """
+
+        # login user
+        user, access_token, refresh_token = auto_login_user(username='johnsmith', email='johnsmith@gmail.com')
+        todo = create_todo(title='Learn how to use pytest', owner=user)
+        # todos of other users are never part of the feed
+        user2, access_token2, refresh_token2 = auto_login_user(username='johndoe', email='johndoe@gmail.com')
+        create_todo(title='Learn how to use Ant.design', owner=user2)
+        headers = {
+            'HTTP_AUTHORIZATION': 'Bearer ' + access_token,
+        }
+        response = client.get(reverse('todo-sync'), **headers)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert [item['id'] for item in response.json()['changed']] == [todo.id]
+        assert response.json()['deleted'] == []
+        assert response.json()['cursor']
+        assert response.json()['more'] is False
+
+
+    def test_todo_sync_since(self, db, client, create_todo, auto_login_user):
+        """
+        Test that syncing with a cursor only returns the todos changed or deleted since then
+        """
+
+        # login user
+        user, access_token, refresh_token = auto_login_user(username='johnsmith', email='johnsmith@gmail.com')
+        untouched = create_todo(title='Learn how to use pytest', owner=user)
+        changed = create_todo(title='Learn how to use Django', owner=user)
+        deleted = create_todo(title='Learn how to use DRF', owner=user)
+        headers = {
+            'HTTP_AUTHORIZATION': 'Bearer ' + access_token,
+        }
+        cursor = client.get(reverse('todo-sync'), **headers).json()['cursor']
+
+        # change one todo and delete another through the API
+        response = client.patch(reverse('todo-detail', args=(changed.pk,)), {'memo': 'Start with the tutorial'},
+                                **headers, content_type='application/json')
+        assert response.status_code == status.HTTP_200_OK
+        response = client.delete(reverse('todo-detail', args=(deleted.pk,)), **headers)
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        assert TodoTombstone.objects.filter(todo_id=deleted.pk).exists()
+
+        response = client.get(reverse('todo-sync'), {'since': cursor}, **headers)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert [item['id'] for item in response.json()['changed']] == [changed.id]
+        assert response.json()['changed'][0]['memo'] == 'Start with the tutorial'
+        assert response.json()['deleted'] == [deleted.id]
+
+        # nothing changed since
+        response = client.get(reverse('todo-sync'), {'since': response.json()['cursor']}, **headers)
+        assert response.json()['changed'] == []
+        assert response.json()['deleted'] == []
+
+
+    def test_todo_sync_late_write(self, db, client, create_todo, auto_login_user):
+        """
+        Test that a write is returned by the next sync however long before it committed it was stamped
+        """
+
+        # login user
+        user, access_token, refresh_token = auto_login_user(username='johnsmith', email='johnsmith@gmail.com')
+        todo = create_todo(title='Learn how to use pytest', owner=user)
+        headers = {
+            'HTTP_AUTHORIZATION': 'Bearer ' + access_token,
+        }
+        cursor = client.get(reverse('todo-sync'), **headers).json()['cursor']
+
+        # stamped an hour before the sync above, as a write that waited for a lock would be
+        with mock.patch('django.utils.timezone.now', return_value=timezone.now() - datetime.timedelta(hours=1)):
+            response = client.patch(reverse('todo-detail', args=(todo.pk,)), {'memo': 'Late'},
+                                    **headers, content_type='application/json')
+        assert response.status_code == status.HTTP_200_OK
+
+        response = client.get(reverse('todo-sync'), {'since': cursor}, **headers)
+        assert [item['memo'] for item in response.json()['changed']] == ['Late']
+
+
+    def test_todo_sync_other_writes(self, db, client, auto_login_user):
+        """
+        Test that batches, moves, imports and list and tag changes all show up in the sync feed
+        """
+
+        # login user
+        user, access_token, refresh_token = auto_login_user(username='johnsmith', email='johnsmith@gmail.com')
+        headers = {
+            'HTTP_AUTHORIZATION': 'Bearer ' + access_token,
+        }
+        todo_list = client.post(reverse('todolist-list'), {'name': 'Project'}, **headers).json()
+        tag = client.post(reverse('tag-list'), {'name': 'work'}, **headers).json()
+        first, second, third = client.post(reverse('todo-batch'), {'create': [
+            {'title': 'First', 'list': todo_list['id']}, {'title': 'Second', 'tags': ['work']}, {'title': 'Third'},
+        ]}, content_type='application/json', **headers).json()['created']
+
+        def sync_since(cursor):
+            response = client.get(reverse('todo-sync'), {'since': cursor}, **headers)
+            return response.json()['cursor'], {item['id'] for item in response.json()['changed']}
+
+        cursor, changed = sync_since(0)
+        assert changed == {first['id'], second['id'], third['id']}
+        client.post(reverse('todo-move', args=[third['id']]), {'before': first['id']},
+                    content_type='application/json', **headers)
+        cursor, changed = sync_since(cursor)
+        assert changed == {third['id']}
+        client.delete(reverse('todolist-detail', args=[todo_list['id']]), **headers)
+        cursor, changed = sync_since(cursor)
+        assert changed == {first['id']}
+        client.patch(reverse('tag-detail', args=[tag['id']]), {'name': 'office'},
+                     content_type='application/json', **headers)
+        cursor, changed = sync_since(cursor)
+        assert changed == {second['id']}
+        response = client.post(reverse('todo-import'), b'{"title": "Imported"}\n',
+                               content_type='application/x-ndjson', **headers)
+        assert response.json()['imported'] == 1
+        cursor, changed = sync_since(cursor)
+        assert changed == {Todo.objects.get(title='Imported').id}
+
+
+    def test_todo_sync_pages(self, db, client, auto_login_user, settings):
+        """
+        Test that changes are returned TODO_SYNC['PAGE_SIZE'] at a time, in the order they were made
+        """
+
+        settings.TODO_SYNC = dict(settings.TODO_SYNC, PAGE_SIZE=2)
+        # login user
+        user, access_token, refresh_token = auto_login_user(username='johnsmith', email='johnsmith@gmail.com')
+        headers = {
+            'HTTP_AUTHORIZATION': 'Bearer ' + access_token,
+        }
+        ids = [client.post(reverse('todo-list'), {'title': 'Todo #%d' % i}, **headers).json()['id']
+               for i in range(5)]
+        client.delete(reverse('todo-detail', args=[ids[0]]), **headers)
+        client.patch(reverse('todo-detail', args=[ids[1]]), {'memo': 'Changed'},
+                     content_type='application/json', **headers)
+
+        def sync_all(params):
+            pages = []
+            while True:
+                response = client.get(reverse('todo-sync'), params, **headers).json()
+                pages.append(([item['id'] for item in response['changed']], response['deleted']))
+                if not response['more']:
+                    return pages
+                params = {'since': response['cursor']}
+
+        assert sync_all({'since': 0}) == [([ids[2], ids[3]], []), ([ids[4]], [ids[0]]), ([ids[1]], [])]
+        # from scratch, the first page leaves out deleted todos
+        assert sync_all({})[0] == ([ids[2], ids[3]], [])
+
+
+    @pytest.mark.parametrize('since', ['yesterday', '2020-01-01T00:00:00Z', '-1', str(10 ** 30)])
+    def test_todo_sync_invalid_cursor(self, db, client, auto_login_user, since):
+        """
+        Test that a malformed cursor is rejected with a 400
+        """
+
+        # login user
+        user, access_token, refresh_token = auto_login_user(username='johnsmith', email='johnsmith@gmail.com')
+        headers = {
+            'HTTP_AUTHORIZATION': 'Bearer ' + access_token,
+        }
+        response = client.get(reverse('todo-sync'), {'since': since}, **headers)
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+    def test_prune_tombstones(self, db, client, auto_login_user):
+        """
+        Test that 'manage.py prune_tombstones' deletes old tombstones, and that cursors older than them expire
+        """
+
+        # login user
+        user, access_token, refresh_token = auto_login_user(username='johnsmith', email='johnsmith@gmail.com')
+        headers = {
+            'HTTP_AUTHORIZATION': 'Bearer ' + access_token,
+        }
+        ids = [client.post(reverse('todo-list'), {'title': 'Todo #%d' % i}, **headers).json()['id']
+               for i in range(3)]
+        cursor = client.get(reverse('todo-sync'), **headers).json()['cursor']
+        client.delete(reverse('todo-detail', args=[ids[0]]), **headers)
+        latest = client.get(reverse('todo-sync'), {'since': cursor}, **headers).json()['cursor']
+        client.delete(reverse('todo-detail', args=[ids[1]]), **headers)
+        TodoTombstone.objects.filter(todo_id=ids[0]).update(deleted=timezone.now() - datetime.timedelta(days=100))
+
+        stdout = io.StringIO()
+        call_command('prune_tombstones', stdout=stdout)
+        assert 'Deleted 1 tombstones' in stdout.getvalue()
+        assert list(TodoTombstone.objects.values_list('todo_id', flat=True)) == [ids[1]]
+
+        response = client.get(reverse('todo-sync'), {'since': cursor}, **headers)
+        assert response.status_code == status.HTTP_410_GONE
+        response = client.get(reverse('todo-sync'), {'since': latest}, **headers)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()['deleted'] == [ids[1]]
+        response = client.get(reverse('todo-sync'), **headers)
+        assert [item['id'] for item in response.json()['changed']] == [ids[2]]
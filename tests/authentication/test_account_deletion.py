@@ -0,0 +1,120 @@
+import pytest
+
+from django.contrib.auth.models import User
+from django.urls import reverse
+
+from core import tasks
+from jobs.models import Job
+from jobs.queue import Worker
+from Todo.models import Tag, Todo, TodoList, TodoStats, TodoTombstone
+from tests.Todo.test_todo_endpoints import auto_login_user
+
+from rest_framework import status
+
+
+@pytest.fixture
+def account(db, client, auto_login_user):
+    """
+    Fixture to log in a user with a list, tags, todos and tombstones, returning the user and its tokens
+    """
+
+    user, access_token, refresh_token = auto_login_user(username='johnsmith', email='johnsmith@gmail.com')
+    headers = {'HTTP_AUTHORIZATION': 'Bearer ' + access_token}
+    todo_list = client.post(reverse('todolist-list'), {'name': 'Project'}, **headers).json()
+    client.post(reverse('tag-list'), {'name': 'work'}, **headers)
+    for i in range(5):
+        client.post(reverse('todo-list'), {'title': 'Todo #%d' % i, 'list': todo_list['id'], 'tags': ['work']},
+                    content_type='application/json', **headers)
+    client.delete(reverse('todo-detail', args=[Todo.objects.first().id]), **headers)
+    return user, headers, refresh_token
+
+
+def test_delete_account(client, account):
+    """
+    Test that deleting an account deactivates the user at once, and leaves deleting their data to a worker
+    """
+
+    user, headers, refresh_token = account
+    other = User.objects.create_user('janesmith')
+    Todo.objects.create(title='Not mine', owner=other)
+
+    response = client.delete(reverse('account-delete'), {'refresh': refresh_token},
+                             content_type='application/json', **headers)
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    assert not User.objects.get(pk=user.pk).is_active
+    assert Todo.objects.filter(owner=user).count() == 4
+    assert Job.objects.get().task == 'core.tasks.delete_account'
+
+    # the account can no longer be used to log in or refresh a token
+    response = client.post(reverse('token-obtain-pair'), {'username': 'johnsmith', 'password': 'johnnyappleseed'})
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    response = client.post(reverse('token-refresh'), {'refresh': refresh_token}, content_type='application/json')
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    Worker().run(burst=True)
+    assert not User.objects.filter(pk=user.pk).exists()
+    for model in (Todo, TodoTombstone, TodoList, Tag, TodoStats):
+        assert not model.objects.filter(owner=user.pk).exists()
+    assert Todo.tags.through.objects.count() == 0
+    assert Todo.objects.filter(owner=other).count() == 1
+    assert not Job.objects.exists()
+
+
+def test_refresh_after_deletion(client, account):
+    """
+    Test that the refresh tokens of the account's other sessions are refused once it is deleted, and after
+    """
+
+    user, headers, refresh_token = account
+    response = client.post(reverse('token-obtain-pair'), {'username': 'johnsmith', 'password': 'johnnyappleseed'})
+    other_sessions = [response.json()['refresh']]
+    response = client.post(reverse('token-obtain-pair'), {'username': 'johnsmith', 'password': 'johnnyappleseed'})
+    other_sessions.append(response.json()['refresh'])
+
+    client.delete(reverse('account-delete'), **headers)
+    response = client.post(reverse('token-refresh'), {'refresh': other_sessions[0]}, content_type='application/json')
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    Worker().run(burst=True)
+    response = client.post(reverse('token-refresh'), {'refresh': other_sessions[1]}, content_type='application/json')
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+def test_delete_account_twice(client, account):
+    """
+    Test that asking again while the account is being deleted enqueues no more jobs
+    """
+
+    user, headers, refresh_token = account
+    for _ in range(2):
+        assert client.delete(reverse('account-delete'), **headers).status_code == status.HTTP_202_ACCEPTED
+    assert Job.objects.count() == 1
+
+
+def test_delete_account_invalid_body(client, account):
+    """
+    Test that a body that isn't a JSON object is rejected, leaving the account as it was
+    """
+
+    user, headers, refresh_token = account
+    response = client.delete(reverse('account-delete'), [1], content_type='application/json', **headers)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert User.objects.get(pk=user.pk).is_active
+    assert not Job.objects.exists()
+
+
+def test_delete_in_chunks(account):
+    """
+    Test that each job deletes at most its number of chunks, and enqueues another for the rest
+    """
+
+    user, headers, refresh_token = account
+    tasks.delete_account(user.pk, chunk_size=2, max_chunks=2)
+    assert Todo.objects.filter(owner=user).count() == 0
+    assert Job.objects.get().kwargs == {'user_id': user.pk, 'chunk_size': 2, 'max_chunks': 2}
+
+    worker = Worker()
+    worker.run(burst=True)
+    # the tombstone and the list, then the tag and the user
+    assert worker.succeeded == 2
+    assert not User.objects.filter(pk=user.pk).exists()
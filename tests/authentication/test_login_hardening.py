@@ -0,0 +1,110 @@
+import threading
+from unittest import mock
+
+import pytest
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.urls import reverse
+
+from core.hashers import run_in_pool
+from core.throttling import TokenBuckets
+
+from rest_framework import status
+
+
+def login(client, username, password='johnnyappleseed', **extra):
+    return client.post(reverse('token-obtain-pair'), {'username': username, 'password': password},
+                       content_type='application/json', **extra)
+
+
+def test_password_hashed_with_argon2(db, client):
+    """
+    Tests that registering hashes the password with Argon2id and the configured costs
+    """
+
+    response = client.post('/api/users', {'username': 'johnsmith', 'password': 'johnnyappleseed'},
+                           content_type='application/json')
+
+    assert response.status_code == status.HTTP_201_CREATED
+    assert User.objects.get().password.startswith('argon2$argon2id$v=19$m=19456,t=2,p=1$')
+
+
+def test_login_rehashes_password(db, client):
+    """
+    Tests that logging in rehashes a password stored with an older hasher, and that the new hash still logs in
+    """
+
+    user = User.objects.create(username='johnsmith', password=make_password('johnnyappleseed', hasher='pbkdf2_sha256'))
+
+    assert login(client, 'johnsmith').status_code == status.HTTP_200_OK
+    user.refresh_from_db()
+    assert user.password.startswith('argon2$')
+    assert login(client, 'johnsmith').status_code == status.HTTP_200_OK
+    assert login(client, 'johnsmith', 'Johnnyappleseed').status_code == status.HTTP_401_UNAUTHORIZED
+
+
+def test_hashing_runs_in_pool():
+    """
+    Tests that passwords are hashed on the pool's threads, and that hashers calling each other there do not deadlock
+    """
+
+    assert run_in_pool(lambda: threading.current_thread().name).startswith('password-hash')
+    assert run_in_pool(run_in_pool, lambda: 'nested') == 'nested'
+
+
+def test_login_throttled_per_username(db, client, settings):
+    """
+    Tests that once a username has used its burst, logging into it is refused until its bucket refills
+    """
+
+    settings.AUTH_THROTTLES = {'ip': {'BURST': 100, 'RATE': 1}, 'username': {'BURST': 2, 'RATE': 0.1}}
+    User.objects.create_user('johnsmith', 'jsmith@gmail.com', 'johnnyappleseed')
+    User.objects.create_user('janesmith', 'janesmith@gmail.com', 'johnnyappleseed')
+
+    assert login(client, 'johnsmith', 'wrong').status_code == status.HTTP_401_UNAUTHORIZED
+    assert login(client, 'JohnSmith', 'wrong').status_code == status.HTTP_401_UNAUTHORIZED
+    response = login(client, 'johnsmith')
+    assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert int(response['Retry-After']) == 10
+
+    # other usernames have buckets of their own
+    assert login(client, 'janesmith').status_code == status.HTTP_200_OK
+
+
+def test_register_throttled_per_ip(db, client, settings):
+    """
+    Tests that a client address is refused further registrations once it has used its burst, unlike other addresses
+    """
+
+    settings.AUTH_THROTTLES = {'ip': {'BURST': 1, 'RATE': 0.5}, 'username': {'BURST': 100, 'RATE': 1}}
+    url = '/api/users'
+
+    assert client.post(url, {'username': 'johnsmith', 'password': 'johnnyappleseed'},
+                       content_type='application/json').status_code == status.HTTP_201_CREATED
+    assert client.post(url, {'username': 'janesmith', 'password': 'johnnyappleseed'},
+                       content_type='application/json').status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert client.post(url, {'username': 'janesmith', 'password': 'johnnyappleseed'}, content_type='application/json',
+                       REMOTE_ADDR='10.0.0.2').status_code == status.HTTP_201_CREATED
+    # a forwarded address sent by the client itself is ignored
+    assert client.post(url, {'username': 'jamessmith', 'password': 'johnnyappleseed'}, content_type='application/json',
+                       HTTP_X_FORWARDED_FOR='10.0.0.3').status_code == status.HTTP_429_TOO_MANY_REQUESTS
+
+
+def test_token_buckets_refill():
+    """
+    Tests that a token bucket allows a burst, then refills at its rate up to the burst size
+    """
+
+    buckets = TokenBuckets(maxsize=1)
+    with mock.patch('core.throttling.time.monotonic', return_value=100.0) as monotonic:
+        assert [buckets.take('johnsmith', 2, 0.5) for i in range(3)] == [0, 0, 2]
+        monotonic.return_value = 101.0
+        assert buckets.take('johnsmith', 2, 0.5) == 1
+        monotonic.return_value = 110.0
+        assert [buckets.take('johnsmith', 2, 0.5) for i in range(3)] == [0, 0, 2]
+
+        # the least recently used bucket is dropped, and comes back full
+        buckets.take('janesmith', 2, 0.5)
+        assert len(buckets) == 1
+        assert buckets.take('johnsmith', 2, 0.5) == 0
@@ -0,0 +1,151 @@
+import base64
+import hashlib
+import hmac
+import json
+
+import jwt
+import pytest
+
+from django.urls import reverse
+
+from core import signing
+from tests.Todo.test_todo_endpoints import auto_login_user
+
+from rest_framework import status
+from rest_framework_simplejwt import state
+from rest_framework_simplejwt.tokens import AccessToken
+
+pytest.importorskip('cryptography')
+
+
+def public_key_from_jwk(jwk):
+    """
+    Loads a JWK the way a downstream service would
+    """
+
+    if jwk['kty'] == 'RSA':
+        return jwt.algorithms.RSAAlgorithm.from_jwk(json.dumps(jwk))
+    from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PublicKey
+    return Ed25519PublicKey.from_public_bytes(base64.urlsafe_b64decode(jwk['x'] + '=' * (-len(jwk['x']) % 4)))
+
+
+@pytest.fixture
+def use_key_ring():
+    """
+    Fixture to sign and verify tokens with the key ring of the given options, restoring the default afterwards
+    """
+
+    backend = state.token_backend
+
+    def install(options):
+        state.token_backend = signing.get_token_backend(options)
+        signing.get_jwks.cache_clear()
+        return state.token_backend
+
+    yield install
+    state.token_backend = backend
+    signing.get_jwks.cache_clear()
+
+
+@pytest.fixture(params=signing.ALGORITHMS)
+def key_ring(request, use_key_ring):
+    """
+    Fixture to sign with a new key of each algorithm, with a retired key of the same algorithm still accepted
+    """
+
+    algorithm = request.param
+    retired = signing.SigningKey('retired', algorithm, signing.generate_private_key(algorithm))
+    options = {
+        'ACTIVE': 'current',
+        'KEYS': [
+            {'KID': 'current', 'ALGORITHM': algorithm, 'PRIVATE_KEY': signing.generate_private_key(algorithm)},
+            {'KID': 'retired', 'ALGORITHM': algorithm, 'PUBLIC_KEY': retired.public_key.public_bytes(
+                signing.serialization.Encoding.PEM, signing.serialization.PublicFormat.SubjectPublicKeyInfo).decode()},
+        ],
+    }
+    return use_key_ring(options), retired
+
+
+def test_tokens_carry_the_key_id(client, key_ring, auto_login_user):
+    """
+    Tests that tokens are signed with the active key, named in their header, and accepted by the API
+    """
+
+    backend, retired = key_ring
+    user, access_token, refresh_token = auto_login_user(username='johnsmith', email='johnsmith@gmail.com')
+
+    header = jwt.get_unverified_header(access_token)
+    assert header['kid'] == 'current'
+    assert header['alg'] == backend.active.algorithm
+    response = client.get(reverse('todo-list'), HTTP_AUTHORIZATION='Bearer ' + access_token)
+    assert response.status_code == status.HTTP_200_OK
+    response = client.post(reverse('token-refresh'), {'refresh': refresh_token}, content_type='application/json')
+    assert response.status_code == status.HTTP_200_OK
+
+
+def test_jwks_verifies_offline(client, key_ring, auto_login_user):
+    """
+    Tests that '/api/.well-known/jwks.json' publishes every key, enough to verify tokens without the API
+    """
+
+    backend, retired = key_ring
+    user, access_token, refresh_token = auto_login_user(username='johnsmith', email='johnsmith@gmail.com')
+    response = client.get(reverse('jwks'))
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response['Cache-Control'] == 'public, max-age=3600'
+    keys = {jwk['kid']: jwk for jwk in response.json()['keys']}
+    assert sorted(keys) == ['current', 'retired']
+    assert all('d' not in jwk for jwk in keys.values())
+
+    jwk = keys[jwt.get_unverified_header(access_token)['kid']]
+    claims = jwt.decode(access_token, public_key_from_jwk(jwk), algorithms=[jwk['alg']])
+    assert claims['username'] == 'johnsmith'
+
+    response = client.get(reverse('jwks'), HTTP_IF_NONE_MATCH=response['ETag'])
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+
+def test_retired_and_unknown_keys(db, key_ring):
+    """
+    Tests that tokens signed with a retired key are still accepted, and those naming an unknown key are not
+    """
+
+    backend, retired = key_ring
+    token = jwt.encode(dict(AccessToken().payload, user_id=1), retired.private_key,
+                       algorithm=retired.algorithm, headers={'kid': 'retired'}).decode()
+    assert backend.decode(token)['user_id'] == 1
+
+    token = jwt.encode(dict(AccessToken().payload, user_id=1), retired.private_key,
+                       algorithm=retired.algorithm, headers={'kid': 'unknown'}).decode()
+    with pytest.raises(signing.TokenBackendError):
+        backend.decode(token)
+
+
+def test_algorithm_comes_from_the_key(db, key_ring):
+    """
+    Tests that a token signed with HS256 using a public key as the secret is rejected
+    """
+
+    backend, retired = key_ring
+    public_pem = backend.active.public_key.public_bytes(
+        signing.serialization.Encoding.PEM, signing.serialization.PublicFormat.SubjectPublicKeyInfo)
+    segments = [base64.urlsafe_b64encode(json.dumps(part).encode()).rstrip(b'=') for part in (
+        {'alg': 'HS256', 'typ': 'JWT', 'kid': 'current'}, dict(AccessToken().payload, user_id=1))]
+    signature = hmac.new(public_pem, b'.'.join(segments), hashlib.sha256).digest()
+    token = b'.'.join(segments + [base64.urlsafe_b64encode(signature).rstrip(b'=')]).decode()
+    with pytest.raises(signing.TokenBackendError):
+        backend.decode(token)
+
+
+def test_legacy_tokens(db, use_key_ring):
+    """
+    Tests that tokens signed before the key ring was set up are accepted only while ACCEPT_LEGACY_TOKENS is on
+    """
+
+    token = str(AccessToken())
+    key = {'KID': 'current', 'ALGORITHM': 'EdDSA', 'PRIVATE_KEY': signing.generate_private_key('EdDSA')}
+
+    assert use_key_ring({'ACTIVE': 'current', 'KEYS': [key]}).decode(token)
+    with pytest.raises(signing.TokenBackendError):
+        use_key_ring({'ACTIVE': 'current', 'KEYS': [key], 'ACCEPT_LEGACY_TOKENS': False}).decode(token)
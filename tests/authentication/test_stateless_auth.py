@@ -0,0 +1,69 @@
+import pytest
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.authentication import ClaimsUser
+from core.cache import TTLCache
+from tests.Todo.test_todo_endpoints import auto_login_user
+
+from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken
+
+
+def test_todo_list_without_user_query(db, client, auto_login_user):
+    """
+    Tests that authenticating a request from the access token does not load the user from the database
+    """
+
+    # login user
+    user, access_token, refresh_token = auto_login_user(username='johnsmith', email='johnsmith@gmail.com')
+    headers = {
+        'HTTP_AUTHORIZATION': 'Bearer ' + access_token,
+    }
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(reverse('todo-list'), **headers)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert not [query for query in queries if 'auth_user' in query['sql']]
+
+
+def test_claims_user(db, auto_login_user):
+    """
+    Tests that the token-backed user exposes the claims and looks the full user up only once
+    """
+
+    # login user
+    user, access_token, refresh_token = auto_login_user(username='johnsmith', email='johnsmith@gmail.com')
+    claims_user = ClaimsUser(AccessToken(access_token))
+
+    assert claims_user.id == user.id
+    assert claims_user.username == 'johnsmith'
+    assert claims_user.is_admin is False
+    assert claims_user.get_user() == user
+    with CaptureQueriesContext(connection) as queries:
+        assert claims_user.get_user() == user
+    assert len(queries) == 0
+
+
+def test_ttl_cache():
+    """
+    Tests that the cache evicts the least recently used entry and never keeps entries longer than its TTL
+    """
+
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    # touch 'a' so that 'b' is the least recently used entry
+    assert cache.get('a') == 1
+    cache.set('c', 3)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+
+    # an already expired entry is never returned
+    cache.set('d', 4, ttl=0)
+    assert cache.get('d') is None
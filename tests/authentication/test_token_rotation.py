@@ -0,0 +1,116 @@
+import datetime
+import time
+
+import pytest
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core import revocation
+from core.models import RevokedToken
+from tests.Todo.test_todo_endpoints import auto_login_user
+
+from rest_framework import status
+from rest_framework_simplejwt.settings import api_settings
+
+
+def refresh(client, token):
+    return client.post(reverse('token-refresh'), {'refresh': token}, content_type='application/json')
+
+
+def test_refresh_rotates(db, client, auto_login_user, monkeypatch):
+    """
+    Tests that refreshing returns a new refresh token and revokes the one used, with a single write
+    """
+
+    # not due for pruning
+    monkeypatch.setattr(revocation, '_last_prune', time.monotonic())
+    user, access_token, refresh_token = auto_login_user(username='johnsmith', email='johnsmith@gmail.com')
+    with CaptureQueriesContext(connection) as queries:
+        response = refresh(client, refresh_token)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()['refresh'] != refresh_token
+    assert [query['sql'].split()[0] for query in queries if 'core_revokedtoken' in query['sql']] == ['INSERT']
+    assert RevokedToken.objects.count() == 1
+
+    # the new refresh token can be used, once
+    assert refresh(client, response.json()['refresh']).status_code == status.HTTP_200_OK
+    assert refresh(client, response.json()['refresh']).status_code == status.HTTP_401_UNAUTHORIZED
+
+
+def test_refresh_replay(db, client, auto_login_user):
+    """
+    Tests that a rotated refresh token is refused, from memory in this process and from the database in others
+    """
+
+    user, access_token, refresh_token = auto_login_user(username='johnsmith', email='johnsmith@gmail.com')
+    assert refresh(client, refresh_token).status_code == status.HTTP_200_OK
+
+    with CaptureQueriesContext(connection) as queries:
+        response = refresh(client, refresh_token)
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    assert response.json()['detail'] == 'Token is blacklisted'
+    assert len(queries) == 0
+
+    # as seen by a process which did not revoke it
+    revocation.revoked_ids.clear()
+    assert refresh(client, refresh_token).status_code == status.HTTP_401_UNAUTHORIZED
+
+
+def test_token_revoke(db, client, auto_login_user):
+    """
+    Tests that a revoked refresh token can be neither refreshed nor revoked again
+    """
+
+    user, access_token, refresh_token = auto_login_user(username='johnsmith', email='johnsmith@gmail.com')
+    url = reverse('token-revoke')
+    response = client.post(url, {'refresh': refresh_token}, content_type='application/json')
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+
+    assert refresh(client, refresh_token).status_code == status.HTTP_401_UNAUTHORIZED
+    response = client.post(url, {'refresh': refresh_token}, content_type='application/json')
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    # an access token is not a refresh token
+    response = client.post(url, {'refresh': access_token}, content_type='application/json')
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+def test_refresh_without_rotation(db, client, auto_login_user, monkeypatch):
+    """
+    Tests that revoked refresh tokens are refused when refresh tokens are not rotated too
+    """
+
+    monkeypatch.setattr(api_settings, 'ROTATE_REFRESH_TOKENS', False)
+    user, access_token, refresh_token = auto_login_user(username='johnsmith', email='johnsmith@gmail.com')
+    response = refresh(client, refresh_token)
+    assert response.status_code == status.HTTP_200_OK
+    assert 'refresh' not in response.json()
+    assert refresh(client, refresh_token).status_code == status.HTTP_200_OK
+
+    client.post(reverse('token-revoke'), {'refresh': refresh_token}, content_type='application/json')
+    assert refresh(client, refresh_token).status_code == status.HTTP_401_UNAUTHORIZED
+    # as seen by a process which did not revoke it
+    revocation.revoked_ids.clear()
+    assert refresh(client, refresh_token).status_code == status.HTTP_401_UNAUTHORIZED
+
+
+def test_prune(db, settings, monkeypatch):
+    """
+    Tests that expired revoked tokens are pruned, at most once per interval
+    """
+
+    now = timezone.now()
+    RevokedToken.objects.create(jti='expired', expires=now - datetime.timedelta(seconds=1))
+    RevokedToken.objects.create(jti='live', expires=now + datetime.timedelta(hours=1))
+
+    monkeypatch.setattr(revocation, '_last_prune', 0)
+    revocation.prune_if_due()
+    assert list(RevokedToken.objects.values_list('jti', flat=True)) == ['live']
+
+    RevokedToken.objects.create(jti='expired', expires=now - datetime.timedelta(seconds=1))
+    revocation.prune_if_due()
+    assert RevokedToken.objects.count() == 2
+    assert revocation.prune() == 1
@@ -0,0 +1,69 @@
+import base64
+import json
+
+import pytest
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from tests.Todo.test_todo_endpoints import auto_login_user
+
+from rest_framework import status
+
+
+def test_token_verify(db, client, auto_login_user):
+    """
+    Tests that verifying a valid access token returns its username, from the cache the second time
+    """
+
+    # login user
+    user, access_token, refresh_token = auto_login_user(username='johnsmith', email='johnsmith@gmail.com')
+    url = reverse('token-verify')
+    response = client.post(url, {'token': access_token}, content_type='application/json')
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {'username': 'johnsmith'}
+
+    # verifying the same token again is answered without touching the database
+    with CaptureQueriesContext(connection) as queries:
+        response = client.post(url, {'token': access_token}, content_type='application/json')
+    assert response.status_code == status.HTTP_200_OK
+    assert len(queries) == 0
+
+
+@pytest.mark.parametrize('data', [{}, {'token': ''}, {'token': 5}, ['token']])
+def test_token_verify_missing(db, client, data):
+    """
+    Tests that a request without a token is rejected with a 400
+    """
+
+    response = client.post(reverse('token-verify'), data, content_type='application/json')
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json() == {'token': ['This field is required.']}
+
+
+def test_token_verify_invalid(db, client, auto_login_user):
+    """
+    Tests that an invalid token is rejected, even when it reuses the signature of a cached token
+    """
+
+    # login user
+    user, access_token, refresh_token = auto_login_user(username='johnsmith', email='johnsmith@gmail.com')
+    url = reverse('token-verify')
+    # cache the genuine token
+    response = client.post(url, {'token': access_token}, content_type='application/json')
+    assert response.status_code == status.HTTP_200_OK
+
+    # swap in a forged payload but keep the genuine signature
+    header, payload, signature = access_token.split('.')
+    claims = json.loads(base64.urlsafe_b64decode(payload + '=' * (-len(payload) % 4)))
+    claims['username'] = 'admin'
+    forged = base64.urlsafe_b64encode(json.dumps(claims).encode()).decode().rstrip('=')
+    response = client.post(url, {'token': '.'.join([header, forged, signature])}, content_type='application/json')
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    # a refresh token is not an access token
+    response = client.post(url, {'token': refresh_token}, content_type='application/json')
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
@@ -0,0 +1,22 @@
+import pytest
+
+from django.core.cache import caches
+
+from core import revocation, throttling
+from core.authentication import user_cache
+from core.verify import verified_tokens
+
+
+@pytest.fixture(autouse=True)
+def clear_process_caches():
+    """
+    Fixture to empty the in-process caches between tests, since user and todo ids are reused once each test's transaction is rolled back
+    """
+
+    user_cache.clear()
+    verified_tokens.clear()
+    throttling.buckets.clear()
+    revocation.revoked_ids.clear()
+    for cache in caches.all():
+        cache.clear()
+    yield
@@ -0,0 +1,142 @@
+import pytest
+
+from django.core.cache import cache
+from django.db import connection, connections
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.routers import get_pin_key
+from Todo import cache as todo_cache
+from Todo.models import Tag, TodoList
+from tests.Todo.test_todo_endpoints import auto_login_user, create_todo
+
+from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken
+
+
+@pytest.fixture
+def replica(transactional_db, tmp_path, settings):
+    """
+    Fixture to add a read-only 'replica' alias, returning a function that copies the test database into it
+    """
+
+    settings.DATABASE_REPLICAS = ['replica']
+    name = tmp_path / 'replica.sqlite3'
+    connections.databases['replica'] = {
+        'ENGINE': 'core.backends.sqlite3',
+        'NAME': str(name),
+        'OPTIONS': {'read_only': True},
+    }
+
+    def sync_replica():
+        connections['replica'].close()
+        if name.exists():
+            name.unlink()
+        with connection.cursor() as cursor:
+            cursor.execute('VACUUM INTO %s', [str(name)])
+        return connections['replica']
+
+    yield sync_replica
+    connections['replica'].close()
+    del connections['replica']
+    del connections.databases['replica']
+
+
+def todo_titles(response):
+    assert response.status_code == status.HTTP_200_OK, response.content
+    return [todo['title'] for todo in response.json()['results']]
+
+
+class TestReplicaRouter:
+    def test_todo_reads_from_replica(self, client, create_todo, auto_login_user, replica):
+        """
+        Test that the todo list and detail are read from the replica, and writes go to the primary
+        """
+
+        user, access_token, refresh_token = auto_login_user(username='johnsmith', email='johnsmith@gmail.com')
+        headers = {'HTTP_AUTHORIZATION': 'Bearer ' + access_token}
+        todo = create_todo(title='Learn how to use pytest', owner=user)
+        replica_connection = replica()
+
+        with CaptureQueriesContext(replica_connection) as replica_queries, \
+                CaptureQueriesContext(connection) as primary_queries:
+            assert todo_titles(client.get(reverse('todo-list'), **headers)) == ['Learn how to use pytest']
+            response = client.get(reverse('todo-detail', args=[todo.id]), **headers)
+            assert response.json()['title'] == 'Learn how to use pytest'
+        # each a todo query and a tag query
+        assert len(replica_queries) == 4
+        assert len(primary_queries) == 0
+
+        # the replica is read-only, so writes can only have gone to the primary
+        response = client.post(reverse('todo-list'), {'title': 'Learn Django'}, **headers)
+        assert response.status_code == status.HTTP_201_CREATED
+
+
+    def test_todo_reads_own_writes(self, client, create_todo, auto_login_user, replica):
+        """
+        Test that a user who has just written reads from the primary until the pin expires, unlike other users
+        """
+
+        user, access_token, refresh_token = auto_login_user(username='johnsmith', email='johnsmith@gmail.com')
+        other, other_access_token, other_refresh_token = auto_login_user(username='janesmith', email='janesmith@gmail.com')
+        headers = {'HTTP_AUTHORIZATION': 'Bearer ' + access_token}
+        create_todo(title='Learn how to use pytest', owner=user)
+        replica()
+
+        # the replica has not caught up with the new todo
+        client.post(reverse('todo-list'), {'title': 'Learn Django'}, **headers)
+        assert todo_titles(client.get(reverse('todo-list'), **headers)) == ['Learn Django', 'Learn how to use pytest']
+        other_response = client.get(reverse('todo-list'), HTTP_AUTHORIZATION='Bearer ' + other_access_token)
+        assert todo_titles(other_response) == []
+
+        # once the pin expires the user reads the lagging replica again, past the response cache
+        cache.delete(get_pin_key(user.id))
+        todo_cache.bump_version(user.id)
+        response = client.get(reverse('todo-list'), **headers)
+        assert todo_titles(response) == ['Learn how to use pytest']
+
+
+    @pytest.mark.parametrize('write', [
+        lambda client, headers, todo_list, tag: client.delete(reverse('todolist-detail', args=[todo_list.id]), **headers),
+        lambda client, headers, todo_list, tag: client.patch(reverse('tag-detail', args=[tag.id]), {'name': 'job'},
+                                                             content_type='application/json', **headers),
+        lambda client, headers, todo_list, tag: client.delete(reverse('tag-detail', args=[tag.id]), **headers),
+    ])
+    def test_list_and_tag_writes_read_own_writes(self, client, create_todo, auto_login_user, replica, write):
+        """
+        Test that changing todos by deleting a list or renaming or deleting a tag also keeps the user on the primary
+        """
+
+        user, access_token, refresh_token = auto_login_user(username='johnsmith', email='johnsmith@gmail.com')
+        headers = {'HTTP_AUTHORIZATION': 'Bearer ' + access_token}
+        todo_list = TodoList.objects.create(name='Project', owner=user)
+        tag = Tag.objects.create(name='work', owner=user)
+        todo = create_todo(title='Learn how to use pytest', owner=user, list=todo_list)
+        todo.tags.set([tag])
+        replica()
+
+        assert write(client, headers, todo_list, tag).status_code < 300
+        data = client.get(reverse('todo-list'), **headers).json()['results'][0]
+        todo.refresh_from_db()
+        assert data['list'] == todo.list_id
+        assert data['tags'] == [tag.name for tag in todo.tags.all()]
+
+
+    def test_token_verify_reads_from_replica(self, client, auto_login_user, replica):
+        """
+        Test that token verification reads the user from the replica
+        """
+
+        user, access_token, refresh_token = auto_login_user(username='johnsmith', email='johnsmith@gmail.com')
+        # tokens issued before the username claim was added are completed from the user row
+        access_token = str(AccessToken.for_user(user))
+        replica_connection = replica()
+
+        with CaptureQueriesContext(replica_connection) as replica_queries, \
+                CaptureQueriesContext(connection) as primary_queries:
+            response = client.post(reverse('token-verify'), {'token': access_token}, content_type='application/json')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == {'username': 'johnsmith'}
+        assert len(replica_queries) == 1
+        assert len(primary_queries) == 0
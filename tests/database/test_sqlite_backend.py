@@ -0,0 +1,104 @@
+import threading
+import time
+
+import pytest
+
+from django.db import OperationalError, connections, transaction
+
+
+@pytest.fixture
+def sqlite_database(tmp_path, django_db_blocker):
+    """
+    Fixture to add database aliases for a scratch SQLite file, returning a function that adds one with the given options
+    """
+
+    aliases = []
+
+    def add_alias(alias, **options):
+        connections.databases[alias] = {
+            'ENGINE': 'core.backends.sqlite3',
+            'NAME': str(tmp_path / 'todo.sqlite3'),
+            'OPTIONS': options,
+        }
+        aliases.append(alias)
+        return connections[alias]
+
+    # the scratch file is not one of the test databases
+    with django_db_blocker.unblock():
+        yield add_alias
+    for alias in aliases:
+        connections[alias].close()
+        del connections[alias]
+        del connections.databases[alias]
+
+
+def pragma(connection, name):
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA %s' % name)
+        return cursor.fetchone()[0]
+
+
+def test_sqlite_pragmas(sqlite_database):
+    """
+    Test that new connections are switched to WAL with the tuned pragmas and busy timeout
+    """
+
+    connection = sqlite_database('tuned', timeout=20)
+
+    assert pragma(connection, 'journal_mode') == 'wal'
+    # NORMAL
+    assert pragma(connection, 'synchronous') == 1
+    assert pragma(connection, 'busy_timeout') == 20000
+    assert pragma(connection, 'mmap_size') == 256 * 1024 * 1024
+    assert pragma(connection, 'cache_size') == -64 * 1024
+
+
+def test_sqlite_read_only(sqlite_database):
+    """
+    Test that a read-only alias reads the database but cannot write to it
+    """
+
+    primary = sqlite_database('primary')
+    with primary.cursor() as cursor:
+        cursor.execute('CREATE TABLE todo (title TEXT)')
+        cursor.execute("INSERT INTO todo VALUES ('Learn how to use pytest')")
+    read_only = sqlite_database('read_only', read_only=True)
+
+    with read_only.cursor() as cursor:
+        cursor.execute('SELECT title FROM todo')
+        assert cursor.fetchall() == [('Learn how to use pytest',)]
+        with pytest.raises(OperationalError):
+            cursor.execute("INSERT INTO todo VALUES ('Learn Django')")
+    assert pragma(read_only, 'journal_mode') == 'wal'
+
+
+@pytest.mark.parametrize('transaction_mode, errors', [('DEFERRED', 1), ('IMMEDIATE', 0)])
+def test_sqlite_concurrent_writes(sqlite_database, transaction_mode, errors):
+    """
+    Test that transactions which read before they write wait for each other rather than fail as locked
+    """
+
+    sqlite_database('primary').cursor().execute('CREATE TABLE todo (title TEXT)')
+    sqlite_database('writer', timeout=5, transaction_mode=transaction_mode)
+    failures = []
+
+    def write():
+        try:
+            with transaction.atomic(using='writer'):
+                with connections['writer'].cursor() as cursor:
+                    cursor.execute('SELECT COUNT(*) FROM todo')
+                    time.sleep(0.1)
+                    cursor.execute("INSERT INTO todo VALUES ('Learn how to use pytest')")
+        except OperationalError as e:
+            failures.append(e)
+        finally:
+            connections['writer'].close()
+
+    threads = [threading.Thread(target=write) for i in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(failures) == errors
+    assert all('database is locked' in str(e) for e in failures)
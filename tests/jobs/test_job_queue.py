@@ -0,0 +1,168 @@
+import io
+
+import pytest
+
+from django.core.management import call_command
+from django.utils import timezone
+
+from jobs.models import Job
+from jobs.queue import Worker, claim, enqueue, run, task
+
+
+calls = []
+
+
+@task
+def record(value):
+    calls.append(value)
+
+
+@task(max_attempts=2, retry_delay=0)
+def explode():
+    calls.append('boom')
+    raise RuntimeError('boom')
+
+
+@task(retry_delay=60)
+def explode_later():
+    raise RuntimeError('boom')
+
+
+@pytest.fixture(autouse=True)
+def clear_calls():
+    calls.clear()
+
+
+def test_run_jobs(db):
+    """
+    Test that a worker runs every job due once, in order, and deletes them
+    """
+
+    for value in range(5):
+        enqueue(record, value=value)
+
+    worker = Worker(batch_size=2)
+    worker.run(burst=True)
+    assert calls == [0, 1, 2, 3, 4]
+    assert worker.succeeded == 5
+    assert not Job.objects.exists()
+
+
+def test_enqueue_unregistered(db):
+    """
+    Test that only registered tasks can be enqueued
+    """
+
+    with pytest.raises(ValueError):
+        enqueue(print, value=1)
+
+
+def test_retry_then_fail(db):
+    """
+    Test that a job that raises is retried until it has used up its attempts, then kept as failed with the error
+    """
+
+    enqueue(explode)
+    worker = Worker()
+    worker.run(burst=True)
+
+    assert calls == ['boom', 'boom']
+    assert worker.failed == 2
+    job = Job.objects.get()
+    assert job.status == Job.Status.FAILED
+    assert job.attempts == 2
+    assert 'RuntimeError: boom' in job.last_error
+    # failed jobs are not claimed again
+    assert claim() == []
+
+
+def test_retry_delay(db):
+    """
+    Test that a failed job is only retried after the delay, doubled after each attempt
+    """
+
+    job = enqueue(explode_later)
+    Worker().run(burst=True)
+    job.refresh_from_db()
+    assert job.status == Job.Status.QUEUED
+    assert 55 <= (job.run_at - timezone.now()).total_seconds() <= 60
+    assert claim() == []
+
+    Job.objects.update(run_at=timezone.now())
+    Worker().run(burst=True)
+    job.refresh_from_db()
+    assert 115 <= (job.run_at - timezone.now()).total_seconds() <= 120
+
+
+def test_visibility_timeout(db):
+    """
+    Test that a job whose claim expired is claimed again, and that only the worker holding the claim can finish it
+    """
+
+    enqueue(record, value='once')
+    stale, = claim()
+    # claimed, and not finished
+    assert claim() == []
+
+    Job.objects.update(run_at=timezone.now())
+    fresh, = claim()
+    assert fresh.pk == stale.pk
+    assert fresh.attempts == 2
+
+    run(stale)
+    assert Job.objects.filter(pk=fresh.pk).exists()
+    run(fresh)
+    assert not Job.objects.exists()
+
+
+def test_last_attempt_timed_out(db):
+    """
+    Test that a job is not run again once its claim has expired on its last attempt
+    """
+
+    enqueue(explode)
+    for _ in range(2):
+        claim()
+        Job.objects.update(run_at=timezone.now())
+    Worker().run(burst=True)
+
+    assert calls == []
+    job = Job.objects.get()
+    assert job.status == Job.Status.FAILED
+    assert job.last_error == 'The last attempt timed out.'
+
+
+def test_stop_releases_claimed_jobs(db):
+    """
+    Test that a stopped worker finishes the job at hand and hands the rest of its batch back to the queue untried
+    """
+
+    worker = Worker(batch_size=3)
+
+    @task
+    def stop_worker():
+        calls.append('stop')
+        worker.stop()
+
+    enqueue(stop_worker)
+    enqueue(record, value=1)
+    enqueue(record, value=2)
+    worker.run()
+
+    assert calls == ['stop']
+    assert list(Job.objects.values_list('status', 'attempts', 'lock')) == [(Job.Status.QUEUED, 0, '')] * 2
+    Worker().run(burst=True)
+    assert calls == ['stop', 1, 2]
+
+
+def test_run_worker_command(db):
+    """
+    Test that 'manage.py run_worker --burst' runs the jobs due and reports how many succeeded and failed
+    """
+
+    enqueue(record, value=1)
+    enqueue(explode)
+    stdout = io.StringIO()
+    call_command('run_worker', burst=True, stdout=stdout)
+    assert calls == [1, 'boom', 'boom']
+    assert '1 jobs succeeded, 2 failed' in stdout.getvalue()
@@ -0,0 +1,104 @@
+import logging
+import re
+from unittest import mock
+
+import pytest
+
+from django.urls import reverse
+
+from core import metrics
+from Todo.models import Todo
+from Todo.views import TodoViewSet
+from tests.Todo.test_todo_endpoints import auto_login_user, create_todo
+
+from rest_framework import status
+from rest_framework.response import Response
+
+
+@pytest.fixture
+def todo_headers(db, create_todo, auto_login_user):
+    """
+    Fixture to log in a user with a few todos, returning the user and its auth headers
+    """
+
+    user, access_token, refresh_token = auto_login_user(username='johnsmith', email='johnsmith@gmail.com')
+    for i in range(6):
+        create_todo(title='Todo #%d' % i, owner=user)
+    return user, {'HTTP_AUTHORIZATION': 'Bearer ' + access_token}
+
+
+def test_server_timing(client, todo_headers):
+    """
+    Tests that a sampled request reports its database, serialization, rendering and total time in Server-Timing
+    """
+
+    user, headers = todo_headers
+    response = client.get(reverse('todo-list'), **headers)
+
+    assert response.status_code == status.HTTP_200_OK
+    timings = dict(re.findall(r'(\w+);dur=([\d.]+)', response['Server-Timing']))
+    assert list(timings) == ['db', 'serialize', 'render', 'total']
+    assert float(timings['total']) >= float(timings['db']) + float(timings['render'])
+    # the page of todos and their tags
+    assert 'desc="queries: 2"' in response['Server-Timing']
+
+
+def test_metrics_endpoint(client, todo_headers):
+    """
+    Tests that '/metrics' exports per-view histograms in the Prometheus text format, to allowed addresses only
+    """
+
+    user, headers = todo_headers
+    count = metrics.request_duration.get_count('todo-list', 'GET')
+    client.get(reverse('todo-list'), **headers)
+    client.get(reverse('todo-list'), **headers)
+    assert metrics.request_duration.get_count('todo-list', 'GET') == count + 2
+
+    response = client.get(reverse('metrics'))
+    assert response.status_code == status.HTTP_200_OK
+    assert response['Content-Type'].startswith('text/plain; version=0.0.4')
+    text = response.content.decode()
+    assert '# TYPE todolist_request_duration_seconds histogram' in text
+    assert 'todolist_request_duration_seconds_count{view="todo-list",method="GET"} %d' % (count + 2) in text
+    assert re.search(r'todolist_request_db_queries_bucket\{view="todo-list",method="GET",le="1"\} \d+', text)
+    assert 'todolist_response_size_bytes_bucket{view="todo-list",method="GET",le="+Inf"}' in text
+    assert '# TYPE todolist_todo_cache_requests_total counter' in text
+    assert 'todolist_todo_cache_requests_total{result="hit"} %d' % metrics.todo_cache_requests.get('hit') in text
+
+    assert client.get(reverse('metrics'), REMOTE_ADDR='10.0.0.2').status_code == status.HTTP_403_FORBIDDEN
+
+
+def test_unsampled_request(client, todo_headers, settings):
+    """
+    Tests that requests outside the sample only have their latency and size recorded
+    """
+
+    settings.PERF_METRICS = dict(settings.PERF_METRICS, SAMPLE_RATE=0)
+    user, headers = todo_headers
+    count = metrics.request_duration.get_count('todo-list', 'GET')
+    queries = metrics.db_queries.get_count('todo-list', 'GET')
+    response = client.get(reverse('todo-list'), **headers)
+
+    assert 'Server-Timing' not in response
+    assert metrics.request_duration.get_count('todo-list', 'GET') == count + 1
+    assert metrics.db_queries.get_count('todo-list', 'GET') == queries
+
+
+def test_n_plus_one_warning(client, todo_headers, caplog):
+    """
+    Tests that a view running a query per todo is reported as possible N+1 queries
+    """
+
+    user, headers = todo_headers
+
+    def list_rows(self, request, *args, **kwargs):
+        ids = Todo.objects.filter(owner_id=request.user.id).values_list('id', flat=True)
+        return Response([Todo.objects.get(pk=pk).title for pk in ids])
+
+    count = metrics.n_plus_one.get('todo-list')
+    with mock.patch.object(TodoViewSet, 'list_rows', list_rows), caplog.at_level(logging.WARNING, 'core.middleware'):
+        assert client.get(reverse('todo-list'), **headers).status_code == status.HTTP_200_OK
+
+    assert metrics.n_plus_one.get('todo-list') == count + 1
+    [record] = caplog.records
+    assert record.getMessage().startswith('Possible N+1 queries: GET todo-list ran 6 times: SELECT')
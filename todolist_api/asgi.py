@@ -0,0 +1,117 @@
+"""
+ASGI config for todolist_api project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+Run it with an ASGI server, e.g.
+
+    uvicorn todolist_api.asgi:application --workers 4
+
+For more information on this file, see
+https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
+"""
+
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+
+import django
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.base import BaseHandler
+from django.db import close_old_connections, connections
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'todolist_api.settings')
+
+# the receive channel of the request being handled, watched for the client
+# going away while a response is streamed
+request_receive = ContextVar('request_receive')
+
+
+class ThreadPoolASGIHandler(ASGIHandler):
+    """
+    Reads requests and writes responses on the event loop, so slow clients
+    cost a worker nothing but a socket, and runs each request's middleware
+    and view in the event loop's thread pool.
+
+    Django's own ASGIHandler runs sync views, and every hook of sync-only
+    middleware such as the built-in ones, on a single shared thread, which
+    serializes a worker's requests. This handler makes one trip to the pool
+    per request instead, and each pool thread uses its own database
+    connections, opened and closed as under WSGI.
+    """
+
+    def __init__(self):
+        BaseHandler.__init__(self)
+        self.load_middleware(is_async=False)
+
+    async def __call__(self, scope, receive, send):
+        request_receive.set(receive)
+        await super().__call__(scope, receive, send)
+
+    async def get_response_async(self, request):
+        return await sync_to_async(self.get_response_in_thread, thread_sensitive=False)(request)
+
+    def get_response_in_thread(self, request):
+        close_old_connections()
+        try:
+            return self.get_response(request)
+        finally:
+            close_old_connections()
+
+    async def send_response(self, response, send):
+        if not response.streaming:
+            return await super().send_response(response, send)
+
+        # streamed content, such as an export, reads from the database as it
+        # goes, so it is iterated in a thread rather than on the event loop
+        chunks = iter(response.streaming_content)
+        response.streaming_content = ()
+
+        async def send_with_content(message):
+            await send(message)
+            if message['type'] == 'http.response.start':
+                await self.send_streaming_content(response, chunks, send)
+
+        await super().send_response(response, send_with_content)
+
+    async def send_streaming_content(self, response, chunks, send):
+        """
+        Sends the chunks until they run out or the client disconnects.
+        Servers drop what is sent after a disconnect without a word, so
+        the request's receive channel is watched for it; otherwise a stream
+        such as /api/todos/events/ would hold its thread and subscription
+        until it ended of its own accord.
+        """
+        # a thread of its own keeps every chunk on the same database connection
+        executor = ThreadPoolExecutor(max_workers=1)
+        loop = asyncio.get_running_loop()
+        disconnected = asyncio.ensure_future(wait_for_disconnect(request_receive.get()))
+        try:
+            while True:
+                chunk = loop.run_in_executor(executor, next, chunks, None)
+                await asyncio.wait([chunk, disconnected], return_when=asyncio.FIRST_COMPLETED)
+                if disconnected.done():
+                    # the thread is busy until the chunk at hand is ready, at
+                    # most a heartbeat for event streams; the iterator is then
+                    # closed there, before its database connections are
+                    await chunk
+                    await loop.run_in_executor(executor, response.close)
+                    break
+                chunk = chunk.result()
+                if chunk is None:
+                    break
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        finally:
+            disconnected.cancel()
+            await loop.run_in_executor(executor, connections.close_all)
+            executor.shutdown(wait=False)
+
+
+async def wait_for_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+django.setup(set_prefix=False)
+application = ThreadPoolASGIHandler()
@@ -38,13 +38,16 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'core',
     'Todo',
+    'jobs',
     'rest_framework',
     'corsheaders',
     'django_extensions',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.PerformanceMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -55,6 +58,18 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# request metrics; see core/middleware.py. A SAMPLE_RATE share of requests
+# has its database queries, serialization and rendering timed, reported in a
+# Server-Timing header and checked for N+1 queries; every request's latency
+# and response size are recorded. /metrics serves them to ALLOWED_IPS.
+PERF_METRICS = {
+    'SAMPLE_RATE': 1.0,
+    'SERVER_TIMING': True,
+    'N_PLUS_ONE_MODULES': ['Todo.views', 'core.views'],
+    'N_PLUS_ONE_THRESHOLD': 5,
+    'ALLOWED_IPS': ['127.0.0.1'],
+}
+
 ROOT_URLCONF = 'todolist_api.urls'
 
 TEMPLATES = [
@@ -79,13 +94,91 @@ WSGI_APPLICATION = 'todolist_api.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# core.backends.sqlite3 is Django's SQLite backend with WAL, tuned pragmas and
+# writes that wait for the lock; see its docstring. Connections are kept open
+# for CONN_MAX_AGE seconds rather than reopened for every request, and
+# 'timeout' is how long a write waits for another one to finish, in seconds.
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'core.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': 600,
+        'OPTIONS': {
+            'timeout': 20,
+        },
+    },
+}
+# a read-only connection to the same database
+DATABASES['readonly'] = {
+    **DATABASES['default'],
+    'OPTIONS': {**DATABASES['default']['OPTIONS'], 'read_only': True},
+    'TEST': {'MIRROR': 'default'},
+}
+
+# todo lists and details, and token verification, are read from the replicas
+# listed here by alias; add 'readonly' to read them through the read-only
+# connection. After a write, a user's reads stay on 'default' for
+# DATABASE_REPLICA_PIN_SECONDS so that they see their own writes; set it to at
+# least the replicas' lag. See core/routers.py.
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+DATABASE_REPLICAS = []
+DATABASE_REPLICA_PIN_SECONDS = 5
+
+
+# Caches
+# https://docs.djangoproject.com/en/2.2/topics/cache/
+
+# local memory by default; point this at a shared backend such as
+# 'django.core.cache.backends.filebased.FileBasedCache' or a Redis backend
+# (e.g. django-redis) when running more than one process
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }
 
+# cache alias and timeout (seconds) used for per-user todo responses
+TODO_CACHE_ALIAS = 'default'
+TODO_CACHE_TIMEOUT = 300
+
+# change notifications served by /api/todos/events/ and /api/todos/changes/;
+# see Todo/notifications.py. LocalBackend only wakes clients connected to the
+# process that made the write: use CacheBackend, with a shared cache, when
+# running more than one. Streams end after MAX_DURATION seconds and clients
+# reconnect after RETRY_MS; HEARTBEAT and LONG_POLL_TIMEOUT are in seconds.
+TODO_NOTIFICATIONS = {
+    'BACKEND': 'Todo.notifications.LocalBackend',
+    'OPTIONS': {},
+    'HEARTBEAT': 15,
+    'MAX_DURATION': 300,
+    'RETRY_MS': 2000,
+    'LONG_POLL_TIMEOUT': 30,
+}
+
+# the delta sync feed served by /api/todos/sync; see Todo/sync.py. Each
+# response has at most PAGE_SIZE changes, and tombstones of deleted todos
+# are kept for TOMBSTONE_MAX_AGE seconds, until `manage.py prune_tombstones`
+# deletes them: clients that last synced before then have to sync again
+# from scratch.
+TODO_SYNC = {
+    'PAGE_SIZE': 500,
+    'TOMBSTONE_MAX_AGE': 90 * 24 * 60 * 60,
+}
+
+# the background job queue run by `manage.py run_worker`; see jobs/queue.py.
+# Workers claim BATCH_SIZE jobs at a time for VISIBILITY_TIMEOUT seconds,
+# after which jobs still unfinished are run again, and look for jobs every
+# POLL_INTERVAL seconds when there are none. A job that fails is retried
+# after RETRY_DELAY seconds, doubled after each attempt, up to MAX_ATTEMPTS
+# attempts in all, unless its task sets its own.
+JOBS = {
+    'BATCH_SIZE': 10,
+    'VISIBILITY_TIMEOUT': 300,
+    'POLL_INTERVAL': 1,
+    'MAX_ATTEMPTS': 5,
+    'RETRY_DELAY': 10,
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -106,6 +199,36 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Password hashing
+# https://docs.djangoproject.com/en/2.2/topics/auth/passwords/
+
+# new passwords are hashed with the first hasher; passwords hashed with
+# another one, or with other costs, are rehashed when their user logs in.
+# core.hashers hashes in a pool of PASSWORD_HASHING['WORKERS'] threads per
+# process; see its docstring. Argon2 needs argon2-cffi, and bcrypt needs
+# `pip install bcrypt` if moved first.
+PASSWORD_HASHERS = [
+    'core.hashers.Argon2PasswordHasher',
+    'core.hashers.BCryptSHA256PasswordHasher',
+    'core.hashers.PBKDF2PasswordHasher',
+]
+
+PASSWORD_HASHING = {
+    'WORKERS': 2,
+    # memory_cost is in KiB
+    'ARGON2': {'time_cost': 2, 'memory_cost': 19456, 'parallelism': 1},
+    'BCRYPT_ROUNDS': 10,
+}
+
+# token buckets throttling '/api/token' and '/api/users', per client address
+# and per username: up to BURST requests at once, refilled at RATE requests
+# per second
+AUTH_THROTTLES = {
+    'ip': {'BURST': 30, 'RATE': 0.5},
+    'username': {'BURST': 10, 'RATE': 0.1},
+}
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/2.2/topics/i18n/
 
@@ -126,16 +249,63 @@ USE_TZ = True
 STATIC_ROOT = os.path.join(BASE_DIR, "static")
 STATIC_URL = '/static/'
 
+# NUM_PROXIES is the number of reverse proxies in front of the app: the
+# client address that the per-address throttles key on is read from the
+# X-Forwarded-For header they add, and from REMOTE_ADDR when there are none,
+# so that clients can't pick their own address by sending the header
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
-    )
+        'core.authentication.StatelessJWTAuthentication',
+    ),
+    'NUM_PROXIES': 0,
 }
 
 CORS_ORIGIN_WHITELIST = ['http://localhost:3000', 'http://www.jonhong.me.s3-website-us-east-1.amazonaws.com']
 
+# refresh tokens are rotated: /api/token/refresh returns a new one and
+# revokes the one it was given, so a stolen refresh token stops working once
+# either party uses it
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=1),
     'REFRESH_TOKEN_LIFETIME': timedelta(minutes=2),
+    'ROTATE_REFRESH_TOKENS': True,
+}
+
+# asymmetric token signing; see core/signing.py. Each key is a dict with a
+# KID, an ALGORITHM ('RS256' or 'EdDSA') and a PEM PRIVATE_KEY, or only a
+# PUBLIC_KEY for retired keys, e.g. read from a file or the environment:
+#     {'KID': '2026-10', 'ALGORITHM': 'EdDSA', 'PRIVATE_KEY': os.environ['JWT_KEY_2026_10']}
+# `python manage.py generate_signing_key EdDSA` makes one. New tokens are
+# signed with the ACTIVE key, or with SIMPLE_JWT's algorithm and key if it is
+# None; tokens signed that way are accepted while ACCEPT_LEGACY_TOKENS is
+# true. The public keys are served at /api/.well-known/jwks.json, cacheable
+# for JWKS_MAX_AGE seconds.
+JWT_KEYS = {
+    'ACTIVE': None,
+    'KEYS': [],
+    'ACCEPT_LEGACY_TOKENS': True,
+    'JWKS_MAX_AGE': 3600,
+}
+
+# revoked refresh tokens; see core/revocation.py. CACHE_MAXSIZE recently
+# revoked ids are also kept in memory, and expired ones are deleted from the
+# database at most every PRUNE_INTERVAL seconds
+TOKEN_REVOCATION = {
+    'CACHE_MAXSIZE': 100000,
+    'PRUNE_INTERVAL': 300,
+}
+
+# in-process cache of full user rows for requests authenticated from token
+# claims alone; set MAXSIZE or TTL (seconds) to 0 to disable it
+TOKEN_USER_CACHE = {
+    'MAXSIZE': 1024,
+    'TTL': 30,
+}
+
+# in-process cache of recently verified tokens for /api/token/verify; entries
+# never outlive the token's 'exp'
+TOKEN_VERIFY_CACHE = {
+    'MAXSIZE': 10000,
+    'TTL': 60,
 }
 